@@ -1,15 +1,24 @@
 import asyncio
 import logging
-from asyncio import Event
+from functools import partial
+from pathlib import Path
 from zoneinfo import ZoneInfo
 
 from .config import Config
-from .screenshot_producers import *
+from .constants import EVENT_LOG_PATH
+from .controller import SessionController
+from .event_recorder import EventRecorder
 from .session import Session
+from .types import OverflowPolicy
+from .upload_scheduler import UploadMode, UploadScheduler
 from .uploader import Uploader
 from .windows_producers import *
 
 
+def _kib(kib_per_sec: int | None) -> float | None:
+    return None if kib_per_sec is None else kib_per_sec * 1024.0
+
+
 class GameSessionSync:
     def __init__(self, config: Config) -> None:
         self.queue: EventBus = EventBus()
@@ -20,6 +29,7 @@ class GameSessionSync:
             self.queue,
             config.monitor.input_idle_sec,
         )
+        self.recorder = EventRecorder(self.queue, Path(EVENT_LOG_PATH))
 
         self.s_config = config.session
         self.uploader = Uploader(
@@ -29,92 +39,52 @@ class GameSessionSync:
             config.session.minimum_session_gap_min,
             config.session.minimum_session_length_min,
             config.session.delete_after_upload,
+            config.upload_priority,
+            config.session.phash_threshold,
         )
         self.tz = ZoneInfo(config.connection.notion_user_tz)
 
-        self.active_session: Session | None = None
-        self._last_session_stop_event: BaseInputEvent | BaseWindowEvent | None = None
-        self._stop_event = Event()
+        self.controller = SessionController(
+            # consecutive duplicates are idempotent for the session machine
+            self.queue.subscribe(
+                SessionController.__name__,
+                policy=OverflowPolicy.MERGE,
+                merge_key=lambda e: (type(e), getattr(e, "title", None)),
+            ),
+            partial(Session, s_config=self.s_config, tz=self.tz),
+            self.uploader,
+        )
+        self.upload_scheduler = UploadScheduler(
+            self.queue.subscribe(
+                UploadScheduler.__name__,
+                policy=OverflowPolicy.MERGE,
+                merge_key=lambda e: (type(e), getattr(e, "title", None)),
+            ),
+            self.uploader,
+            {
+                UploadMode.PLAY: _kib(config.bandwidth.play_kib_per_sec),
+                UploadMode.IDLE: _kib(config.bandwidth.idle_kib_per_sec),
+                UploadMode.AWAY: _kib(config.bandwidth.away_kib_per_sec),
+            },
+        )
+        self._recorder_task: asyncio.Task | None = None
         self.log = logging.getLogger(self.__class__.__name__)
 
-    async def _start_session(self, title: str):
-        await self.uploader.stop()
-
-        if self.active_session is None:
-            self.active_session = Session(title, self.s_config, self.tz)
-
-        same_title = self.active_session.title == title
-        active = self.active_session.is_active
-
-        if same_title and active:
-            return
-        if not same_title and active:
-            self.log.warning(
-                "Starting a new session while existing one hasn't been paused"
-            )
-            self.active_session.stop()
-            active = False
-        if not same_title and not active:
-            self.active_session = Session(title, self.s_config, self.tz)
-        await self.active_session.run()
-
-    async def _resume_session(self):
-        if self.active_session is not None:
-            await self.active_session.run()
-
-    def _pause_session(self, event: BaseInputEvent | BaseWindowEvent):
-        if self.active_session is not None:
-            self.active_session.stop()
-            self._last_session_stop_event = event
-
-    def _cleanup_session(self):
-        if self.active_session is not None:
-            self.active_session.stop()
-
-    async def _stop_session(self, event: BaseInputEvent | BaseWindowEvent):
-        self._pause_session(event)
-        await self.uploader.upload()
-
-    async def _run(self):
-        # Task groups propagate errors instead of being isolated in Task objects
-        # when creating them with asyncio.create_task
-        async with asyncio.TaskGroup() as tg:
-            while not self._stop_event.is_set():
-                event = await self.queue.get()
-                if isinstance(event, InputIdleEvent):
-                    self._pause_session(event)
-
-                # Don't activate when last event was WindowMinimizedEvent
-                elif isinstance(event, InputActiveEvent) and isinstance(
-                    self._last_session_stop_event,
-                    InputIdleEvent,
-                ):
-                    tg.create_task(self._resume_session())
-
-                if isinstance(event, GameFullscreenEvent):
-                    tg.create_task(self._start_session(event.title))
-
-                elif isinstance(event, GameMinimizedEvent):
-                    self._pause_session(event)
-
-                elif isinstance(event, GameCloseEvent):
-                    tg.create_task(self._stop_session(event))
-
-                self.queue.task_done()
-
-            self._cleanup_session()
-
     async def run(self):
-        self._stop_event.clear()
         async with asyncio.TaskGroup() as tg:
+            self._recorder_task = tg.create_task(self.recorder.run())
             tg.create_task(self.window_watcher.run())
             tg.create_task(self.input_idle_watcher.run())
-            tg.create_task(self._run())
+            tg.create_task(self.controller.run())
+            tg.create_task(self.upload_scheduler.run())
 
     async def stop(self):
         self.log.info(
-            f"Stopping; active_session={getattr(self.active_session, "title", None)}"
+            f"Stopping; active_session={getattr(self.controller.active_session, "title", None)}"
         )
-        self._stop_event.set()
+        self.controller.stop()
+        self.upload_scheduler.stop()
         await self.window_watcher.stop()
         await self.input_idle_watcher.stop()
+        if self._recorder_task:
+            self._recorder_task.cancel()
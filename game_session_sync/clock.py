@@ -0,0 +1,90 @@
+import asyncio
+import selectors
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, tzinfo
+from typing import Any
+
+
+class Clock(ABC):
+    @abstractmethod
+    def monotonic(self) -> float:
+        """Seconds, for measuring intervals."""
+
+    @abstractmethod
+    def now(self, tz: tzinfo | None = None) -> datetime:
+        """Aware wall time."""
+
+
+class SystemClock(Clock):
+    def monotonic(self) -> float:
+        return time.perf_counter()
+
+    def now(self, tz: tzinfo | None = None) -> datetime:
+        return datetime.now(tz).astimezone(tz)
+
+
+class LoopClock(Clock):
+    """Time of the running event loop, anchored to a wall time `epoch`.
+
+    Under `VirtualTimeLoop` this is simulated time.
+    """
+
+    def __init__(self, epoch: datetime) -> None:
+        self.epoch = epoch
+
+    def monotonic(self) -> float:
+        return asyncio.get_running_loop().time()
+
+    def now(self, tz: tzinfo | None = None) -> datetime:
+        return (self.epoch + timedelta(seconds=self.monotonic())).astimezone(tz)
+
+
+SYSTEM_CLOCK = SystemClock()
+
+
+class _VirtualSelector:
+    """Wraps a real selector, turning timed waits into jumps of the loop's clock."""
+
+    def __init__(self, loop: "VirtualTimeLoop") -> None:
+        self._loop = loop
+        self._selector = selectors.DefaultSelector()
+
+    def select(self, timeout: float | None = None):
+        ready = self._selector.select(0)
+        if ready or timeout == 0:
+            return ready
+        if timeout is None:
+            # nothing scheduled: only other threads can wake the loop up
+            return self._selector.select(None)
+        self._loop.advance(timeout)
+        return []
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._selector, name)
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    """Event loop whose `time()` only moves forward when every task is waiting on
+    a timer, jumping straight to the next one.
+
+    Timers (`asyncio.sleep`, `wait_for` timeouts, `call_later`) take no real time,
+    so simulated days run in seconds. Blocking calls and threads still take real
+    time but don't advance the clock.
+    """
+
+    def __init__(self, start: float = 0.0) -> None:
+        super().__init__(selector=_VirtualSelector(self))  # type: ignore[arg-type]
+        self._virtual_time = start
+
+    def time(self) -> float:
+        return self._virtual_time
+
+    def advance(self, seconds: float) -> None:
+        self._virtual_time += seconds
+
+
+def run_virtual(main, start: float = 0.0):
+    """`asyncio.run()` for a coroutine on a `VirtualTimeLoop`."""
+    with asyncio.Runner(loop_factory=lambda: VirtualTimeLoop(start)) as runner:
+        return runner.run(main)
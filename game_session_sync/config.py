@@ -52,12 +52,30 @@ class MonitorConfig:
     input_idle_sec: int
 
 
+@dataclass(frozen=True)
+class BandwidthConfig:
+    # upload byte-rate caps per scheduling mode, null for unlimited
+    play_kib_per_sec: int | None = 256
+    idle_kib_per_sec: int | None = 2048
+    away_kib_per_sec: int | None = None
+
+
+@dataclass(frozen=True)
+class UploadPriorityConfig:
+    # manual screenshots are uploaded before auto captures of any session
+    manual_first: bool = True
+    # False to upload the oldest session first
+    newest_session_first: bool = True
+
+
 @dataclass(frozen=True)
 class Config:
     connection: ConnectionConfig
     session: SessionConfig
     notion_properties: NotionProperties
     monitor: MonitorConfig
+    bandwidth: BandwidthConfig = BandwidthConfig()
+    upload_priority: UploadPriorityConfig = UploadPriorityConfig()
 
 
 def load_config(path: Path) -> Config:
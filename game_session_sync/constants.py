@@ -1,2 +1,3 @@
 APP_NAME="Game Sync"
 LOG_PATH = "./app.log"
+EVENT_LOG_PATH = "./events.log"
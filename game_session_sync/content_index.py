@@ -0,0 +1,99 @@
+import hashlib
+import logging
+import threading
+from pathlib import Path
+
+
+def content_digest(data: bytes) -> bytes:
+    return hashlib.sha256(data).digest()
+
+
+class ContentIndex:
+    """Persistent map of the content digest of every uploaded file to its Drive id.
+
+    Stored as an append-only text file of `<hex digest> <drive file id> <drive
+    folder id>` lines, so recording an upload is a single short write that survives
+    a crash. The folder is recorded so the files of a trashed folder can be dropped.
+    Thread-safe; upload worker threads add to it directly.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._files: dict[bytes, str] = {}
+        # digest -> Drive folder the file was uploaded into, unknown for older lines
+        self._folders: dict[bytes, str] = {}
+        self.log = logging.getLogger(self.__class__.__name__)
+        self._load()
+
+    def _load(self):
+        try:
+            lines = self.path.read_text().splitlines()
+        except FileNotFoundError:
+            return
+        for line in lines:
+            try:
+                digest, file_id, *folder_id = line.split(" ", 2)
+                key = bytes.fromhex(digest)
+                self._files[key] = file_id
+                if folder_id:
+                    self._folders[key] = folder_id[0]
+            except ValueError:  # torn by a crash mid-write
+                self.log.warning(f"Skipping malformed line in {self.path}: {line!r}")
+        self.log.debug(f"Loaded {len(self._files)} content digests from {self.path}")
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def get(self, digest: bytes) -> str | None:
+        """Drive id of the file uploaded with this content, if any."""
+        return self._files.get(digest)
+
+    def add(self, digest: bytes, file_id: str, folder_id: str):
+        with self._lock:
+            if digest in self._files:
+                return
+            self._files[digest] = file_id
+            self._folders[digest] = folder_id
+            with self.path.open("a") as f:
+                f.write(f"{digest.hex()} {file_id} {folder_id}\n")
+
+    def has_folder(self, folder_id: str) -> bool:
+        """Whether any file was uploaded into this Drive folder."""
+        with self._lock:
+            return folder_id in self._folders.values()
+
+    def discard(self, digest: bytes):
+        """Forget a file which is gone from Drive, so its content is uploaded again."""
+        with self._lock:
+            if self._files.pop(digest, None) is None:
+                return
+            self._folders.pop(digest, None)
+            self._rewrite()
+
+    def discard_folder(self, folder_id: str) -> int:
+        """Forget the files uploaded into a trashed Drive folder, so their content is
+        uploaded again. Returns how many were forgotten."""
+        with self._lock:
+            digests = [d for d, f in self._folders.items() if f == folder_id]
+            if not digests:
+                return 0
+            for digest in digests:
+                del self._files[digest]
+                del self._folders[digest]
+            self._rewrite()
+        self.log.info(f"Forgot {len(digests)} content digests of folder {folder_id}")
+        return len(digests)
+
+    def _rewrite(self):
+        # rewritten in full, which is rare: only files gone from Drive are dropped
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(
+            "".join(
+                f"{d.hex()} {file_id}"
+                + (f" {self._folders[d]}" if d in self._folders else "")
+                + "\n"
+                for d, file_id in self._files.items()
+            )
+        )
+        tmp.replace(self.path)
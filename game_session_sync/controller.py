@@ -0,0 +1,109 @@
+import asyncio
+import logging
+from asyncio import Event
+from typing import TYPE_CHECKING, Callable
+
+from .events import SessionEvent
+from .session_machine import Effect, EffectKind, SessionMachine, coalesce
+from .types import Subscription
+
+if TYPE_CHECKING:
+    from .session import Session
+    from .uploader import Uploader
+
+
+class SessionController:
+    """Single consumer of session events, applying the effects of `SessionMachine`.
+
+    Sessions and the uploader are injected, so the controller runs with stubs off
+    Windows (see `game_session_sync.replay`).
+    """
+
+    def __init__(
+        self,
+        events: Subscription[SessionEvent],
+        session_factory: "Callable[[str], Session]",
+        uploader: "Uploader",
+    ) -> None:
+        self.events = events
+        self.session_factory = session_factory
+        self.uploader = uploader
+
+        self.machine = SessionMachine()
+        self.active_session: "Session | None" = None
+        self._session_task: asyncio.Task | None = None
+        # titles with a session provisioned since their game last closed
+        self._provisioned: set[str] = set()
+        self._stop_event = Event()
+        self.log = logging.getLogger(self.__class__.__name__)
+
+    async def _apply(self, effect: Effect, tg: asyncio.TaskGroup):
+        kind = effect.kind
+        if kind is EffectKind.PAUSE:
+            self._pause_session()
+
+        elif kind is EffectKind.START:
+            assert effect.title is not None
+            await self.uploader.stop(cancel=True)
+            self._provision(effect.title, tg)
+            if self.active_session is not None and self.active_session.is_active:
+                self.log.warning(
+                    "Starting a new session while existing one hasn't been paused"
+                )
+                self._pause_session()
+            if self.active_session is not None:
+                tg.create_task(self.active_session.close())
+            self.active_session = self.session_factory(effect.title)
+            self._session_task = tg.create_task(self.active_session.run())
+
+        elif kind is EffectKind.RESUME:
+            if self.active_session is not None:
+                await self.uploader.stop(cancel=True)
+                # relaunching the game after a close resumes its session
+                self._provision(self.active_session.title, tg)
+                self._session_task = tg.create_task(self.active_session.run())
+
+        elif kind is EffectKind.UPLOAD:
+            assert effect.title is not None
+            self.uploader.close_provision(effect.title)
+            self._provisioned.discard(effect.title)
+            # the game was closed; a later resume re-acquires capture resources
+            if self.active_session is not None:
+                tg.create_task(self.active_session.close())
+            tg.create_task(self.uploader.upload())
+
+    def _provision(self, title: str, tg: asyncio.TaskGroup):
+        # Notion page and Drive folder are created during play, off the upload path
+        if title not in self._provisioned:
+            self._provisioned.add(title)
+            tg.create_task(self.uploader.provision(title))
+
+    def _pause_session(self):
+        if self.active_session is not None and self.active_session.is_active:
+            self.active_session.stop()
+        # started or resumed in the same batch, before the session got to run
+        elif self._session_task is not None:
+            self._session_task.cancel()
+
+    async def run(self):
+        self._stop_event.clear()
+        # Task groups propagate errors instead of being isolated in Task objects
+        # when creating them with asyncio.create_task
+        async with asyncio.TaskGroup() as tg:
+            while not self._stop_event.is_set():
+                # drain everything queued while the previous effects were applied,
+                # so bursts of events resolve to their net effect
+                events = [await self.events.get()]
+                while not self.events.empty():
+                    events.append(self.events.get_nowait())
+
+                effects: list[Effect] = []
+                for event in events:
+                    effects.extend(self.machine.feed(event))
+                for effect in coalesce(effects):
+                    await self._apply(effect, tg)
+
+            self._pause_session()
+
+    def stop(self):
+        self._stop_event.set()
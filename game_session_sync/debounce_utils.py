@@ -0,0 +1,188 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class _KeyState:
+    args: tuple[Any, ...]
+    window_start: float
+    deadline: float
+    handle: asyncio.TimerHandle | None = None
+    pending: bool = False
+
+
+class KeyedDebouncer(Generic[K]):
+    """Debounce (or throttle) calls to `callback` independently per key.
+
+    Every key owns a single `loop.call_at` timer which is lazily re-armed when it fires
+    early, so a burst of calls costs a few attribute writes instead of a task per call.
+    Key state is dropped once its window closes, and the oldest key is flushed when
+    more than `max_keys` keys are tracked at once.
+
+    - `leading`: invoke on the first call of a window.
+    - `trailing`: invoke with the latest arguments once `wait_sec` passed without calls.
+    - `max_wait_sec`: upper bound on how long a trailing invocation can be postponed.
+
+    `callback` must be synchronous, and calls must be made from the event loop thread
+    (use `loop.call_soon_threadsafe` from other threads).
+    """
+
+    def __init__(
+        self,
+        callback: Callable[..., Any],
+        wait_sec: float,
+        *,
+        leading: bool = False,
+        trailing: bool = True,
+        max_wait_sec: float | None = None,
+        max_keys: int = 256,
+        loop: asyncio.AbstractEventLoop | None = None,
+    ) -> None:
+        if not (leading or trailing):
+            raise ValueError("At least one of leading or trailing must be enabled")
+        if max_wait_sec is not None and max_wait_sec < wait_sec:
+            raise ValueError("max_wait_sec must be greater than or equal to wait_sec")
+        self.callback = callback
+        self.wait_sec = wait_sec
+        self.leading = leading
+        self.trailing = trailing
+        self.max_wait_sec = max_wait_sec
+        self.max_keys = max_keys
+        self._loop = loop
+        self._states: dict[K, _KeyState] = {}
+
+    @classmethod
+    def throttle(
+        cls, callback: Callable[..., Any], wait_sec: float, **kwargs: Any
+    ) -> "KeyedDebouncer[K]":
+        """Invoke at most once per `wait_sec` per key, on both edges."""
+        kwargs.setdefault("leading", True)
+        kwargs.setdefault("trailing", True)
+        return cls(callback, wait_sec, max_wait_sec=wait_sec, **kwargs)
+
+    def __call__(self, key: K, *args: Any) -> None:
+        loop = self._loop or asyncio.get_running_loop()
+        self._loop = loop
+        now = loop.time()
+
+        state = self._states.get(key)
+        if state is None:
+            state = _KeyState(args, now, now + self.wait_sec)
+            self._states[key] = state
+            state.handle = loop.call_at(state.deadline, self._on_timer, key)
+            if self.leading:
+                self._invoke(state)
+            else:
+                state.pending = True
+            if len(self._states) > self.max_keys:
+                self.flush(next(iter(self._states)))
+            return
+
+        state.args = args
+        state.pending = True
+        deadline = now + self.wait_sec
+        if self.max_wait_sec is not None:
+            deadline = min(deadline, state.window_start + self.max_wait_sec)
+        # NOTE: the timer is not re-armed here; _on_timer reschedules itself if it
+        #       fires before the (possibly postponed) deadline
+        state.deadline = deadline
+
+    def _invoke(self, state: _KeyState) -> None:
+        state.pending = False
+        try:
+            self.callback(*state.args)
+        except Exception:
+            log.exception(f"Debounced callback {self.callback!r} failed")
+
+    def _on_timer(self, key: K) -> None:
+        state = self._states.get(key)
+        if state is None:
+            return
+        assert self._loop is not None
+        now = self._loop.time()
+        if state.deadline > now:
+            state.handle = self._loop.call_at(state.deadline, self._on_timer, key)
+            return
+
+        if not (self.trailing and state.pending):
+            del self._states[key]
+            return
+        self._invoke(state)
+        if self.leading:
+            # open a quiet window, so a call right after a trailing invocation
+            # doesn't immediately trigger a leading one
+            state.window_start = now
+            state.deadline = now + self.wait_sec
+            state.handle = self._loop.call_at(state.deadline, self._on_timer, key)
+        else:
+            del self._states[key]
+
+    def is_pending(self, key: K) -> bool:
+        state = self._states.get(key)
+        return state is not None and state.pending
+
+    def flush(self, key: K) -> None:
+        """Run a pending trailing invocation of `key` now and forget its state."""
+        state = self._states.pop(key, None)
+        if state is None:
+            return
+        if state.handle:
+            state.handle.cancel()
+        if self.trailing and state.pending:
+            self._invoke(state)
+
+    def cancel(self, key: K | None = None) -> None:
+        """Drop pending invocations of `key`, or of all keys when `key` is None."""
+        keys = list(self._states) if key is None else [key]
+        for k in keys:
+            state = self._states.pop(k, None)
+            if state and state.handle:
+                state.handle.cancel()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+
+# poetry run python -m game_session_sync.debounce_utils
+async def _bench():
+    import random
+    import time
+
+    NUM_KEYS = 64
+    NUM_CALLS = 200_000
+
+    calls = 0
+
+    def callback(*_):
+        nonlocal calls
+        calls += 1
+
+    rng = random.Random(0)
+    keys = [rng.randrange(NUM_KEYS) for _ in range(NUM_CALLS)]
+    for name, debouncer in (
+        ("debounce", KeyedDebouncer(callback, 0.05)),
+        ("debounce+max_wait", KeyedDebouncer(callback, 0.05, max_wait_sec=0.1)),
+        ("throttle", KeyedDebouncer.throttle(callback, 0.05)),
+    ):
+        calls = 0
+        start = time.perf_counter()
+        for i, key in enumerate(keys):
+            debouncer(key, key, i)
+            if i % 1000 == 0:
+                await asyncio.sleep(0)  # let timers fire
+        elapsed = time.perf_counter() - start
+        await asyncio.sleep(0.2)
+        print(
+            f"{name:>18}: {NUM_CALLS / elapsed:,.0f} calls/sec, "
+            f"{calls} invocations, {len(debouncer)} keys left"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(_bench())
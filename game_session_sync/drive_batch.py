@@ -0,0 +1,121 @@
+import asyncio
+import logging
+from collections import Counter
+from typing import Any, Callable
+
+from googleapiclient.http import BatchHttpRequest, HttpRequest
+
+# Drive rejects batches of more than 100 calls
+DRIVE_BATCH_MAX = 100
+# how long the first queued request waits for others to share its batch
+DRIVE_BATCH_DELAY_SEC = 0.05
+
+
+class DriveBatcher:
+    """Groups Drive metadata requests issued around the same time into one
+    multipart `batch` HTTP call.
+
+    `execute()` queues a request and returns its own result, or raises its own
+    error (usually `HttpError`), as if the request was executed alone. The queue is
+    flushed once it holds `max_size` requests, or `max_delay_sec` after the first
+    one was queued. A lone request is sent as is, rather than wrapped in a batch.
+
+    Media uploads can't be batched; this is for folders, permissions, listings and
+    trashing. HTTP calls are reported to `count` by endpoint name.
+    """
+
+    def __init__(
+        self,
+        new_batch: Callable[[], BatchHttpRequest],
+        get_http: Callable[[], Any],
+        count: Callable[[str], None],
+        timeout_sec: float,
+        max_size: int = DRIVE_BATCH_MAX,
+        max_delay_sec: float = DRIVE_BATCH_DELAY_SEC,
+    ) -> None:
+        self.new_batch = new_batch
+        self.get_http = get_http
+        self.count = count
+        self.timeout_sec = timeout_sec
+        self.max_size = max_size
+        self.max_delay_sec = max_delay_sec
+
+        self._pending: list[tuple[HttpRequest, str, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        # strong references to the batches in flight, which nothing else awaits
+        self._flush_tasks: set[asyncio.Task] = set()
+        self.log = logging.getLogger(self.__class__.__name__)
+
+    async def execute(self, request: HttpRequest, name: str) -> Any:
+        """Queue `request` (counted as `name` if it ends up sent alone)."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((request, name, future))
+        if len(self._pending) >= self.max_size:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay_sec, self._schedule_flush)
+        # the batch is shared, so a cancelled caller doesn't cancel it
+        return await asyncio.shield(future)
+
+    def _schedule_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, self._pending = self._pending, []
+        if not items:
+            return
+        task = asyncio.create_task(self._flush(items))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush(self, items: list[tuple[HttpRequest, str, asyncio.Future]]):
+        # callbacks run in the worker thread; futures are resolved back on the loop
+        results: dict[str, tuple[Any, BaseException | None]] = {}
+
+        def f():
+            http = self.get_http()
+            if len(items) == 1:
+                request, _, _ = items[0]
+                try:
+                    results["0"] = request.execute(http=http), None
+                except Exception as e:
+                    results["0"] = None, e
+                return
+
+            def callback(request_id: str, response: Any, exception: Exception | None):
+                results[request_id] = response, exception
+
+            batch = self.new_batch()
+            for i, (request, _, _) in enumerate(items):
+                batch.add(request, callback=callback, request_id=str(i))
+            batch.execute(http=http)
+
+        if len(items) == 1:
+            self.count(items[0][1])
+        else:
+            self.count("drive.batch")
+            self.log.debug(
+                f"Drive batch of {len(items)}: "
+                + ", ".join(
+                    f"{k}={v}" for k, v in Counter(n for _, n, _ in items).items()
+                )
+            )
+        try:
+            await asyncio.wait_for(asyncio.to_thread(f), self.timeout_sec)
+        except Exception as e:
+            # the batch itself failed, so did every request in it
+            for _, _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for i, (_, _, future) in enumerate(items):
+            if future.done():
+                continue
+            response, exception = results.get(
+                str(i), (None, RuntimeError("Missing response in Drive batch"))
+            )
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(response)
@@ -0,0 +1,69 @@
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+
+from .events import (
+    BaseInputEvent,
+    EventBus,
+    GameCloseEvent,
+    GameFullscreenEvent,
+    GameMinimizedEvent,
+    InputActiveEvent,
+    InputIdleEvent,
+    SessionEvent,
+)
+
+# One line per event: "<epoch milliseconds>\t<code>[\t<title>]"
+_CODES: dict[type, str] = {
+    GameFullscreenEvent: "F",
+    GameMinimizedEvent: "M",
+    GameCloseEvent: "C",
+    InputIdleEvent: "I",
+    InputActiveEvent: "A",
+}
+_TYPES = {code: event_type for event_type, code in _CODES.items()}
+
+
+def event_time(event: SessionEvent) -> datetime:
+    return event.timestamp if isinstance(event, BaseInputEvent) else event.time
+
+
+def encode_event(event: SessionEvent) -> str:
+    epoch_ms = round(event_time(event).timestamp() * 1000)
+    code = _CODES[type(event)]
+    if isinstance(event, BaseInputEvent):
+        return f"{epoch_ms}\t{code}\n"
+    return f"{epoch_ms}\t{code}\t{event.title}\n"
+
+
+def decode_event(line: str) -> SessionEvent:
+    epoch_ms, code, *title = line.rstrip("\n").split("\t", 2)
+    time = datetime.fromtimestamp(int(epoch_ms) / 1000, timezone.utc).astimezone()
+    event_type = _TYPES[code]
+    if title:
+        return event_type(title[0], time)
+    return event_type(time)
+
+
+def read_events(path: Path) -> Iterator[SessionEvent]:
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield decode_event(line)
+
+
+class EventRecorder:
+    """Appends every event published on the bus to a compact, line based file."""
+
+    def __init__(self, queue: EventBus, path: Path) -> None:
+        self.path = path
+        self._events = queue.subscribe(self.__class__.__name__)
+        self.log = logging.getLogger(self.__class__.__name__)
+
+    async def run(self):
+        self.log.info(f"Recording events to {str(self.path)!r}")
+        # line buffered: each event reaches the OS as soon as it's written
+        with self.path.open("a", encoding="utf-8", buffering=1) as f:
+            while True:
+                f.write(encode_event(await self._events.get()))
@@ -0,0 +1,64 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TypeAlias
+
+from .types import PubSubBus
+
+
+# NOTE: a new Field per use; dataclasses rename a shared Field object to the last
+#       attribute it was assigned to
+def _now_field():
+    return field(default_factory=lambda: datetime.now().astimezone())
+
+
+@dataclass(slots=True)
+class BaseWindowEvent:
+    title: str
+    time: datetime = _now_field()
+
+
+@dataclass(slots=True)
+class BaseInputEvent:
+    timestamp: datetime = _now_field()
+
+
+# NOTE: Not in use as there's no prep work to do before starting a session
+# @dataclass(slots=True)
+# class WindowOpenEvent(BaseWindowEvent):
+#     pass
+
+
+@dataclass(slots=True)
+class GameMinimizedEvent(BaseWindowEvent):
+    pass
+
+
+@dataclass(slots=True)
+class GameFullscreenEvent(BaseWindowEvent):
+    pass
+
+
+@dataclass(slots=True)
+class GameCloseEvent(BaseWindowEvent):
+    pass
+
+
+@dataclass(slots=True)
+class InputIdleEvent(BaseInputEvent):
+    pass
+
+
+@dataclass(slots=True)
+class InputActiveEvent(BaseInputEvent):
+    pass
+
+
+SessionEvent: TypeAlias = (
+    GameMinimizedEvent
+    | GameFullscreenEvent
+    | GameCloseEvent
+    | InputIdleEvent
+    | InputActiveEvent
+)
+
+EventBus: TypeAlias = PubSubBus[SessionEvent]
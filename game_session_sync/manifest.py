@@ -0,0 +1,99 @@
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from .content_index import content_digest
+from .naming_utils import datetime_to_epoch_ms
+
+# Every session stages its captures in a directory of its own (see session_dirname)
+# holding, besides the captures:
+# - one manifest line per capture, appended by the session once it's fully written
+MANIFEST_FILENAME = "manifest.tsv"
+# - one filename per line of captures the uploader is done with: uploaded, skipped
+#   as duplicates or discarded
+DONE_FILENAME = "done.txt"
+# - an empty file, created once the session stopped writing to the directory
+CLOSED_FILENAME = "closed"
+
+
+@dataclass(frozen=True, slots=True)
+class ManifestEntry:
+    name: str  # capture filename in the session directory
+    epoch_ms: int
+    manual: bool
+    size: int
+    digest: bytes | None  # see content_digest, None when unknown
+
+    def to_line(self) -> str:
+        kind = "manual" if self.manual else "auto"
+        digest = "-" if self.digest is None else self.digest.hex()
+        return f"{self.epoch_ms}\t{kind}\t{self.size}\t{digest}\t{self.name}\n"
+
+    @classmethod
+    def parse(cls, line: str) -> "ManifestEntry":
+        epoch_ms, kind, size, digest, name = line.split("\t", 4)
+        return cls(
+            name,
+            int(epoch_ms),
+            kind == "manual",
+            int(size),
+            None if digest == "-" else bytes.fromhex(digest),
+        )
+
+
+def read_new_lines(path: Path, offset: int) -> tuple[list[str], int]:
+    """Lines appended to `path` past byte `offset`, and the offset to read on from.
+
+    A trailing partial line is being written, and is left for the next read.
+    """
+    try:
+        with path.open("rb") as f:
+            f.seek(offset)
+            raw = f.read()
+    except FileNotFoundError:
+        return [], offset
+    end = raw.rfind(b"\n") + 1
+    return raw[:end].decode("utf-8").splitlines(), offset + end
+
+
+class SessionManifest:
+    """Appends the manifest of a session staging directory, see MANIFEST_FILENAME.
+
+    Thread-safe; manual screenshots are added from the watchdog observer thread.
+    """
+
+    def __init__(self, dir: Path) -> None:
+        self.dir = dir
+        self.path = dir / MANIFEST_FILENAME
+        self._lock = threading.Lock()
+
+    def append(self, entry: ManifestEntry):
+        with self._lock:
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(entry.to_line())
+
+    def add(
+        self,
+        path: Path,
+        captured_at: datetime,
+        manual: bool,
+        data: bytes | None = None,
+    ):
+        """Record a capture fully written to `path`, whose bytes are `data` if known
+        (blocking, hashes the capture and reads it unless given)."""
+        if data is None:
+            data = path.read_bytes()
+        self.append(
+            ManifestEntry(
+                path.name,
+                datetime_to_epoch_ms(captured_at),
+                manual,
+                len(data),
+                content_digest(data),
+            )
+        )
+
+    def close(self):
+        """Mark the directory as complete: nothing is captured into it anymore."""
+        (self.dir / CLOSED_FILENAME).touch()
@@ -0,0 +1,91 @@
+import logging
+import queue
+from abc import ABC, abstractmethod
+from typing import Callable
+
+# https://learn.microsoft.com/en-us/windows/win32/api/winuser/nf-winuser-msgwaitformultipleobjectsex
+MWMO_INPUTAVAILABLE = 0x0004
+
+
+class MessageLoop(ABC):
+    """Blocking message loop of a producer thread.
+
+    `run()` dispatches messages on the calling thread until `stop()` is called from any
+    thread. Implementations must block while idle instead of polling.
+    """
+
+    @abstractmethod
+    def run(self) -> None:
+        pass
+
+    @abstractmethod
+    def stop(self) -> None:
+        pass
+
+
+class Win32MessageLoop(MessageLoop):
+    """Waits on both the thread message queue and a stop event handle, so WinEvent hook
+    callbacks are dispatched as soon as they arrive and an idle thread never wakes up.
+    """
+
+    def __init__(self) -> None:
+        import win32event
+
+        # manual reset: a stop() before run() still ends the loop immediately
+        self._stop_handle = win32event.CreateEvent(None, True, False, None)
+        self.log = logging.getLogger(self.__class__.__name__)
+
+    def run(self) -> None:
+        import win32event
+        import win32gui
+
+        while True:
+            # MWMO_INPUTAVAILABLE also wakes up for messages which were already
+            # in the queue (but not yet removed) when the wait started
+            rc = win32event.MsgWaitForMultipleObjectsEx(
+                [self._stop_handle],
+                win32event.INFINITE,
+                win32event.QS_ALLINPUT,
+                MWMO_INPUTAVAILABLE,
+            )
+            if rc == win32event.WAIT_OBJECT_0:
+                return
+            if rc == win32event.WAIT_OBJECT_0 + 1:
+                if win32gui.PumpWaitingMessages():  # WM_QUIT
+                    return
+                continue
+            raise RuntimeError(
+                f"Unexpected return value for win32event.MsgWaitForMultipleObjectsEx: {rc}"
+            )
+
+    def stop(self) -> None:
+        import win32event
+
+        win32event.SetEvent(self._stop_handle)
+
+
+class FakeMessageLoop(MessageLoop):
+    """Platform independent stand-in which dispatches callables posted with `post()`."""
+
+    _STOP = object()
+
+    def __init__(self) -> None:
+        self._queue: queue.SimpleQueue[Callable[[], None] | object] = (
+            queue.SimpleQueue()
+        )
+        self.dispatched = 0
+
+    def post(self, message: Callable[[], None]) -> None:
+        self._queue.put(message)
+
+    def run(self) -> None:
+        while True:
+            message = self._queue.get()
+            if message is FakeMessageLoop._STOP:
+                return
+            assert callable(message)
+            message()
+            self.dispatched += 1
+
+    def stop(self) -> None:
+        self._queue.put(FakeMessageLoop._STOP)
@@ -1,38 +1,100 @@
 import re
-from datetime import datetime
+from datetime import datetime, timezone, tzinfo
+from functools import lru_cache
 from zoneinfo import ZoneInfo
 
 
-def screenshot_filename(
-    title: str, suffix: str, zoneinfo: ZoneInfo, manual: bool = False
-):
-    timestamp = datetime.now(zoneinfo)
+def _timestamp_str(zoneinfo: ZoneInfo, now: datetime | None) -> str:
+    timestamp = datetime.now(zoneinfo) if now is None else now.astimezone(zoneinfo)
     timestamp_str = timestamp.strftime("%Y.%m.%d %H.%M.%S.%f")[
         :-3
     ]  # keep 3 digits = milliseconds
     offset = timestamp.strftime("%z")
+    return f"{timestamp_str} {offset}"
+
+
+def screenshot_filename(
+    title: str,
+    suffix: str,
+    zoneinfo: ZoneInfo,
+    manual: bool = False,
+    now: datetime | None = None,
+):
     manual_str = "manual" if manual else "auto"
-    filename = f"{title} {timestamp_str} {offset} {manual_str}{suffix}"
+    filename = f"{title} {_timestamp_str(zoneinfo, now)} {manual_str}{suffix}"
     return filename
 
 
+def session_dirname(title: str, zoneinfo: ZoneInfo, now: datetime | None = None):
+    """Name of the staging directory of a session of `title` starting `now`."""
+    return f"{title} {_timestamp_str(zoneinfo, now)}"
+
+
+_TIMESTAMP_PATTERN = (
+    r"(\d{4}\.\d{2}\.\d{2}) (\d{2})\.(\d{2})\.(\d{2})\.(\d{3}) ([+-]\d{4})"
+)
+_SCREENSHOT_FILENAME_RE = re.compile(rf"^(.+?) {_TIMESTAMP_PATTERN} (manual|auto)(.+)$")
+_SESSION_DIRNAME_RE = re.compile(rf"^(.+?) {_TIMESTAMP_PATTERN}$")
+
+
+@lru_cache(maxsize=1024)
+def _day_epoch_ms(date_str: str, offset: str) -> int:
+    """Unix epoch milliseconds of midnight of a local date at a UTC offset."""
+    return (
+        int(datetime.strptime(f"{date_str} {offset}", "%Y.%m.%d %z").timestamp()) * 1000
+    )
+
+
+def _epoch_ms(
+    date_str: str, hour: str, minute: str, second: str, ms: str, offset: str
+) -> int:
+    time_ms = ((int(hour) * 60 + int(minute)) * 60 + int(second)) * 1000 + int(ms)
+    return _day_epoch_ms(date_str, offset) + time_ms
+
+
+def parse_screenshot_epoch_ms(filename: str) -> tuple[str, int] | None:
+    """Title and Unix epoch milliseconds of a screenshot filename.
+
+    The fast path for batches: a `datetime` is parsed once per day and offset, not
+    once per file.
+    """
+    matches = _SCREENSHOT_FILENAME_RE.match(filename)
+    if not matches:
+        return None
+    return matches.group(1), _epoch_ms(*matches.groups()[1:7])
+
+
+def parse_session_dirname(dirname: str) -> tuple[str, int] | None:
+    """Title and start in Unix epoch milliseconds of a session staging directory."""
+    matches = _SESSION_DIRNAME_RE.match(dirname)
+    if not matches:
+        return None
+    return matches.group(1), _epoch_ms(*matches.groups()[1:])
+
+
+def epoch_ms_to_datetime(epoch_ms: int, tz: tzinfo = timezone.utc) -> datetime:
+    seconds, ms = divmod(epoch_ms, 1000)
+    return datetime.fromtimestamp(seconds, tz).replace(microsecond=ms * 1000)
+
+
+def datetime_to_epoch_ms(dt: datetime) -> int:
+    """Unix epoch milliseconds of an aware datetime, truncated like filenames are."""
+    return int(dt.replace(microsecond=0).timestamp()) * 1000 + dt.microsecond // 1000
+
+
 def parse_screenshot_filename(
     filename: str, zoneinfo: ZoneInfo
 ) -> tuple[str, datetime] | None:
-    matches = re.match(
-        r"^(.+?) (\d{4}\.\d{2}\.\d{2} \d{2}\.\d{2}\.\d{2}\.\d{3}) ([+-]\d{4}) (manual|auto)(.+)$",
-        filename,
-    )
-    if not matches:
+    parsed = parse_screenshot_epoch_ms(filename)
+    if not parsed:
         return None
+    title, epoch_ms = parsed
+    return title, epoch_ms_to_datetime(epoch_ms, zoneinfo)
 
-    title, timestamp_str, offset, manual_flag, suffix = matches.groups()
 
-    timestamp_str = timestamp_str + "000"
-    timestamp = datetime.strptime(
-        f"{timestamp_str} {offset}", "%Y.%m.%d %H.%M.%S.%f %z"
-    ).astimezone(zoneinfo)
-    return title, timestamp
+def is_manual_screenshot(filename: str) -> bool:
+    matches = _SCREENSHOT_FILENAME_RE.match(filename)
+    return matches is not None and matches.group(8) == "manual"
 
 
 def build_session_name(title: str, start: datetime, zoneinfo: ZoneInfo) -> str:
@@ -41,12 +103,3 @@ def build_session_name(title: str, start: datetime, zoneinfo: ZoneInfo) -> str:
     Example: "Some Game 2024-03-14 21_45"
     """
     return f"{title} {start.astimezone(zoneinfo).strftime('%Y-%m-%d %H_%M')}"
-
-
-# def session_dirname(title: str, start: datetime, end: datetime | None = None):
-#     start_str = start.strftime("%Y.%m.%d - %H.%M.%S")
-#     end_str = ""
-#     if end is not None:
-#         end_str = " - " + end.strftime("%Y.%m.%d - %H.%M.%S")
-#     dirname = f"{title} {start_str}{end_str}"
-#     return dirname
@@ -1,6 +1,7 @@
-from datetime import datetime
+from collections.abc import Sized
 from pathlib import Path
 from random import Random
+from typing import Generic, Hashable, TypeVar
 
 from win11toast import notify, update_progress
 
@@ -8,6 +9,8 @@ from .constants import APP_NAME, LOG_PATH
 
 _rng = Random(42)
 
+K = TypeVar("K", bound=Hashable)
+
 
 def _plural(sequence, name: str):
     suffix = "" if len(sequence) == 1 else "s"
@@ -28,42 +31,46 @@ def notify_init():
     )
 
 
-class ProgressNotifier:
-    def __init__(self, clusters: list[tuple[str, list[tuple[Path, datetime]]]]) -> None:
-        self._num_sessions: int = len(clusters)
-        self._session_names: list[str] = [c[0] for c in clusters]
-        self._session_idx: int = 0
+class ProgressNotifier(Generic[K]):
+    """Upload progress toast. Files of different sessions are uploaded in any order,
+    so progress is tracked per session, by the keys of `sessions`."""
+
+    def __init__(self, sessions: dict[K, tuple[str, Sized]]) -> None:
+        self._num_sessions: int = len(sessions)
+        self._session_names: dict[K, str] = {k: s[0] for k, s in sessions.items()}
+        self._files_left: dict[K, int] = {k: len(s[1]) for k, s in sessions.items()}
+        self._sessions_done: int = 0
+        # session of the last uploaded file
+        self._session: K = next(iter(sessions))
 
-        self._num_files = sum([len(c[1]) for c in clusters])
+        self._num_files = sum(self._files_left.values())
         self._files_uploaded: int = 0
 
         self._tag = f"game_sync_{_rng.randint(0, 0xFFFFFF):06x}"
 
         notify(
-            title=f"{APP_NAME}: Uploading {_plural(clusters, 'Session')}",
+            title=f"{APP_NAME}: Uploading {_plural(sessions, 'Session')}",
             progress=self._build_progress_dict(),
             tag=self._tag,
         )
 
     def _build_progress_dict(self):
         return {
-            "title": f"{self._session_idx+1}/{self._num_sessions} {self._session_names[self._session_idx]}",
+            "title": f"{self._sessions_done}/{self._num_sessions} {self._session_names[self._session]}",
             "status": "Uploading...",
             "value": self._files_uploaded / self._num_files,
             "valueStringOverride": f"{self._files_uploaded}/{self._num_files}",
         }
 
     def _update_progress(self):
-        if self._session_idx == self._num_sessions:  # avoid out of bound indexing
-            return
         update_progress(progress=self._build_progress_dict(), tag=self._tag)
 
-    def increment_files(self, num_files: int):
+    def increment_files(self, session: K, num_files: int):
+        self._session = session
         self._files_uploaded += num_files
-        self._update_progress()
-
-    def increment_session(self):
-        self._session_idx += 1
+        self._files_left[session] -= num_files
+        if not self._files_left[session]:
+            self._sessions_done += 1
         self._update_progress()
 
     def finish(self):
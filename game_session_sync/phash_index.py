@@ -0,0 +1,140 @@
+import logging
+import threading
+from array import array
+from itertools import combinations
+from pathlib import Path
+
+# a 64-bit hash is split into this many 16-bit chunks, each indexed on its own
+_NUM_CHUNKS = 4
+_CHUNK_BITS = 64 // _NUM_CHUNKS
+_CHUNK_MASK = (1 << _CHUNK_BITS) - 1
+
+
+def _chunk_neighbors(value: int, radius: int) -> list[int]:
+    """Every chunk value within `radius` bit flips of `value`."""
+    out = [value]
+    for r in range(1, radius + 1):
+        for bits in combinations(range(_CHUNK_BITS), r):
+            flipped = value
+            for b in bits:
+                flipped ^= 1 << b
+            out.append(flipped)
+    return out
+
+
+class PHashIndex:
+    """Persistent set of 64-bit perceptual hashes with Hamming radius queries.
+
+    Multi-index hashing: every hash is filed under each of its four 16-bit chunks.
+    Two hashes within distance `r` agree to within `r // 4` bits on at least one
+    chunk (pigeonhole), so a query only verifies the hashes filed under the
+    neighbors of its own chunks, instead of scanning them all.
+
+    Stored as an append-only file of little-endian uint64s. Thread-safe.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._buckets: list[dict[int, array]] = [{} for _ in range(_NUM_CHUNKS)]
+        self._size = 0
+        self.log = logging.getLogger(self.__class__.__name__)
+        self._load()
+
+    def _load(self):
+        try:
+            raw = self.path.read_bytes()
+        except FileNotFoundError:
+            return
+        hashes = array("Q")
+        # a trailing partial hash is left by a crash mid-write
+        hashes.frombytes(raw[: len(raw) - len(raw) % hashes.itemsize])
+        for h in hashes:
+            self._insert(h)
+        self.log.debug(f"Loaded {self._size} hashes from {self.path}")
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _insert(self, h: int):
+        for i, buckets in enumerate(self._buckets):
+            key = (h >> (i * _CHUNK_BITS)) & _CHUNK_MASK
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = array("Q", (h,))
+            else:
+                bucket.append(h)
+        self._size += 1
+
+    def nearest(self, h: int, radius: int) -> tuple[int, int] | None:
+        """The stored hash closest to `h` and its distance, if within `radius`."""
+        chunk_radius = radius // _NUM_CHUNKS
+        best: tuple[int, int] | None = None
+        with self._lock:
+            for i, buckets in enumerate(self._buckets):
+                key = (h >> (i * _CHUNK_BITS)) & _CHUNK_MASK
+                for neighbor in _chunk_neighbors(key, chunk_radius):
+                    for candidate in buckets.get(neighbor, ()):
+                        distance = (candidate ^ h).bit_count()
+                        if distance <= radius and (best is None or distance < best[1]):
+                            if distance == 0:
+                                return candidate, 0
+                            best = candidate, distance
+        return best
+
+    def add(self, h: int):
+        with self._lock:
+            self._insert(h)
+            with self.path.open("ab") as f:
+                f.write(array("Q", (h,)).tobytes())
+
+
+# poetry run python -m game_session_sync.phash_index
+def _bench():
+    import random
+    import tempfile
+    import time
+
+    NUM_HASHES = 1_000_000
+    NUM_QUERIES = 1_000
+    RADIUS = 8
+    rng = random.Random(0)
+
+    def near(h: int, distance: int) -> int:
+        for b in rng.sample(range(64), distance):
+            h ^= 1 << b
+        return h
+
+    # frames of a title cluster around a few thousand distinct scenes
+    scenes = [rng.getrandbits(64) for _ in range(5_000)]
+    hashes = [near(rng.choice(scenes), rng.randint(0, 12)) for _ in range(NUM_HASHES)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.phash"
+        path.write_bytes(array("Q", hashes).tobytes())
+        start = time.perf_counter()
+        index = PHashIndex(path)
+        print(f"load {len(index):,} hashes: {time.perf_counter() - start:.2f}s")
+
+        queries = [
+            near(rng.choice(hashes), rng.randint(0, 12)) for _ in range(NUM_QUERIES)
+        ]
+        start = time.perf_counter()
+        found = [index.nearest(q, RADIUS) for q in queries]
+        elapsed = time.perf_counter() - start
+        print(
+            f"index: {NUM_QUERIES / elapsed:,.0f} queries/sec (radius {RADIUS}), "
+            f"{sum(f is not None for f in found)} matched"
+        )
+
+        # brute force check on a sample
+        start = time.perf_counter()
+        for q, f in zip(queries[:20], found[:20]):
+            best = min((h ^ q).bit_count() for h in hashes)
+            assert (f is None) == (best > RADIUS) and (f is None or f[1] == best)
+        elapsed = (time.perf_counter() - start) / 20
+        print(f"linear scan: {1 / elapsed:,.1f} queries/sec, results match")
+
+
+if __name__ == "__main__":
+    _bench()
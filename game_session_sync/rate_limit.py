@@ -0,0 +1,120 @@
+import threading
+import time
+from typing import BinaryIO
+
+# longest single sleep while waiting for tokens, so rate changes apply promptly
+_MAX_WAIT_SLICE_SEC = 0.5
+
+
+class TokenBucket:
+    """Thread-safe byte-rate limiter shared by every upload worker thread.
+
+    `consume()` blocks the calling thread until the bytes fit the rate. A request
+    larger than the bucket goes through once the bucket isn't in debt and is paid
+    back before the next one, so the average rate holds for any chunk size.
+    A `rate` of None disables limiting, but bytes are still counted.
+    """
+
+    def __init__(
+        self, rate: float | None = None, burst_bytes: int = 256 * 1024
+    ) -> None:
+        self._rate = rate
+        self.burst_bytes = burst_bytes
+        self._tokens = float(burst_bytes)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        # bytes let through since creation, for measuring achieved throughput
+        self.total_bytes = 0
+
+    @property
+    def rate(self) -> float | None:
+        return self._rate
+
+    @rate.setter
+    def rate(self, rate: float | None) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self._rate = rate
+
+    def _refill(self, now: float) -> None:
+        if self._rate is None:
+            self._tokens = float(self.burst_bytes)
+        else:
+            self._tokens = min(
+                float(self.burst_bytes), self._tokens + (now - self._last) * self._rate
+            )
+        self._last = now
+
+    def consume(self, n: int) -> None:
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._rate is None or self._tokens >= 0:
+                    self._tokens -= n
+                    self.total_bytes += n
+                    return
+                wait = -self._tokens / self._rate
+            time.sleep(min(wait, _MAX_WAIT_SLICE_SEC))
+
+    def expected_sec(self, n: int) -> float:
+        """Lower bound on the time it takes `n` bytes through at the current rate."""
+        rate = self._rate
+        return 0.0 if rate is None else n / rate
+
+
+class ThrottledReader:
+    """Binary file wrapper which takes every read through a `TokenBucket`.
+
+    Upload clients read one chunk right before sending it, so this paces the upload
+    stream at chunk granularity.
+    """
+
+    def __init__(self, fd: BinaryIO, bucket: TokenBucket) -> None:
+        self._fd = fd
+        self._bucket = bucket
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._fd.read(size)
+        self._bucket.consume(len(data))
+        return data
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self._fd.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._fd.tell()
+
+    def close(self) -> None:
+        self._fd.close()
+
+
+# poetry run python -m game_session_sync.rate_limit
+def _bench():
+    import io
+    from concurrent.futures import ThreadPoolExecutor
+
+    RATE = 4 * 1024**2
+    CHUNK = 256 * 1024
+    NUM_WORKERS = 6
+    FILE_BYTES = 2 * 1024**2
+
+    bucket = TokenBucket(RATE)
+
+    def upload(_):
+        reader = ThrottledReader(io.BytesIO(bytes(FILE_BYTES)), bucket)
+        while reader.read(CHUNK):
+            pass
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(NUM_WORKERS) as pool:
+        list(pool.map(upload, range(NUM_WORKERS * 2)))
+    elapsed = time.perf_counter() - start
+    print(
+        f"target {RATE / 1024**2:.1f} MiB/s, "
+        f"achieved {bucket.total_bytes / elapsed / 1024**2:.2f} MiB/s "
+        f"over {elapsed:.1f}s with {NUM_WORKERS} workers"
+    )
+
+
+if __name__ == "__main__":
+    _bench()
@@ -0,0 +1,157 @@
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from collections import Counter
+from pathlib import Path
+
+from .controller import SessionController
+from .event_recorder import event_time, read_events
+from .events import EventBus, SessionEvent
+from .session_machine import Effect, SessionMachine
+from .types import OverflowPolicy
+
+
+class StubSession:
+    def __init__(self, title: str, stats: Counter[str]) -> None:
+        self.title = title
+        self.is_active = False
+        self._stats = stats
+        self._stop_event = asyncio.Event()
+
+    async def run(self):
+        if self.is_active:
+            return
+        self._stats["session_runs"] += 1
+        self.is_active = True
+        self._stop_event.clear()
+        await self._stop_event.wait()
+
+    def stop(self):
+        self._stats["session_stops"] += 1
+        self.is_active = False
+        self._stop_event.set()
+
+    async def close(self):
+        self.stop()
+
+
+class StubUploader:
+    def __init__(self, upload_sec: float, stats: Counter[str]) -> None:
+        self.upload_sec = upload_sec
+        self._stats = stats
+        self._upload_task: asyncio.Task | None = None
+
+    async def upload(self):
+        self._stats["uploads"] += 1
+        if not self._upload_task or self._upload_task.done():
+            self._upload_task = asyncio.create_task(asyncio.sleep(self.upload_sec))
+        try:
+            await self._upload_task
+        except asyncio.CancelledError:
+            self._stats["cancelled_uploads"] += 1
+
+    async def stop(self, cancel: bool = False):
+        if self._upload_task and not self._upload_task.done():
+            self._upload_task.cancel()
+
+    async def provision(self, title: str):
+        self._stats["provisions"] += 1
+
+    def close_provision(self, title: str):
+        pass
+
+
+class _TimedMachine(SessionMachine):
+    """Records the latency from publish until the controller consumes each event."""
+
+    __slots__ = ("published", "latencies", "effects")
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.published: dict[int, float] = {}
+        self.latencies: list[float] = []
+        self.effects: Counter[str] = Counter()
+
+    def feed(self, event: SessionEvent) -> list[Effect]:
+        self.latencies.append(time.perf_counter() - self.published.pop(id(event)))
+        effects = super().feed(event)
+        self.effects.update(e.kind.name for e in effects)
+        return effects
+
+
+async def replay(
+    events: list[SessionEvent], speed: float | None, upload_sec: float = 5
+) -> dict[str, float]:
+    """Publish recorded `events` into a `SessionController` backed by stubs.
+
+    `speed` scales the recorded inter-event delays (1 = real time), or None to
+    publish as fast as the controller consumes.
+    """
+    stats: Counter[str] = Counter()
+    bus: EventBus = EventBus()
+    subscription = bus.subscribe(
+        SessionController.__name__,
+        policy=OverflowPolicy.MERGE,
+        merge_key=lambda e: (type(e), getattr(e, "title", None)),
+    )
+    controller = SessionController(
+        subscription,
+        lambda title: StubSession(title, stats),  # type: ignore[arg-type,return-value]
+        StubUploader(upload_sec / (speed or 1), stats),  # type: ignore[arg-type]
+    )
+    machine = controller.machine = _TimedMachine()
+    task = asyncio.create_task(controller.run())
+
+    start = time.perf_counter()
+    prev = None
+    for event in events:
+        t = event_time(event)
+        if speed is not None and prev is not None:
+            await asyncio.sleep(max(0, (t - prev).total_seconds() / speed))
+        prev = t
+        machine.published[id(event)] = time.perf_counter()
+        bus.publish(event)
+        await asyncio.sleep(0)
+    while not subscription.empty():
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)  # let the controller apply the last batch
+    elapsed = time.perf_counter() - start
+
+    controller.stop()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    latencies = machine.latencies or [0.0]
+    return {
+        "events": len(events),
+        "consumed": len(machine.latencies),
+        "elapsed_sec": elapsed,
+        "events_per_sec": len(events) / elapsed if elapsed else float("inf"),
+        "latency_p50_ms": statistics.median(latencies) * 1000,
+        "latency_max_ms": max(latencies) * 1000,
+        **{f"effect_{k.lower()}": v for k, v in machine.effects.items()},
+        **stats,
+    }
+
+
+# poetry run python -m game_session_sync.replay events.log --speed 100
+def _main():
+    parser = argparse.ArgumentParser(description="Replay a recorded event stream")
+    parser.add_argument("path", type=Path)
+    parser.add_argument(
+        "--speed", type=float, default=None, help="e.g. 1, 60 (default: max speed)"
+    )
+    parser.add_argument("--upload-sec", type=float, default=5)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    events = list(read_events(args.path))
+    result = asyncio.run(replay(events, args.speed, args.upload_sec))
+    for k, v in result.items():
+        print(f"{k:>20}: {v:,.3f}" if isinstance(v, float) else f"{k:>20}: {v:,}")
+
+
+if __name__ == "__main__":
+    _main()
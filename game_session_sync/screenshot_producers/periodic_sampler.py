@@ -1,47 +1,87 @@
 import asyncio
-import time
 from pathlib import Path
 from zoneinfo import ZoneInfo
 
 import mss
+import mss.base
 import mss.tools
 
+from ..clock import SYSTEM_CLOCK, Clock
+from ..manifest import SessionManifest
 from ..naming_utils import screenshot_filename
 from ..types import Producer
 
 
 # TODO: Switch to DXcam and turbojpeg
 class PeriodicSampler(Producer):
+    """Periodic full-desktop capture.
+
+    The mss context (device contexts and the frame buffer it reuses while the
+    resolution doesn't change) is kept warm across `stop()`/`run()` cycles and only
+    dropped by `release()`. Captures are recorded in `manifest`, if given.
+    """
+
     def __init__(
-        self, interval_sec: int, target_dir: Path, title: str, tz: ZoneInfo
+        self,
+        interval_sec: int,
+        target_dir: Path,
+        title: str,
+        tz: ZoneInfo,
+        clock: Clock = SYSTEM_CLOCK,
+        manifest: SessionManifest | None = None,
     ) -> None:
         self.interval_sec = interval_sec
         self.target_dir = target_dir
         self.title = title
         self.tz = tz
+        self.clock = clock
+        self.manifest = manifest
+        self._sct: mss.base.MSSBase | None = None
+
+    def _capture(self, dst_path: Path) -> bytes | None:
+        """Write a capture to `dst_path`, and return its bytes."""
+        if self._sct is None:
+            self._sct = mss.mss()
+        # TODO: select the monitor based on the game (fullscreen) window
+        sct_img = self._sct.grab(self._sct.monitors[0])  # all monitors combined
+        self.log.info(f"Took screenshot: {sct_img.size}")
+        png = mss.tools.to_png(sct_img.rgb, sct_img.size)
+        assert png is not None
+        dst_path.write_bytes(png)
+        return png
 
     async def run(self):
-        next_time = time.perf_counter()
-        with mss.mss() as sct:
-            while not self._stop_event.is_set():
-                # TODO: select the monitor based on the game (fullscreen) window
-                sct_img = sct.grab(sct.monitors[0])  # all monitors combined
-                self.log.info(f"Took screenshot: {sct_img.size}")
-                dct_path = self.target_dir / screenshot_filename(
-                    self.title, ".png", self.tz
-                )
-                mss.tools.to_png(sct_img.rgb, sct_img.size, output=dct_path)
-
-                # sct.grab and to_png are slow and require drift handling
-                next_time += self.interval_sec
-                sleep = next_time - time.perf_counter()
-                if sleep < 0:
-                    next_time = time.perf_counter()  # reset if too late
-                    sleep = self.interval_sec
-                try:
-                    await asyncio.wait_for(self._stop_event.wait(), sleep)
-                except asyncio.TimeoutError:
-                    continue
+        next_time = self.clock.monotonic()
+        while not self._stop_event.is_set():
+            now = self.clock.now(self.tz)
+            dst_path = self.target_dir / screenshot_filename(
+                self.title, ".png", self.tz, now=now
+            )
+            data = self._capture(dst_path)
+            if self.manifest is not None:
+                # hashing a multi-MB capture would stall the loop
+                await asyncio.to_thread(self.manifest.add, dst_path, now, False, data)
+
+            # sct.grab and to_png are slow and require drift handling
+            next_time += self.interval_sec
+            sleep = next_time - self.clock.monotonic()
+            if sleep < 0:
+                next_time = self.clock.monotonic()  # reset if too late
+                sleep = self.interval_sec
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), sleep)
+            except asyncio.TimeoutError:
+                continue
+
+    def retarget(self, target_dir: Path, manifest: SessionManifest | None):
+        self.target_dir = target_dir
+        self.manifest = manifest
+
+    def release(self):
+        if self._sct is not None:
+            self.log.info("Releasing capture context")
+            self._sct.close()
+            self._sct = None
 
 
 if __name__ == "__main__":
@@ -1,30 +1,63 @@
 import asyncio
 import logging
 import os
-from asyncio import Event
+import time
 from pathlib import Path
 from zoneinfo import ZoneInfo
 
 from watchdog.events import FileSystemEvent, FileSystemEventHandler
 from watchdog.observers import Observer
+from watchdog.observers.api import BaseObserver
 
-from ..naming_utils import screenshot_filename
+from ..clock import SYSTEM_CLOCK, Clock
+from ..manifest import ManifestEntry, SessionManifest
+from ..naming_utils import datetime_to_epoch_ms, screenshot_filename
 from ..types import Producer
 
+# the screenshot tool may still be writing a file when it's created
+SETTLE_POLL_SEC = 0.25
+SETTLE_TIMEOUT_SEC = 10
+
 
 class _FileWatcherHandler(FileSystemEventHandler):
-    def __init__(self, target_dir: Path, title: str, tz: ZoneInfo) -> None:
+    def __init__(
+        self,
+        target_dir: Path,
+        title: str,
+        tz: ZoneInfo,
+        clock: Clock,
+        manifest: SessionManifest | None,
+    ) -> None:
         super().__init__()
         self.target_dir = target_dir
+        self.manifest = manifest
         self.title = title
         self.tz = tz
+        # NOTE: used from the observer thread, so it must not depend on the loop
+        self.clock = clock
+        # flipped by ScreenshotWatcher instead of (un)scheduling the observer
+        self.enabled = False
         self.log = logging.getLogger(self.__class__.__name__)
 
     # NOTE: on_closed does not actually provide any events in Windows for my use case
     # def on_closed(self, event: FileClosedEvent) -> None:
 
+    def _wait_until_written(self, path: Path) -> bool:
+        """Block until the size and mtime of `path` stop changing. Real time, as the
+        file is written by another process."""
+        deadline = time.monotonic() + SETTLE_TIMEOUT_SEC
+        prev = None
+        while time.monotonic() < deadline:
+            st = path.stat()
+            current = (st.st_size, st.st_mtime_ns)
+            if st.st_size and current == prev:
+                return True
+            prev = current
+            time.sleep(SETTLE_POLL_SEC)
+        return False
+
     def on_created(self, event: FileSystemEvent) -> None:
-        if event.is_directory:
+        if not self.enabled or event.is_directory:
             return
 
         # watchdog may supply bytes on some backends; normalize to str.
@@ -34,33 +67,72 @@ class _FileWatcherHandler(FileSystemEventHandler):
             self.log.warning(f"Manual screenshot with unexpected suffix: {src_path!r}")
             return
 
+        now = self.clock.now()
+        settled = self._wait_until_written(src_path)
+        if not settled:
+            self.log.warning(
+                f"Still being written after {SETTLE_TIMEOUT_SEC}s: {src_path!r}"
+            )
         dst_path = self.target_dir / screenshot_filename(
-            self.title, src_path.suffix, self.tz, manual=True
+            self.title, src_path.suffix, self.tz, manual=True, now=now
         )
         self.log.info(f"Moving: {src_path!r} ---> {dst_path!r}")
         src_path.rename(dst_path)
+        if self.manifest is None:
+            return
+        if settled:
+            self.manifest.add(dst_path, now, manual=True)
+        else:
+            # no digest, so the uploader hashes what it actually uploads
+            self.manifest.append(
+                ManifestEntry(
+                    dst_path.name,
+                    datetime_to_epoch_ms(now),
+                    True,
+                    dst_path.stat().st_size,
+                    None,
+                )
+            )
 
 
 class ScreenshotWatcher(Producer):
     def __init__(
-        self, source_dir: Path, target_dir: Path, title: str, tz: ZoneInfo
+        self,
+        source_dir: Path,
+        target_dir: Path,
+        title: str,
+        tz: ZoneInfo,
+        clock: Clock = SYSTEM_CLOCK,
+        manifest: SessionManifest | None = None,
     ) -> None:
         self.source_dir = source_dir
-        self.target_dir = target_dir
         self.title = title
         self.tz = tz
-        self._stop_evt = Event()
+        self._handler = _FileWatcherHandler(target_dir, title, tz, clock, manifest)
+        self._observer: BaseObserver | None = None
 
-    # wrap observer start and stop with async semantics
+    # the observer thread and its watch outlive run(), which only gates the handler
     async def run(self):
-        event_handler = _FileWatcherHandler(self.target_dir, self.title, self.tz)
-        observer = Observer()
-        observer.schedule(event_handler, str(self.source_dir), recursive=True)
+        if self._observer is None:
+            self._observer = Observer()
+            self._observer.schedule(self._handler, str(self.source_dir), recursive=True)
+            self._observer.start()
 
-        observer.start()
+        self._handler.enabled = True
         try:
-            await self._stop_evt.wait()
+            await self._stop_event.wait()
         finally:
+            self._handler.enabled = False
+
+    def retarget(self, target_dir: Path, manifest: SessionManifest | None):
+        # only while the handler is disabled, so a capture doesn't straddle both
+        self._handler.target_dir = target_dir
+        self._handler.manifest = manifest
+
+    async def release(self):
+        if self._observer is not None:
+            self.log.info("Releasing observer")
+            observer, self._observer = self._observer, None
             observer.stop()
             await asyncio.to_thread(observer.join)
 
@@ -1,39 +1,100 @@
-from asyncio import TaskGroup
+from asyncio import Event, TaskGroup
 from zoneinfo import ZoneInfo
 
+import psutil
+
+from .clock import SYSTEM_CLOCK, Clock
 from .config import SessionConfig
+from .manifest import SessionManifest
+from .naming_utils import session_dirname
 from .screenshot_producers import *
-from .windows_producers import *
+
+# trim warm capture buffers on pause when system memory usage is at least this high
+MEMORY_PRESSURE_PERCENT = 90
 
 
 class Session:
-    def __init__(self, title: str, s_config: SessionConfig, tz: ZoneInfo) -> None:
+    """A game session, paused and resumed any number of times until closed.
+
+    Capture resources (the mss context and the watchdog observer) are created on the
+    first `run()` and kept warm while paused, so pause/resume only flips gates.
+    They're released by `close()`, or the capture context alone on memory pressure.
+
+    Captures are staged in a directory of their own, named by the session start and
+    listed in its manifest (see `game_session_sync.manifest`). `close()` marks the
+    directory complete; a session resumed after that stages into a new directory.
+    """
+
+    def __init__(
+        self,
+        title: str,
+        s_config: SessionConfig,
+        tz: ZoneInfo,
+        clock: Clock = SYSTEM_CLOCK,
+    ) -> None:
         self.title = title
         self.s_config = s_config
         self.tz = tz
+        self.clock = clock
         self.is_active: bool = False
-
-    async def run(self):
-        if self.is_active:
-            return
+        self._manifest: SessionManifest | None = None
         self._screenshot_sampler = PeriodicSampler(
             self.s_config.screenshot_interval_sec,
             self.s_config.screenshot_staging_path,
             self.title,
             self.tz,
+            clock,
         )
         self._screenshot_watcher = ScreenshotWatcher(
             self.s_config.screenshot_watch_path,
             self.s_config.screenshot_staging_path,
             self.title,
             self.tz,
+            clock,
         )
+        self._idle = Event()
+        self._idle.set()
+
+    async def run(self):
+        if self.is_active:
+            return
         self.is_active = True
-        async with TaskGroup() as tg:
-            tg.create_task(self._screenshot_sampler.run())
-            tg.create_task(self._screenshot_watcher.run())
+        # producers are reused, so the previous run must wind down first
+        await self._idle.wait()
+        if not self.is_active:  # paused while waiting
+            return
+        if self._manifest is None:
+            self._open_staging_dir()
+        self._idle.clear()
+        try:
+            async with TaskGroup() as tg:
+                tg.create_task(self._screenshot_sampler.run())
+                tg.create_task(self._screenshot_watcher.run())
+        finally:
+            self._idle.set()
+
+    def _open_staging_dir(self):
+        staging_dir = self.s_config.screenshot_staging_path / session_dirname(
+            self.title, self.tz, self.clock.now(self.tz)
+        )
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        self._manifest = SessionManifest(staging_dir)
+        self._screenshot_sampler.retarget(staging_dir, self._manifest)
+        self._screenshot_watcher.retarget(staging_dir, self._manifest)
 
     def stop(self):
         self._screenshot_sampler.stop()
         self._screenshot_watcher.stop()
         self.is_active = False
+        if psutil.virtual_memory().percent >= MEMORY_PRESSURE_PERCENT:
+            self._screenshot_sampler.release()
+
+    async def close(self):
+        # a run() from now on stages into a new directory
+        manifest, self._manifest = self._manifest, None
+        self.stop()
+        self._screenshot_sampler.release()
+        await self._screenshot_watcher.release()
+        # after the observer thread is joined, so no capture lands in it anymore
+        if manifest is not None:
+            manifest.close()
@@ -0,0 +1,150 @@
+from dataclasses import dataclass
+from enum import Enum, auto
+from typing import Iterable
+
+from .events import (
+    GameCloseEvent,
+    GameFullscreenEvent,
+    GameMinimizedEvent,
+    InputActiveEvent,
+    InputIdleEvent,
+    SessionEvent,
+)
+
+
+class EffectKind(Enum):
+    START = auto()  # replace the current session with a new running one
+    PAUSE = auto()
+    RESUME = auto()
+    UPLOAD = auto()
+
+
+@dataclass(frozen=True, slots=True)
+class Effect:
+    kind: EffectKind
+    title: str | None = None
+
+
+_PAUSE = Effect(EffectKind.PAUSE)
+_RESUME = Effect(EffectKind.RESUME)
+
+
+class SessionMachine:
+    """Pure session controller: events in, effects out, no I/O and no awaiting.
+
+    - `GameFullscreenEvent` starts a session of its title, or resumes it.
+    - `GameMinimizedEvent` and `InputIdleEvent` pause the active session, but only
+      an idle pause is resumed by `InputActiveEvent`.
+    - `GameCloseEvent` of the current title pauses it and requests an upload. The
+      upload effect carries the title of the closed game.
+    """
+
+    __slots__ = ("title", "active", "idle_paused")
+
+    def __init__(self) -> None:
+        self.title: str | None = None
+        self.active = False
+        self.idle_paused = False
+
+    def feed(self, event: SessionEvent) -> list[Effect]:
+        if isinstance(event, InputIdleEvent):
+            if self.active:
+                self.active, self.idle_paused = False, True
+                return [_PAUSE]
+
+        elif isinstance(event, InputActiveEvent):
+            if self.idle_paused:
+                self.active, self.idle_paused = True, False
+                return [_RESUME]
+
+        elif isinstance(event, GameFullscreenEvent):
+            self.idle_paused = False
+            if self.title == event.title:
+                if self.active:
+                    return []
+                self.active = True
+                return [_RESUME]
+            effects = [_PAUSE] if self.active else []
+            self.title, self.active = event.title, True
+            effects.append(Effect(EffectKind.START, event.title))
+            return effects
+
+        elif isinstance(event, GameMinimizedEvent):
+            self.idle_paused = False
+            if self.active:
+                self.active = False
+                return [_PAUSE]
+
+        elif isinstance(event, GameCloseEvent):
+            upload = Effect(EffectKind.UPLOAD, event.title)
+            if event.title != self.title:
+                # another game is being played; its own close triggers the upload
+                return [] if self.active else [upload]
+            self.idle_paused = False
+            if self.active:
+                self.active = False
+                return [_PAUSE, upload]
+            return [upload]
+
+        return []
+
+
+def coalesce(effects: Iterable[Effect]) -> list[Effect]:
+    """Reduce the effects of a batch of events to the minimal equivalent sequence.
+
+    Pause/resume pairs cancel out, and an upload is dropped when a session is
+    started or resumed after it (it would be stopped right away). Consecutive
+    uploads for the same title are merged.
+    """
+    out: list[Effect] = []
+    for effect in effects:
+        kind = effect.kind
+        if kind in (EffectKind.START, EffectKind.RESUME):
+            out = [e for e in out if e.kind is not EffectKind.UPLOAD]
+        if out:
+            last = out[-1].kind
+            if (kind, last) in (
+                (EffectKind.RESUME, EffectKind.PAUSE),
+                (EffectKind.PAUSE, EffectKind.RESUME),
+            ):
+                out.pop()
+                continue
+            if kind is EffectKind.UPLOAD and out[-1] == effect:
+                continue
+        out.append(effect)
+    return out
+
+
+# poetry run python -m game_session_sync.session_machine
+# (property tests of the machine and coalesce() are in tests/test_session_machine.py)
+def _bench():
+    import random
+    import time
+
+    TITLES = ["A", "B", "C"]
+    NUM_EVENTS = 1_000_000
+    rng = random.Random(0)
+
+    def random_event() -> SessionEvent:
+        r = rng.random()
+        if r < 0.4:
+            return GameFullscreenEvent(rng.choice(TITLES))
+        if r < 0.55:
+            return GameMinimizedEvent(rng.choice(TITLES))
+        if r < 0.65:
+            return GameCloseEvent(rng.choice(TITLES))
+        if r < 0.8:
+            return InputIdleEvent()
+        return InputActiveEvent()
+
+    events = [random_event() for _ in range(NUM_EVENTS)]
+    machine = SessionMachine()
+    start = time.perf_counter()
+    for event in events:
+        machine.feed(event)
+    elapsed = time.perf_counter() - start
+    print(f"bench: {NUM_EVENTS / elapsed:,.0f} transitions/sec")
+
+
+if __name__ == "__main__":
+    _bench()
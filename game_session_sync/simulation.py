@@ -0,0 +1,251 @@
+import argparse
+import asyncio
+import logging
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable
+
+from .clock import LoopClock, run_virtual
+from .controller import SessionController
+from .events import (
+    EventBus,
+    GameCloseEvent,
+    GameFullscreenEvent,
+    GameMinimizedEvent,
+    InputActiveEvent,
+    InputIdleEvent,
+    SessionEvent,
+)
+from .screenshot_producers import PeriodicSampler
+from .types import OverflowPolicy
+
+MB = 1024**2
+GB = 1024**3
+
+
+@dataclass(frozen=True)
+class SimulationConfig:
+    days: int = 7
+    titles: tuple[str, ...] = ("Game A", "Game B", "Game C")
+    sessions_per_day: float = 1.5
+    mean_session_hours: float = 1.5
+    screenshot_interval_sec: int = 20
+    input_idle_sec: int = 120
+    frame_bytes: int = 4 * MB  # 1440p PNG
+    uplink_bytes_per_sec: float = 2.5 * MB  # ~20 Mbit/s
+    seed: int = 0
+
+
+class _SimSampler(PeriodicSampler):
+    """The real sampling loop (drift handling, stop semantics) minus the capture."""
+
+    def __init__(self, stats: Counter[str], frame_bytes: int, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self._stats = stats
+        self._frame_bytes = frame_bytes
+
+    def _capture(self, dst_path: Path) -> bytes | None:
+        self._stats["captures"] += 1
+        self._stats["disk_bytes"] += self._frame_bytes
+        self._stats["backlog_bytes"] += self._frame_bytes
+        self._stats["max_backlog_bytes"] = max(
+            self._stats["max_backlog_bytes"], self._stats["backlog_bytes"]
+        )
+        return None
+
+
+class _SimSession:
+    def __init__(self, title: str, sampler: PeriodicSampler) -> None:
+        self.title = title
+        self.is_active = False
+        self._sampler = sampler
+
+    async def run(self):
+        if self.is_active:
+            return
+        self.is_active = True
+        await self._sampler.run()
+
+    def stop(self):
+        self._sampler.stop()
+        self.is_active = False
+
+    async def close(self):
+        self.stop()
+
+
+class _SimUploader:
+    def __init__(self, stats: Counter[str], config: SimulationConfig) -> None:
+        self._stats = stats
+        self._config = config
+        self._upload_task: asyncio.Task | None = None
+
+    async def _upload(self):
+        file_sec = self._config.frame_bytes / self._config.uplink_bytes_per_sec
+        while self._stats["backlog_bytes"] > 0:
+            await asyncio.sleep(file_sec)
+            self._stats["upload_sec"] += file_sec
+            self._stats["backlog_bytes"] -= self._config.frame_bytes
+            self._stats["uploaded_bytes"] += self._config.frame_bytes
+
+    async def upload(self):
+        if not self._upload_task or self._upload_task.done():
+            self._upload_task = asyncio.create_task(self._upload())
+        try:
+            await self._upload_task
+        except asyncio.CancelledError:
+            pass
+
+    async def stop(self, cancel: bool = False):
+        if self._upload_task and not self._upload_task.done():
+            self._upload_task.cancel()
+
+    async def provision(self, title: str):
+        pass
+
+    def close_provision(self, title: str):
+        pass
+
+
+def _player_schedule(
+    config: SimulationConfig, now: Callable[[float], datetime]
+) -> list[tuple[float, SessionEvent]]:
+    """A deterministic stream of (seconds since start, event) for a casual player."""
+    rng = random.Random(config.seed)
+    schedule: list[tuple[float, SessionEvent]] = []
+
+    def add(t: float, event_type, *args):
+        schedule.append((t, event_type(*args, now(t))))
+
+    for day in range(config.days):
+        num_sessions = min(3, int(rng.expovariate(1 / config.sessions_per_day)))
+        for start_hour in sorted(rng.uniform(10, 23) for _ in range(num_sessions)):
+            t = day * 86400 + start_hour * 3600
+            end = t + rng.expovariate(1 / config.mean_session_hours) * 3600
+            title = rng.choice(config.titles)
+            add(t, GameFullscreenEvent, title)
+            while t < end:
+                t += rng.expovariate(1 / 1200)  # something happens every ~20 min
+                if rng.random() < 0.5:  # alt-tab
+                    add(t, GameMinimizedEvent, title)
+                    t += rng.uniform(10, 600)
+                    add(t, GameFullscreenEvent, title)
+                else:  # AFK
+                    away = rng.uniform(60, 1800)
+                    if away > config.input_idle_sec:
+                        add(t + config.input_idle_sec, InputIdleEvent)
+                        add(t + away, InputActiveEvent)
+                    t += away
+            add(t, GameCloseEvent, title)
+    schedule.sort(key=lambda v: v[0])
+    return schedule
+
+
+async def simulate(config: SimulationConfig) -> dict[str, float]:
+    """Play `config.days` of scripted sessions through a `SessionController`.
+
+    Must run on a `VirtualTimeLoop` (see `run_virtual`) to finish in seconds.
+    """
+    stats: Counter[str] = Counter()
+    clock = LoopClock(datetime(2024, 1, 1, tzinfo=timezone.utc))
+    schedule = _player_schedule(config, lambda t: clock.epoch + timedelta(seconds=t))
+
+    bus: EventBus = EventBus()
+    controller = SessionController(
+        bus.subscribe(
+            SessionController.__name__,
+            policy=OverflowPolicy.MERGE,
+            merge_key=lambda e: (type(e), getattr(e, "title", None)),
+        ),
+        lambda title: _SimSession(  # type: ignore[arg-type,return-value]
+            title,
+            _SimSampler(
+                stats,
+                config.frame_bytes,
+                interval_sec=config.screenshot_interval_sec,
+                target_dir=Path("."),
+                title=title,
+                tz=timezone.utc,
+                clock=clock,
+            ),
+        ),
+        _SimUploader(stats, config),  # type: ignore[arg-type]
+    )
+    task = asyncio.create_task(controller.run())
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    active_since: float | None = None
+    for t, event in schedule:
+        await asyncio.sleep(start + t - loop.time())
+        bus.publish(event)
+        await asyncio.sleep(0)  # let the controller apply it
+        if controller.machine.active and active_since is None:
+            active_since = loop.time()
+        elif not controller.machine.active and active_since is not None:
+            stats["play_sec"] += loop.time() - active_since
+            active_since = None
+        stats["events"] += 1
+
+    # drain the upload backlog
+    while stats["backlog_bytes"] > 0:
+        await asyncio.sleep(60)
+    stats["simulated_sec"] = loop.time() - start
+    controller.stop()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    play_hours = stats["play_sec"] / 3600 or float("nan")
+    return {
+        "simulated_days": stats["simulated_sec"] / 86400,
+        "events": stats["events"],
+        "play_hours": stats["play_sec"] / 3600,
+        "captures": stats["captures"],
+        "captures_per_play_hour": stats["captures"] / play_hours,
+        "disk_gb": stats["disk_bytes"] / GB,
+        "disk_mb_per_play_hour": stats["disk_bytes"] / MB / play_hours,
+        "uploaded_gb": stats["uploaded_bytes"] / GB,
+        "upload_hours": stats["upload_sec"] / 3600,
+        "max_backlog_gb": stats["max_backlog_bytes"] / GB,
+    }
+
+
+# poetry run python -m game_session_sync.simulation --days 7
+def _main():
+    parser = argparse.ArgumentParser(description="Virtual-time capacity simulation")
+    parser.add_argument("--days", type=int, default=SimulationConfig.days)
+    parser.add_argument(
+        "--interval-sec", type=int, default=SimulationConfig.screenshot_interval_sec
+    )
+    parser.add_argument(
+        "--frame-mb", type=float, default=SimulationConfig.frame_bytes / MB
+    )
+    parser.add_argument(
+        "--uplink-mbps",
+        type=float,
+        default=SimulationConfig.uplink_bytes_per_sec * 8 / 1e6,
+    )
+    parser.add_argument("--seed", type=int, default=SimulationConfig.seed)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    config = SimulationConfig(
+        days=args.days,
+        screenshot_interval_sec=args.interval_sec,
+        frame_bytes=int(args.frame_mb * MB),
+        uplink_bytes_per_sec=args.uplink_mbps * 1e6 / 8,
+        seed=args.seed,
+    )
+    start = time.perf_counter()
+    result = run_virtual(simulate(config))
+    for k, v in result.items():
+        print(f"{k:>24}: {v:,.2f}")
+    print(f"{'real_sec':>24}: {time.perf_counter() - start:,.2f}")
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,224 @@
+import json
+import logging
+from dataclasses import dataclass, field
+from operator import itemgetter
+from pathlib import Path
+from typing import Any, Callable, Generic, Iterable, TypeVar
+
+S = TypeVar("S")
+
+
+@dataclass(eq=False, slots=True)
+class Cluster(Generic[S]):
+    """Staged screenshots of a title with no gap of minimum_session_gap_min between
+    them, i.e. the files of a single session."""
+
+    title: str
+    # staged capture key -> Unix epoch milliseconds, chronological
+    files: dict[str, int] = field(default_factory=dict)
+    # newest capture ever added, including those already uploaded
+    last_ms: int = 0
+    # set once the session of the cluster is found or created
+    session: S | None = None
+
+    @property
+    def start_ms(self) -> int:
+        return next(iter(self.files.values()))
+
+    @property
+    def end_ms(self) -> int:
+        return next(reversed(self.files.values()))
+
+
+class StagingClusters(Generic[S]):
+    """Gap clusters of the staged screenshots of each title, kept up to date between
+    upload runs instead of being rebuilt from the whole staging directory.
+
+    Captures are keyed by their path in the staging directory. `add()`ed ones extend
+    the open (newest) cluster of their title or start a new one, and `remove()`d
+    ones are dropped, so an upload run only handles the captures staged and done
+    since the previous one. A cluster keeps its session across runs, so it's
+    resolved once.
+
+    The session of the open cluster of each title is persisted as JSON, so after a
+    restart new captures continue it without querying Notion. Not thread-safe; the
+    uploader uses it from one upload run at a time.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        gap_ms: int,
+        session_to_json: Callable[[S], dict[str, Any]],
+        session_from_json: Callable[[dict[str, Any]], S],
+    ) -> None:
+        self.path = path
+        self.gap_ms = gap_ms
+        self.session_to_json = session_to_json
+        # staged capture key -> its cluster
+        self._known: dict[str, Cluster[S]] = {}
+        # clusters of each title by start; the last one is kept open even once empty
+        self._titles: dict[str, list[Cluster[S]]] = {}
+        # title -> session of its open cluster
+        self.open_sessions: dict[str, S] = {}
+        self.log = logging.getLogger(self.__class__.__name__)
+
+        try:
+            raw: dict[str, dict[str, Any]] = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            return
+        self.open_sessions = {t: session_from_json(s) for t, s in raw.items()}
+
+    def save(self):
+        self.path.write_text(
+            json.dumps(
+                {t: self.session_to_json(s) for t, s in self.open_sessions.items()}
+            )
+        )
+
+    def add(self, files: Iterable[tuple[str, str, int]]):
+        """Add staged captures as (key, title, Unix epoch milliseconds)."""
+        by_title: dict[str, list[tuple[str, int]]] = {}
+        for key, title, timestamp in files:
+            by_title.setdefault(title, []).append((key, timestamp))
+
+        for title, new_files in by_title.items():
+            new_files.sort(key=itemgetter(1))
+            clusters = self._titles.setdefault(title, [])
+            if clusters and new_files[0][1] < clusters[-1].last_ms:
+                # a capture older than the open cluster, e.g. moved back from trash
+                self._resplit(title, new_files)
+                continue
+            for key, timestamp in new_files:
+                if not clusters or timestamp - clusters[-1].last_ms >= self.gap_ms:
+                    clusters.append(Cluster(title))
+                    self._drop_empty(clusters)
+                cluster = clusters[-1]
+                cluster.files[key] = timestamp
+                cluster.last_ms = timestamp
+                self._known[key] = cluster
+
+    def remove(self, keys: Iterable[str]):
+        """Drop captures which are no longer staged (uploaded or discarded)."""
+        for key in keys:
+            self._remove(key)
+
+    def _remove(self, key: str):
+        cluster = self._known.pop(key, None)
+        if cluster is None:
+            return
+        del cluster.files[key]
+        if not cluster.files:
+            self._drop_empty(self._titles[cluster.title])
+
+    @staticmethod
+    def _drop_empty(clusters: list[Cluster[S]]):
+        clusters[:-1] = [c for c in clusters[:-1] if c.files]
+
+    def _resplit(self, title: str, new_files: list[tuple[str, int]]):
+        files = [
+            (key, timestamp)
+            for cluster in self._titles[title]
+            for key, timestamp in cluster.files.items()
+        ]
+        files.extend(new_files)
+        files.sort(key=itemgetter(1))
+
+        clusters: list[Cluster[S]] = []
+        for key, timestamp in files:
+            if not clusters or timestamp - clusters[-1].last_ms >= self.gap_ms:
+                clusters.append(Cluster(title))
+            cluster = clusters[-1]
+            # the first already resolved file of a cluster gives it its session
+            previous = self._known.get(key)
+            if cluster.session is None and previous is not None:
+                cluster.session = previous.session
+            cluster.files[key] = timestamp
+            cluster.last_ms = timestamp
+        for cluster in clusters:
+            for key in cluster.files:
+                self._known[key] = cluster
+        self._titles[title] = clusters
+
+    def clusters(self) -> list[Cluster[S]]:
+        """The clusters holding staged files, ordered by start."""
+        clusters = [c for cs in self._titles.values() for c in cs if c.files]
+        clusters.sort(key=lambda c: c.start_ms)
+        return clusters
+
+    def resolved(self, cluster: Cluster[S], session: S):
+        """Record the session of `cluster`; that of an open cluster is persisted by
+        the next `save()`."""
+        cluster.session = session
+        if cluster is self._titles[cluster.title][-1]:
+            self.open_sessions[cluster.title] = session
+
+    def forget(self, match: Callable[[S], bool]) -> bool:
+        """Unset the sessions `match` accepts (e.g. deleted ones), so their clusters
+        are resolved again. Returns whether an open session was forgotten."""
+        for clusters in self._titles.values():
+            for cluster in clusters:
+                if cluster.session is not None and match(cluster.session):
+                    cluster.session = None
+        forgotten = [t for t, s in self.open_sessions.items() if match(s)]
+        for title in forgotten:
+            del self.open_sessions[title]
+        return bool(forgotten)
+
+
+# poetry run python -m game_session_sync.staging_clusters
+def _bench():
+    import random
+    import tempfile
+    import time
+
+    NUM_FILES = 100_000
+    NEW_FILES = 100
+    GAP_MS = 15 * 60_000
+    rng = random.Random(0)
+
+    # sessions of a few titles, 20 sec apart, with an hour between sessions
+    files: list[tuple[str, str, int]] = []
+    t = 1_704_067_200_000
+    while len(files) < NUM_FILES:
+        title = f"Game {len(files) // 1000 % 3}"
+        for _ in range(1000):
+            files.append((f"{title} {t}/{t}.png", title, t))
+            t += 20_000
+        t += 3600_000
+    rng.shuffle(files)  # as listed from disk
+
+    with tempfile.TemporaryDirectory() as tmp:
+        staging = StagingClusters(Path(tmp) / "clusters.json", GAP_MS, str, str)
+        begin = time.perf_counter()
+        staging.add(files)
+        first = staging.clusters()
+        print(f"add {NUM_FILES:,} files: {time.perf_counter() - begin:.3f}s")
+
+        # a trickle run: the oldest cluster was uploaded, a few frames were captured
+        done = [key for key in first[0].files]
+        new = []
+        for _ in range(NEW_FILES):
+            new.append((f"Game 0 {t}/{t}.png", "Game 0", t))
+            t += 20_000
+        begin = time.perf_counter()
+        staging.remove(done)
+        staging.add(new)
+        clusters = staging.clusters()
+        print(
+            f"next run (-{len(done)} +{NEW_FILES} files): "
+            f"{(time.perf_counter() - begin) * 1000:.1f}ms, "
+            f"{len(first)} -> {len(clusters)} clusters"
+        )
+
+        fresh = StagingClusters(Path(tmp) / "fresh.json", GAP_MS, str, str)
+        done_keys = set(done)
+        fresh.add([f for f in files if f[0] not in done_keys] + new)
+        assert [(c.title, c.files) for c in fresh.clusters()] == [
+            (c.title, c.files) for c in clusters
+        ]
+        print("matches clustering from scratch")
+
+
+if __name__ == "__main__":
+    _bench()
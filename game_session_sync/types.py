@@ -2,8 +2,10 @@ import asyncio
 import logging
 from abc import ABC, abstractmethod
 from asyncio import Event
+from collections import deque
+from enum import Enum, auto
 from functools import wraps
-from typing import Generic, TypeVar, final
+from typing import Callable, Generic, Hashable, TypeVar, final
 
 
 class Producer(ABC):
@@ -54,20 +56,123 @@ class Producer(ABC):
 T = TypeVar("T")
 
 
-class LoggingQueue(asyncio.Queue[T], Generic[T]):
-    def __init__(self, maxsize: int = 0) -> None:
-        super().__init__(maxsize)
-        self._log = logging.getLogger(self.__class__.__name__)
-
-    async def put(self, item: T) -> None:
-        self._log.info(f"Putting: {item!r}")
-        return await super().put(item)
-
-    def put_nowait(self, item: T) -> None:
-        self._log.info(f"Putting: {item!r}")
-        return super().put_nowait(item)
+class OverflowPolicy(Enum):
+    DROP_OLDEST = auto()
+    DROP_NEWEST = auto()
+    # replace the newest queued item if it has the same merge key, else DROP_OLDEST
+    MERGE = auto()
+
+
+class Subscription(Generic[T]):
+    """Bounded, non-blocking-on-put queue of a single `PubSubBus` subscriber."""
+
+    def __init__(
+        self,
+        name: str,
+        types: tuple[type, ...],
+        maxsize: int,
+        policy: OverflowPolicy,
+        merge_key: Callable[[T], Hashable] | None,
+    ) -> None:
+        if policy is OverflowPolicy.MERGE and merge_key is None:
+            raise ValueError("OverflowPolicy.MERGE requires a merge_key")
+        self.name = name
+        self.types = types
+        self.maxsize = maxsize
+        self.policy = policy
+        self.merge_key = merge_key
+        self.dropped = 0
+        self.merged = 0
+        self._items: deque[T] = deque()
+        self._not_empty = Event()
+        self._log = logging.getLogger(f"{self.__class__.__name__}[{name}]")
+
+    def _offer(self, item: T) -> None:
+        items = self._items
+        if self.merge_key is not None and items:
+            if self.merge_key(items[-1]) == self.merge_key(item):
+                items[-1] = item
+                self.merged += 1
+                return
+        if len(items) >= self.maxsize:
+            self.dropped += 1
+            # sampled, a stuck subscriber would otherwise flood the log
+            if self.dropped & (self.dropped - 1) == 0:  # powers of 2
+                self._log.warning("Queue full, %d items dropped so far", self.dropped)
+            if self.policy is OverflowPolicy.DROP_NEWEST:
+                return
+            items.popleft()
+        items.append(item)
+        self._not_empty.set()
 
     async def get(self) -> T:
-        item = await super().get()
-        self._log.info(f"Getting: {item!r}")
+        while not self._items:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        return self.get_nowait()
+
+    def get_nowait(self) -> T:
+        if not self._items:
+            raise asyncio.QueueEmpty
+        item = self._items.popleft()
+        # lazily formatted: no repr() unless the record is actually emitted
+        self._log.debug("Getting: %r", item)
         return item
+
+    def empty(self) -> bool:
+        return not self._items
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+
+class PubSubBus(Generic[T]):
+    """Type-indexed publish/subscribe bus.
+
+    Every subscriber owns a bounded queue, so `publish()` never blocks on slow
+    consumers and events without subscribers are dropped without any work.
+    Must be used from the event loop thread.
+    """
+
+    def __init__(self) -> None:
+        self._subscriptions: list[Subscription[T]] = []
+        # concrete event type -> matching subscriptions, resolved on first publish
+        self._dispatch: dict[type, tuple[Subscription[T], ...]] = {}
+        self._log = logging.getLogger(self.__class__.__name__)
+
+    def subscribe(
+        self,
+        name: str,
+        *types: type,
+        maxsize: int = 1024,
+        policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        merge_key: Callable[[T], Hashable] | None = None,
+    ) -> Subscription[T]:
+        """Subscribe to events of `types` and their subclasses (all events if empty)."""
+        sub = Subscription(name, types, maxsize, policy, merge_key)
+        self._subscriptions.append(sub)
+        self._dispatch.clear()
+        return sub
+
+    def unsubscribe(self, sub: Subscription[T]) -> None:
+        self._subscriptions.remove(sub)
+        self._dispatch.clear()
+
+    def _resolve(self, event_type: type) -> tuple[Subscription[T], ...]:
+        subs = tuple(
+            s
+            for s in self._subscriptions
+            if not s.types or issubclass(event_type, s.types)
+        )
+        self._dispatch[event_type] = subs
+        return subs
+
+    def publish(self, event: T) -> None:
+        subs = self._dispatch.get(type(event))
+        if subs is None:
+            subs = self._resolve(type(event))
+        if not subs:
+            return
+        self._log.info("Publishing: %r", event)
+        for sub in subs:
+            sub._offer(event)
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import time
+from asyncio import Event
+from enum import Enum
+from typing import TYPE_CHECKING
+
+from .events import SessionEvent
+from .session_machine import SessionMachine
+from .types import Subscription
+
+if TYPE_CHECKING:
+    from .uploader import Uploader
+
+# how often a leftover backlog (failed or interrupted upload) is retried off-game
+UPLOAD_RETRY_SEC = 10 * 60
+# how often a trickle upload of the frames captured so far is started during play
+TRICKLE_INTERVAL_SEC = 2 * 60
+
+MB = 1024**2
+
+
+class UploadMode(Enum):
+    PLAY = "play"  # a session is capturing
+    IDLE = "idle"  # the session is paused by input idle
+    AWAY = "away"  # no game in the foreground
+
+
+class UploadScheduler:
+    """Drains the staging backlog whenever uploading costs the player nothing.
+
+    Uploads start on startup, when the input goes idle and while no game is in the
+    foreground, and are cancelled as soon as a session captures again. A backlog left
+    by a failed or interrupted upload is retried every `retry_sec` off-game.
+
+    Upload streams are capped to `rates[mode]` bytes/sec (None for unlimited), and
+    the throughput achieved by every run is logged.
+
+    During play, a throttled trickle upload (see `Uploader.upload`) of the frames
+    captured so far is started every `trickle_interval_sec`, so long sessions don't
+    leave hours of uploads behind.
+
+    The scheduler keeps its own `SessionMachine` fed from its own subscription, so it
+    agrees with `SessionController` on when a session is active without sharing state.
+    """
+
+    def __init__(
+        self,
+        events: Subscription[SessionEvent],
+        uploader: "Uploader",
+        rates: dict[UploadMode, float | None] | None = None,
+        retry_sec: float = UPLOAD_RETRY_SEC,
+        trickle_interval_sec: float = TRICKLE_INTERVAL_SEC,
+    ) -> None:
+        self.events = events
+        self.uploader = uploader
+        self.rates = rates or {}
+        self.retry_sec = retry_sec
+        self.trickle_interval_sec = trickle_interval_sec
+
+        self.machine = SessionMachine()
+        # estimated size of the staging backlog, refreshed around every upload run
+        self.pending_bytes = 0
+        # bytes/sec achieved by the last upload run
+        self.throughput = 0.0
+        self._drain_task: asyncio.Task | None = None
+        self._drain_mode = UploadMode.AWAY
+        self._stop_event = Event()
+        self.log = logging.getLogger(self.__class__.__name__)
+
+    @property
+    def mode(self) -> UploadMode:
+        if self.machine.active:
+            return UploadMode.PLAY
+        if self.machine.idle_paused:
+            return UploadMode.IDLE
+        return UploadMode.AWAY
+
+    async def _refresh_pending_bytes(self):
+        self.pending_bytes = await asyncio.to_thread(self.uploader.backlog_bytes)
+
+    async def _drain(self, mode: UploadMode):
+        await self._refresh_pending_bytes()
+        if not self.pending_bytes:
+            return
+        self.log.info(
+            f"Uploading backlog of {self.pending_bytes / MB:.1f} MB ({mode.value})"
+        )
+        bandwidth = self.uploader.bandwidth
+        start_bytes, start = bandwidth.total_bytes, time.perf_counter()
+        try:
+            await self.uploader.upload(trickle=mode is UploadMode.PLAY)
+        except Exception:
+            # whatever is left stays staged and is retried after `retry_sec`
+            self.log.exception(f"Upload run failed ({mode.value})")
+        finally:
+            self.throughput = (bandwidth.total_bytes - start_bytes) / (
+                time.perf_counter() - start
+            )
+            await self._refresh_pending_bytes()
+        self.log.info(
+            f"Backlog left: {self.pending_bytes / MB:.1f} MB, "
+            f"achieved {self.throughput / MB:.2f} MB/s"
+        )
+
+    def _set_mode_rate(self, mode: UploadMode):
+        rate = self.rates.get(mode)
+        if rate != self.uploader.bandwidth.rate:
+            self.log.debug(f"Upload rate for {mode.value}: {rate} bytes/sec")
+            self.uploader.bandwidth.rate = rate
+
+    def _kick(self, tg: asyncio.TaskGroup):
+        mode = self.mode
+        if (
+            self._drain_task is None
+            or self._drain_task.done()
+            # a full upload replaces a trickle one (see Uploader.upload)
+            or (self._drain_mode is UploadMode.PLAY and mode is not UploadMode.PLAY)
+        ):
+            self._drain_mode = mode
+            self._drain_task = tg.create_task(self._drain(mode))
+
+    async def run(self):
+        self._stop_event.clear()
+        async with asyncio.TaskGroup() as tg:
+            self._set_mode_rate(self.mode)
+            self._kick(tg)  # startup: drain whatever a crash or sleep left behind
+            prev_mode = self.mode
+            while not self._stop_event.is_set():
+                timeout = (
+                    self.trickle_interval_sec
+                    if prev_mode is UploadMode.PLAY
+                    else self.retry_sec
+                )
+                try:
+                    events = [await asyncio.wait_for(self.events.get(), timeout)]
+                except TimeoutError:
+                    events = []
+                while not self.events.empty():
+                    events.append(self.events.get_nowait())
+                for event in events:
+                    self.machine.feed(event)
+
+                mode = self.mode
+                self._set_mode_rate(mode)
+                if mode is UploadMode.PLAY:
+                    if prev_mode is not UploadMode.PLAY:
+                        # capture startup comes first; trickling starts on timeout
+                        await self.uploader.stop(cancel=True)
+                    elif not events:
+                        self._kick(tg)
+                elif mode is not prev_mode or (not events and self.pending_bytes):
+                    self._kick(tg)
+                prev_mode = mode
+
+            if self._drain_task is not None:
+                self._drain_task.cancel()
+
+    def stop(self):
+        self._stop_event.set()
@@ -1,41 +1,178 @@
 import asyncio
+import hashlib
+import heapq
 import http.client
+import io
+import json
 import logging
+import mimetypes
+import os
+import shutil
 import socket
 import ssl
-from dataclasses import dataclass
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Iterator, TypeAlias, TypeVar
+from typing import Any, Callable
 from zoneinfo import ZoneInfo
 
 import backoff
+import imagehash
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaIoBaseUpload
 from notion_client import AsyncClient
+from PIL import Image
 from pydrive2.auth import GoogleAuth
 from pydrive2.drive import GoogleDrive, GoogleDriveFile
 
-from game_session_sync.config import ConnectionConfig, NotionProperties
-from game_session_sync.naming_utils import build_session_name, parse_screenshot_filename
+from game_session_sync.clock import SYSTEM_CLOCK, Clock
+from game_session_sync.config import (
+    ConnectionConfig,
+    NotionProperties,
+    UploadPriorityConfig,
+)
+from game_session_sync.content_index import ContentIndex, content_digest
+from game_session_sync.drive_batch import DriveBatcher
+from game_session_sync.manifest import (
+    CLOSED_FILENAME,
+    DONE_FILENAME,
+    MANIFEST_FILENAME,
+    ManifestEntry,
+    SessionManifest,
+    read_new_lines,
+)
+from game_session_sync.naming_utils import (
+    build_session_name,
+    epoch_ms_to_datetime,
+    is_manual_screenshot,
+    parse_screenshot_epoch_ms,
+    parse_session_dirname,
+    session_dirname,
+)
 from game_session_sync.notifier_utils import ProgressNotifier
+from game_session_sync.phash_index import PHashIndex
+from game_session_sync.rate_limit import ThrottledReader, TokenBucket
+from game_session_sync.staging_clusters import Cluster, StagingClusters
 
 IO_TIMEOUT_SEC = 30
 TRASH_DIRNAME = ".trash"
+# Notion end timestamps of uploads interrupted by stop(cancel=True), applied on next run
+NOTION_JOURNAL_FILENAME = ".notion_journal.json"
+# sessions provisioned on Notion and Drive at game start, see Uploader.provision()
+PROVISIONS_FILENAME = ".provisions.json"
+# content digest -> Drive id of every uploaded file, see ContentIndex
+CONTENT_INDEX_FILENAME = ".content_index"
+# perceptual hashes of uploaded auto captures, one PHashIndex file per title
+PHASH_DIRNAME = ".phash"
+# session of the open cluster of each title, see StagingClusters
+CLUSTERS_FILENAME = ".clusters.json"
 CONCURRENT_UPLOAD_WORKERS = 6
+# a session starting this long after the previous one of its title starts a streak
+STREAK_BREAK_HOURS = 24
+# sessions resolved on Notion and Drive ahead of the one being uploaded
+METADATA_PREFETCH_SESSIONS = 4
+# resumable upload chunk, the granularity of bandwidth shaping (multiple of 256 KiB)
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+# Drive folder ids allocated per files.generateIds request
+DRIVE_ID_BATCH = 32
+DRIVE_FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
 
-_metadata: TypeAlias = tuple[Path, datetime]
-T = TypeVar("T")
 
+@dataclass(slots=True)
+class _StagingDir:
+    """How far the uploader got reading a session staging directory."""
 
-def chunk_list(lst: list[T], n: int) -> Iterator[list[T]]:
-    for i in range(0, len(lst), n):
-        yield lst[i : i + n]
+    title: str
+    start_ms: int
+    manifest_offset: int = 0
+    done_offset: int = 0
+    # filenames listed in the manifest and not done yet
+    pending: set[str] = field(default_factory=set)
 
 
-@dataclass
+class UploadChecksumError(Exception):
+    """The MD5 checksum Drive computed doesn't match the bytes that were sent."""
+
+
+@dataclass(slots=True)
 class _SessionInfo:
     last_end: datetime
     drive_folder_id: str
     notion_page_id: str
+    start: datetime
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "start": self.start.isoformat(),
+            "last_end": self.last_end.isoformat(),
+            "drive_folder_id": self.drive_folder_id,
+            "notion_page_id": self.notion_page_id,
+        }
+
+    @classmethod
+    def from_json(cls, d: dict[str, Any]) -> "_SessionInfo":
+        return cls(
+            datetime.fromisoformat(d["last_end"]),
+            d["drive_folder_id"],
+            d["notion_page_id"],
+            datetime.fromisoformat(d["start"]),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class _NotionSessionPage:
+    """The few properties of a Notion session page the uploader reads."""
+
+    id: str
+    start: datetime
+    end: datetime
+    drive_link: str | None
+
+    @classmethod
+    def parse(cls, page: dict[str, Any], props: NotionProperties):
+        values = page["properties"]
+
+        def get_utc_datetime(prop: str) -> datetime:
+            date_prop = values[prop]["date"]
+            iso_date_str = date_prop.get("end") or date_prop.get("start")
+            return datetime.fromisoformat(
+                iso_date_str.replace("Z", "+00:00")
+            ).astimezone(timezone.utc)
+
+        return cls(
+            page["id"],
+            get_utc_datetime(props.start),
+            get_utc_datetime(props.end),
+            values.get(props.drive_link, {}).get("url"),
+        )
+
+
+@dataclass(slots=True)
+class _Provision:
+    title: str
+    session: _SessionInfo
+    created: bool  # False when the game start continued the last session
+    closed_at: datetime | None = None
+    # end of the session of the title before this one, if any
+    prev_end: datetime | None = None
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "title": self.title,
+            **self.session.to_json(),
+            "created": self.created,
+            "closed_at": self.closed_at.isoformat() if self.closed_at else None,
+            "prev_end": self.prev_end.isoformat() if self.prev_end else None,
+        }
+
+    @classmethod
+    def from_json(cls, d: dict[str, Any]) -> "_Provision":
+        session = _SessionInfo.from_json(d)
+        closed_at = d["closed_at"] and datetime.fromisoformat(d["closed_at"])
+        prev_end = d.get("prev_end") and datetime.fromisoformat(d["prev_end"])
+        return cls(d["title"], session, d["created"], closed_at, prev_end)
 
 
 class Uploader:
@@ -47,15 +184,22 @@ class Uploader:
         minimum_session_gap_min: int,
         minimum_session_length_min: int,
         delete_after_upload: bool,
+        priority: UploadPriorityConfig = UploadPriorityConfig(),
+        phash_threshold: int | None = None,
+        clock: Clock = SYSTEM_CLOCK,
     ) -> None:
         self.notion_db_id = c_config.notion_database_id
         self.drive_root_id = c_config.drive_root_folder_id
         self.user_tz = ZoneInfo(c_config.notion_user_tz)
         self.notion_props = notion_properties
         self.minimum_session_gap_min = minimum_session_gap_min
-        # TODO: use minimum length to cleanup old sessions during upload
         self.minimum_session_length_min = minimum_session_length_min
         self.delete_after_upload = delete_after_upload
+        self.priority = priority
+        # auto captures within this Hamming distance of an uploaded one are dropped
+        self.phash_threshold = phash_threshold
+        # provisioning, orphan and short-session decisions run on this clock
+        self.clock = clock
 
         self.source_dir = source_dir
         self.trash_dir = self.source_dir / TRASH_DIRNAME
@@ -66,147 +210,832 @@ class Uploader:
         gauth = GoogleAuth(str(c_config.drive_settings_file))
         if gauth.access_token_expired:
             gauth.LocalWebserverAuth()
+        # the API client is only built by Authorize(), which loading saved credentials
+        # (save_credentials in the settings file) doesn't call
+        if gauth.service is None:
+            gauth.Authorize()
         self._drive = GoogleDrive(gauth)
 
+        self.journal_path = self.source_dir / NOTION_JOURNAL_FILENAME
+        # notion page id -> end timestamp of uploaded files not yet written to Notion,
+        # recorded by the upload threads under _pending_ends_lock
+        self._pending_ends: dict[str, datetime] = {}
+        self._pending_ends_lock = threading.Lock()
+        # set once a run is cancelled or fails: threads of its detached uploads
+        # append their end timestamps to the journal instead
+        self._journal_ends = False
+        # shared by all upload streams; its rate is set per mode by UploadScheduler
+        self.bandwidth = TokenBucket()
+
+        self.provisions_path = self.source_dir / PROVISIONS_FILENAME
+        self._provisions = self._read_provisions()
+
+        # session staging directories, read incrementally under _scan_lock, as
+        # upload runs and backlog_bytes() scan from worker threads
+        self._staging_dirs: dict[str, _StagingDir] = {}
+        # "<dirname>/<filename>" -> manifest entry, of every capture not done yet
+        self._staged: dict[str, ManifestEntry] = {}
+        # captures staged (title, timestamp) or done (None) since the last upload run
+        self._staged_delta: dict[str, tuple[str, int] | None] = {}
+        self._invalid_names: set[str] = set()
+        self._scan_lock = threading.Lock()
+        self._done_lock = threading.Lock()
+        # directories of sessions started before are complete, closed or not
+        self._started_ms = int(self.clock.now().timestamp() * 1000)
+        # gap clusters of the staged files, caught up with by every upload run
+        self.staging: StagingClusters[_SessionInfo] = StagingClusters(
+            self.source_dir / CLUSTERS_FILENAME,
+            self.minimum_session_gap_min * 60_000,
+            _SessionInfo.to_json,
+            _SessionInfo.from_json,
+        )
+
+        self.content_index = ContentIndex(self.source_dir / CONTENT_INDEX_FILENAME)
+        # indexed Drive files known to still exist, checked once per process
+        self._live_drive_ids: set[str] = set()
+        self.phash_dir = self.source_dir / PHASH_DIRNAME
+        # loaded on first use by an upload worker thread
+        self._phash_indexes: dict[str, PHashIndex] = {}
+        self._phash_indexes_lock = threading.Lock()
+        # content being uploaded by some worker, so a copy isn't uploaded alongside
+        self._digests_in_flight: set[bytes] = set()
+        self._phashes_in_flight: list[tuple[str, int]] = []
+        self._in_flight_lock = threading.Lock()
+
+        # pre-allocated Drive ids, so folders and the Notion pages linking to them
+        # are created concurrently
+        self._drive_ids: list[str] = []
+        self._drive_ids_lock = asyncio.Lock()
+        # Notion and Drive requests by endpoint, logged per upload run; also counted
+        # by upload threads, hence the lock
+        self.requests: Counter[str] = Counter()
+        self._requests_lock = threading.Lock()
+        # Notion property name -> id, for filter_properties
+        self._notion_prop_ids: dict[str, str] | None = None
+        self._notion_prop_ids_lock = asyncio.Lock()
+        # Drive metadata requests (folders, permissions, listings, trash)
+        self._drive_batch = DriveBatcher(
+            lambda: self._drive_service().new_batch_http_request(),
+            self._drive.auth.Get_Http_Object,
+            self._count_request,
+            IO_TIMEOUT_SEC,
+        )
+
         self._stop_event = asyncio.Event()
+        # for upload threads to reach the Drive batcher
+        self._loop: asyncio.AbstractEventLoop | None = None
         self._upload_task: asyncio.Task | None = None
+        self._upload_is_trickle = False
         self.log = logging.getLogger(self.__class__.__name__)
 
-    async def _upload(self) -> bool:
+    async def _upload(self, trickle: bool) -> bool:
         self._stop_event.clear()
-        # TODO: Use session_dirname to track session time-bounds by exact process lifetime
+        self._loop = asyncio.get_running_loop()
+        with self._pending_ends_lock:
+            self._journal_ends = False
+        with self._requests_lock:
+            requests_before = self.requests.copy()
+        try:
+            done = await self._upload_inner(trickle)
+            if done:
+                await asyncio.to_thread(self._finish_staging_dirs)
+            return done
+        except BaseException:
+            # cancelled or failed; synchronous, so cancellation completes within the
+            # current loop iteration
+            self._save_journal()
+            raise
+        finally:
+            with self._requests_lock:
+                requests = self.requests - requests_before
+            if requests:
+                self.log.info(
+                    f"{requests.total()} API requests: "
+                    + ", ".join(f"{k}={v}" for k, v in sorted(requests.items()))
+                )
+
+    def _count_request(self, name: str):
+        with self._requests_lock:
+            self.requests[name] += 1
+
+    async def _upload_inner(self, trickle: bool) -> bool:
+        await self._apply_journal()
 
         # Design:
-        # - _upload is called only after a session ends by the session manager.
-        # - _upload can be stopped at any time to allow the manager to handle a new session
-        # - Currently the screenshot writes dump to a single dir, but later each session object would create a new dir
-        #   for the session itself with embedded timestamps at the dir name.
-        #   That means that the current design should create new sessions, or update timestamps in notion before uploading
-        # - Ideally, a clustering of screenshots would be used to update and create all new notion and drive folders
-        #   and a second heavier pass would actually iterate over the screenshots and upload them to their respective session folders in drive
-        # - Stopping can only be allowed at the second pass to protect notion as much as possible
-        # - The third pass is at cleanup() call, as seen in self.upload(), and is responsible to enforce self.minimum_session_length_min
-        #   by looking in notion for sessions which are smaller than the specified threshold AND are not the first session.
-        #   This will avoid deleting sessions which are in-fact just a game crash (for example).
-        #   It is guaranteed in the uploader logic that there would be no 2 consecutive sessions of the same title which are closer than self.minimum_session_gap_min
-
-        screenshots = [f for f in self.source_dir.iterdir() if f.is_file()]
-        if not screenshots:
-            return True
+        # - _upload is called by the session manager after a session ends, and may be
+        #   stopped at any time so the manager can handle a new session.
+        # - Each session object stages its screenshots in a dir of its own, named by
+        #   its start and listed in its manifest (see game_session_sync.manifest).
+        #   Sessions of a title closer than minimum_session_gap_min are still clustered
+        #   together by self.staging.
+        # - The first phase is planning, and isn't stopped, to protect Notion: the
+        #   journal of Notion updates left by an earlier run is applied, provisioned
+        #   sessions left without files are deleted, and clusters shorter than
+        #   minimum_session_length_min are dropped unless they are the first session
+        #   of a streak (e.g. a game crash), see _plan_clusters().
+        # - The second phase resolves the Notion and Drive sessions of the clusters
+        #   ahead of the files being uploaded into them, and can be stopped between
+        #   files. Session ends recorded by the uploads are flushed to Notion at the
+        #   end, or journaled if the run is cancelled.
+        # - No 2 consecutive sessions of a title end up closer than
+        #   minimum_session_gap_min.
 
-        # extract timestamp, groupby title
-        by_title: dict[str, list[_metadata]] = {}
-        for path in screenshots:
-            parsed_filename = parse_screenshot_filename(path.name, self.user_tz)
-            if not parsed_filename:
-                self.log.info(f"Invalid filename format: {str(path)!r}")
-                continue
-            title, timestamp = parsed_filename
-            by_title.setdefault(title, []).append((path, timestamp))
-        if not by_title:
+        clusters = await asyncio.to_thread(self._cluster_staged)
+        await self._cleanup_orphan_provisions(clusters)
+        if not clusters:
+            return True
+        last_sessions: dict[str, _SessionInfo | None] = {}
+        clusters = await self._plan_clusters(clusters, last_sessions)
+        if not clusters:
             return True
 
-        # sortby timestamp, split by consecutive timestamp diff
-        def split_by_gap(input_list: list[_metadata]) -> list[list[_metadata]]:
-            input_list.sort(key=lambda v: v[1])
-
-            out = [[input_list[0]]]
-            for path, timestamp in input_list[1:]:
-                _, prev_timestamp = out[-1][-1]
-                diff_min = (timestamp - prev_timestamp).total_seconds() / 60
-                # merge with last cluster
-                if diff_min < self.minimum_session_gap_min:
-                    out[-1].append((path, timestamp))
-                # new cluster
-                else:
-                    out.append([(path, timestamp)])
-            return out
-
-        clusters: list[tuple[str, list[_metadata]]] = []
-        for title, screenshot_list in by_title.items():
-            splits = split_by_gap(screenshot_list)
-            for split in splits:
-                clusters.append((title, split))
-        # sortby cluster start
-        clusters.sort(key=lambda v: v[1][0][1])
-
-        async def upload_postprocess(
+        # Sessions are resolved (found in or created on Notion and Drive) in tasks, up
+        # to METADATA_PREFETCH_SESSIONS ahead of the session being uploaded.
+        # Only the first cluster of a title may continue the last Notion session, as
+        # the staging clusters already put at least minimum_session_gap_min between
+        # the others. They are new (or provisioned) sessions, created once the first
+        # one is resolved so its "last session" query doesn't pick them up. A cluster
+        # resolved by an earlier run keeps its session.
+        first_of_title: dict[str, int] = {}
+        for idx, cluster in enumerate(clusters):
+            first_of_title.setdefault(cluster.title, idx)
+        resolving: dict[int, asyncio.Task[_SessionInfo]] = {}
+
+        async def resolve_cluster(idx: int) -> _SessionInfo:
+            cluster = clusters[idx]
+            if cluster.session is not None:
+                return cluster.session
+            title, start = cluster.title, epoch_ms_to_datetime(cluster.start_ms)
+            first = first_of_title[title]
+            if idx == first:
+                return await self._resolve_session(title, start, last_sessions)
+            await resolve(first)
+            info = self._provisioned_session(title, start)
+            if self._continues(info, start):
+                assert info is not None
+                return info
+            return await self._new_session(title, start)
+
+        async def resolve_session(idx: int) -> _SessionInfo:
+            info = await resolve_cluster(idx)
+            self.staging.resolved(clusters[idx], info)
+            return info
+
+        def resolve(idx: int) -> asyncio.Task[_SessionInfo]:
+            if idx not in resolving:
+                resolving[idx] = tg.create_task(resolve_session(idx))
+            return resolving[idx]
+
+        # priority queue of files: manual captures, then sessions in the configured
+        # order, then chronologically within a session
+        session_sign = -1 if self.priority.newest_session_first else 1
+        queue: list[tuple[tuple[int, int, int], int, str, int]] = []
+        for idx, cluster in enumerate(clusters):
+            session_key = session_sign * cluster.start_ms
+            for name, timestamp in cluster.files.items():
+                manual = self.priority.manual_first and self._is_manual(name)
+                key = (0 if manual else 1, session_key, timestamp)
+                queue.append((key, idx, name, timestamp))
+        heapq.heapify(queue)
+        # sessions in the order their first file is uploaded
+        session_order = list(dict.fromkeys(idx for _, idx, _, _ in sorted(queue)))
+        session_rank = {idx: rank for rank, idx in enumerate(session_order)}
+
+        def prefetch(idx: int):
+            rank = session_rank[idx]
+            for next_idx in session_order[rank : rank + 1 + METADATA_PREFETCH_SESSIONS]:
+                resolve(next_idx)
+
+        async def upload_one(
             page_id: str,
-            end: datetime,
-            files_to_cleanup: list[Path],
+            folder_id: str,
+            key: str,
+            end_ms: int,
+            similar_title: str | None,
         ):
-            await self._update_notion_timestamp(
-                page_id,
-                end,
+            path = self.source_dir / key
+            entry = self._staged.get(key)
+            end = epoch_ms_to_datetime(end_ms)
+            # a duplicate still extends its session: the game was played meanwhile
+            await self._drive_upload_one(
+                folder_id,
+                str(path),
+                path.name,
+                cleanup=True,
+                similar_title=similar_title,
+                digest=entry and entry.digest,
+                size=entry and entry.size,
+                on_done=lambda: self._record_end(page_id, end),
+                streams=workers,
             )
-            for f in files_to_cleanup:
-                if self.delete_after_upload:
-                    self.log.debug(f"Deleting file: {str(f)!r}")
-                    f.unlink()
-                else:
-                    f.rename(self.trash_dir / f.name)
 
-        progress = ProgressNotifier(clusters)
-        for title, screenshot_list in clusters:
-            start: datetime = screenshot_list[0][1]
-            info = await self._last_session(title)
+        # no toasts over a game
+        progress = (
+            None
+            if trickle
+            else ProgressNotifier(
+                {
+                    idx: (clusters[idx].title, clusters[idx].files)
+                    for idx in session_order
+                }
+            )
+        )
+
+        async def worker():
+            while queue and not self._stop_event.is_set():
+                _, idx, name, timestamp = heapq.heappop(queue)
+                prefetch(idx)
+                info = await resolve(idx)
+                await upload_one(
+                    info.notion_page_id,
+                    info.drive_folder_id,
+                    name,
+                    timestamp,
+                    # manual screenshots are deliberate, never dropped as similar
+                    None if self._is_manual(name) else clusters[idx].title,
+                )
+                if progress:
+                    progress.increment_files(idx, 1)
+
+        workers = 1 if trickle else CONCURRENT_UPLOAD_WORKERS
+        # a stop lets in-flight uploads and session resolutions finish, each worker
+        # stops pulling new files
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(workers):
+                tg.create_task(worker())
+        await self._flush_pending_ends()
+        if queue:
+            return False
+        if progress:
+            progress.finish()
+        return True
+
+    def _continues(self, info: _SessionInfo | None, start: datetime) -> bool:
+        """Whether a session starting at `start` is a continuation of `info`."""
+        if info is None:
+            return False
+        with self._pending_ends_lock:
+            pending_end = self._pending_ends.get(info.notion_page_id)
+        if pending_end is not None:
+            # Notion end timestamps are only written once per run
+            info.last_end = max(info.last_end, pending_end)
+        return (
+            # a session provisioned at game start is newer than an unuploaded backlog
+            info.start <= start
+            and (start - info.last_end).total_seconds() / 60
+            <= self.minimum_session_gap_min
+        )
+
+    async def _resolve_session(
+        self,
+        title: str,
+        start: datetime,
+        last_sessions: dict[str, _SessionInfo | None] | None = None,
+    ) -> _SessionInfo:
+        """Continue the last session of `title` if it ended close enough to `start`,
+        otherwise create a new one. `last_sessions` holds already queried ones."""
+        info = self._known_session(title, start)
+        if info is None:
+            if last_sessions is not None and title in last_sessions:
+                info = last_sessions[title]
+            else:
+                info = await self._last_session(title)
+        if not self._continues(info, start):
+            info = await self._new_session(title, start)
+        assert info is not None
+        return info
+
+    # --- Speculative provisioning ---
+    # The Notion page and Drive folder of a session are created when its game starts,
+    # so uploads after the game closes only push bytes. The latest provisioned session
+    # of each title is recorded locally and resolves clusters without a Notion query.
+    # Sessions which close before minimum_session_length_min are orphans, unless
+    # _plan_clusters() would keep their captures or some were already uploaded, and
+    # are deleted at the start of the next upload run.
+
+    def _read_provisions(self) -> list[_Provision]:
+        try:
+            raw: list[dict[str, Any]] = json.loads(self.provisions_path.read_text())
+        except FileNotFoundError:
+            return []
+        return [_Provision.from_json(d) for d in raw]
+
+    def _save_provisions(self):
+        self.provisions_path.write_text(
+            json.dumps([p.to_json() for p in self._provisions])
+        )
+
+    def _provisioned_session(self, title: str, start: datetime) -> _SessionInfo | None:
+        for p in reversed(self._provisions):
+            if p.title == title and p.session.start <= start:
+                return p.session
+        return None
+
+    def _known_session(self, title: str, start: datetime) -> _SessionInfo | None:
+        """The latest session of `title` started by `start` which is known without a
+        Notion query: provisioned, or that of the open staging cluster of the title."""
+        sessions = (
+            self._provisioned_session(title, start),
+            self.staging.open_sessions.get(title),
+        )
+        return max(
+            (s for s in sessions if s is not None and s.start <= start),
+            key=lambda s: s.start,
+            default=None,
+        )
+
+    async def provision(self, title: str):
+        """Create (or continue) the session of a game which just started.
+
+        Best effort: failures are logged, and the upload path resolves the session
+        as usual.
+        """
+        start = self.clock.now(timezone.utc)
+        try:
+            # e.g. the provisioned session of the game, relaunched shortly after
+            info = self._known_session(title, start)
+            if info is None:
+                info = await self._last_session(title)
+            created = not self._continues(info, start)
+            prev_end = info.last_end if info else None
+            if created:
+                info = await self._new_session(title, start)
+        except Exception:
+            self.log.warning(
+                f"Failed to provision a session for {title}", exc_info=True
+            )
+            return
+        assert info is not None
+        provision = _Provision(title, info, created, prev_end=prev_end)
+        for p in self._provisions:
+            if p.session.notion_page_id == info.notion_page_id:
+                # a continued provision is judged an orphan by its whole length
+                provision.created, provision.prev_end = p.created, p.prev_end
+        # only the latest session of a title is kept, unless it's a pending orphan
+        self._provisions = [
+            p
+            for p in self._provisions
+            if p.title != title
+            or (
+                self._is_short_provision(p)
+                and p.session.notion_page_id != info.notion_page_id
+            )
+        ]
+        self._provisions.append(provision)
+        self._save_provisions()
+        self.log.info(
+            f"Provisioned session {info.notion_page_id} for {title} "
+            f"({'new' if created else 'continued'})"
+        )
+
+    def close_provision(self, title: str):
+        """Mark the provisioned session of `title` as closed, now."""
+        for p in reversed(self._provisions):
+            if p.title == title and p.closed_at is None:
+                p.closed_at = self.clock.now(timezone.utc)
+                # a relaunch continues the session even if nothing was uploaded yet
+                p.session.last_end = max(p.session.last_end, p.closed_at)
+                self._save_provisions()
+                return
+
+    def _is_short_provision(self, p: _Provision) -> bool:
+        """Whether `p` is a new session which closed before minimum_session_length_min."""
+        if not p.created or p.closed_at is None:
+            return False
+        length_min = (p.closed_at - p.session.start).total_seconds() / 60
+        return length_min < self.minimum_session_length_min
+
+    def _is_orphan(self, p: _Provision, clusters: list[Cluster[_SessionInfo]]) -> bool:
+        """Whether `p` is to be deleted: a short session which _plan_clusters() would
+        not upload, and into which nothing was uploaded. `clusters` are the staged
+        ones."""
+        if not self._is_short_provision(p):
+            return False
+        assert p.closed_at is not None
+        now = self.clock.now(timezone.utc)
+        if (now - p.closed_at).total_seconds() / 60 < self.minimum_session_gap_min:
+            return False  # the game may be relaunched, continuing the session
+        if self._starts_streak(p.prev_end, p.session.start):
+            return False
+        # captures may start before the provision request does
+        gap_ms = self.minimum_session_gap_min * 60_000
+        start_ms = int(p.session.start.timestamp() * 1000) - gap_ms
+        end_ms = int(p.closed_at.timestamp() * 1000)
+        if any(
+            start_ms <= timestamp <= end_ms and self._is_manual(name)
+            for cluster in clusters
+            if cluster.title == p.title
+            for name, timestamp in cluster.files.items()
+        ):
+            return False
+        # e.g. by a trickle run, whose files are no longer staged
+        return not self.content_index.has_folder(p.session.drive_folder_id)
+
+    async def _cleanup_orphan_provisions(self, clusters: list[Cluster[_SessionInfo]]):
+        orphans = [p for p in self._provisions if self._is_orphan(p, clusters)]
+
+        async def delete(p: _Provision):
+            self.log.info(
+                f"Deleting provisioned session {p.session.notion_page_id} of {p.title}: "
+                f"shorter than {self.minimum_session_length_min} min"
+            )
+            self._count_request("notion.pages.update")
+            await self._notion.pages.update(p.session.notion_page_id, archived=True)
+            await self._trash_drive_file(p.session.drive_folder_id)
+            # anything which raced into the folder is uploaded again
+            await asyncio.to_thread(
+                self.content_index.discard_folder, p.session.drive_folder_id
+            )
+            self._provisions.remove(p)
+            self._save_provisions()
+            page_id = p.session.notion_page_id
+            if self.staging.forget(lambda s: s.notion_page_id == page_id):
+                self.staging.save()
+
+        # concurrently, so the folders are trashed in a single Drive batch
+        async with asyncio.TaskGroup() as tg:
+            for p in orphans:
+                tg.create_task(delete(p))
+
+    @staticmethod
+    def _starts_streak(prev_end: datetime | None, start: datetime) -> bool:
+        """Whether a session starting at `start` starts a streak of its title."""
+        return (
+            prev_end is None
+            or (start - prev_end).total_seconds() / 3600 > STREAK_BREAK_HOURS
+        )
+
+    async def _plan_clusters(
+        self,
+        clusters: list[Cluster[_SessionInfo]],
+        last_sessions: dict[str, _SessionInfo | None],
+    ) -> list[Cluster[_SessionInfo]]:
+        """Drop clusters shorter than minimum_session_length_min from the upload.
+
+        A short cluster is uploaded anyway when it continues the last session, holds a
+        manual screenshot, or is the first session of a streak (a game crash or a first
+        look at a game, rather than launching it to change a setting). Otherwise it is
+        held back while it may still grow into a session, and discarded after that.
+        Clusters partly uploaded by an earlier run are always uploaded.
+        Last sessions queried for the decision are stored in `last_sessions`.
+        """
+        now = self.clock.now(timezone.utc)
+
+        def duration_min(cluster: Cluster) -> float:
+            return (cluster.end_ms - cluster.start_ms) / 60_000
+
+        def is_short(cluster: Cluster) -> bool:
+            return duration_min(cluster) < self.minimum_session_length_min and (
+                not any(self._is_manual(name) for name in cluster.files)
+            )
+
+        # the previous session matters only to a title's first cluster in this run
+        first_short: dict[str, datetime] = {}
+        for cluster in clusters:
+            if cluster.title not in first_short and is_short(cluster):
+                first_short[cluster.title] = epoch_ms_to_datetime(cluster.start_ms)
+        if first_short:
+            titles = [
+                title
+                for title, start in first_short.items()
+                if not self._known_session(title, start)
+            ]
+            found = await asyncio.gather(*(self._last_session(t) for t in titles))
+            last_sessions.update(zip(titles, found))
+
+        planned: list[Cluster[_SessionInfo]] = []
+        held: list[Cluster[_SessionInfo]] = []
+        discarded: list[Cluster[_SessionInfo]] = []
+        prev_end: dict[str, datetime | None] = {}
+        for cluster in clusters:
+            title = cluster.title
+            start = epoch_ms_to_datetime(cluster.start_ms)
+            end = epoch_ms_to_datetime(cluster.end_ms)
+            if title not in prev_end:
+                last = self._known_session(title, start) or last_sessions.get(title)
+                continues = self._continues(last, start)
+                prev_end[title] = last.last_end if last else None
+            else:
+                continues = False
+            streak_start = self._starts_streak(prev_end[title], start)
+            prev_end[title] = end
+
             if (
-                info is None  # new session
-                or (start - info.last_end).total_seconds() / 60
-                > self.minimum_session_gap_min  # gap too big
+                cluster.session is not None
+                or continues
+                or streak_start
+                or not is_short(cluster)
             ):
-                info = await self._new_session(title, start)
+                planned.append(cluster)
+            elif (now - end).total_seconds() / 60 < self.minimum_session_gap_min:
+                held.append(cluster)
+            else:
+                discarded.append(cluster)
 
-            last_timestamp = None
-            files_to_drop = []
-            # notify: update status (Uploading...) ValueStringOverride: 15/25/96 Captures
-            for chunk in chunk_list(screenshot_list, CONCURRENT_UPLOAD_WORKERS):
-                # TODO: use phash to drop near identical screenshots
-                await asyncio.gather(
-                    *(
-                        self._drive_upload_one(
-                            info.drive_folder_id, str(path), path.name
-                        )
-                        for path, _ in chunk
-                    )
+        for verb, group in (("Holding back", held), ("Discarding", discarded)):
+            for cluster in group:
+                self.log.info(
+                    f"{verb} short session of {cluster.title}: "
+                    f"{len(cluster.files)} frames, {duration_min(cluster):.1f} min"
                 )
-                progress.increment_files(len(chunk))
-                last_timestamp = chunk[-1][1]
-                files_to_drop.extend((p for p, _ in chunk))
-                if self._stop_event.is_set():
-                    await upload_postprocess(
-                        info.notion_page_id, last_timestamp, files_to_drop
-                    )
-                    return False
+        if discarded:
+            paths = [
+                self.source_dir / name
+                for cluster in discarded
+                for name in cluster.files
+            ]
+            await asyncio.to_thread(lambda: [self._cleanup_file(p) for p in paths])
+        return planned
 
-            assert last_timestamp is not None
-            await upload_postprocess(info.notion_page_id, last_timestamp, files_to_drop)
-            progress.increment_session()
-        progress.finish()
-        return True
+    # --- Staging ---
+    # Sessions stage their captures in directories of their own, each listing them
+    # in a manifest as they're written (see game_session_sync.manifest). Captures
+    # which are done are appended to the done log of their directory. Reading both
+    # from where the previous scan stopped, a scan handles only what changed since.
+    # A directory of a closed session is moved out of staging once all of its
+    # captures are done.
 
-    # upload process cannot run in parallel because of race conditions during trashing
-    async def upload(self):
-        if not self._upload_task or self._upload_task.done():
-            self._upload_task = asyncio.create_task(self._upload())
-            self._upload_task.add_done_callback(
-                lambda t: (
-                    self.log.exception(
-                        "Uploader._upload() failed: ", exc_info=t.exception()
+    def _scan_staging(self):
+        """Catch up with the staging directories (blocking)."""
+        with self._scan_lock:
+            dirnames: set[str] = set()
+            flat: list[str] = []
+            with os.scandir(self.source_dir) as entries:
+                for entry in entries:
+                    if entry.name.startswith(".") or entry.name in self._invalid_names:
+                        continue
+                    if entry.is_dir():
+                        dirnames.add(entry.name)
+                    elif entry.is_file():
+                        flat.append(entry.name)
+            if flat:
+                dirnames.update(self._adopt_flat_files(flat))
+
+            for dirname in self._staging_dirs.keys() - dirnames:  # removed by hand
+                for name in self._staging_dirs.pop(dirname).pending:
+                    self._unstage(f"{dirname}/{name}")
+            for dirname in dirnames:
+                d = self._staging_dirs.get(dirname)
+                if d is None:
+                    parsed = parse_session_dirname(dirname)
+                    if not parsed:
+                        self.log.info(f"Invalid staging directory name: {dirname!r}")
+                        self._invalid_names.add(dirname)
+                        continue
+                    d = self._staging_dirs[dirname] = _StagingDir(*parsed)
+                self._read_staging_dir(dirname, d)
+
+    def _read_staging_dir(self, dirname: str, d: _StagingDir):
+        path = self.source_dir / dirname
+        lines, d.manifest_offset = read_new_lines(
+            path / MANIFEST_FILENAME, d.manifest_offset
+        )
+        for line in lines:
+            try:
+                entry = ManifestEntry.parse(line)
+            except ValueError:
+                self.log.warning(f"Skipping malformed manifest line in {dirname!r}")
+                continue
+            key = f"{dirname}/{entry.name}"
+            d.pending.add(entry.name)
+            self._staged[key] = entry
+            self._staged_delta[key] = d.title, entry.epoch_ms
+        lines, d.done_offset = read_new_lines(path / DONE_FILENAME, d.done_offset)
+        for name in lines:
+            if name in d.pending:
+                d.pending.remove(name)
+                self._unstage(f"{dirname}/{name}")
+
+    def _unstage(self, key: str):
+        del self._staged[key]
+        if self._staged_delta.get(key) is not None:
+            del self._staged_delta[key]  # staged and done between two runs
+        else:
+            self._staged_delta[key] = None
+
+    def _adopt_flat_files(self, names: list[str]) -> set[str]:
+        """Move captures staged flat (by older versions) into a closed session
+        directory per title, and return their names."""
+        by_title: dict[str, list[tuple[str, int]]] = {}
+        for name in names:
+            parsed = parse_screenshot_epoch_ms(name)
+            if not parsed:
+                self.log.info(f"Invalid filename format: {name!r}")
+                self._invalid_names.add(name)
+                continue
+            title, timestamp = parsed
+            by_title.setdefault(title, []).append((name, timestamp))
+
+        dirnames: set[str] = set()
+        for title, files in by_title.items():
+            files.sort(key=lambda v: v[1])
+            dirname = session_dirname(
+                title, self.user_tz, epoch_ms_to_datetime(files[0][1])
+            )
+            (self.source_dir / dirname).mkdir(exist_ok=True)
+            manifest = SessionManifest(self.source_dir / dirname)
+            for name, timestamp in files:
+                path = self.source_dir / name
+                size = path.stat().st_size
+                # listed first: a listed capture which is missing is skipped, while
+                # an unlisted one would never be uploaded
+                manifest.append(
+                    ManifestEntry(
+                        name, timestamp, is_manual_screenshot(name), size, None
                     )
-                    if t.exception()
-                    else None
                 )
+                path.rename(self.source_dir / dirname / name)
+            manifest.close()
+            dirnames.add(dirname)
+            self.log.info(f"Moved {len(files)} staged files into {dirname!r}")
+        return dirnames
+
+    def _is_manual(self, key: str) -> bool:
+        entry = self._staged.get(key)
+        return entry is not None and entry.manual
+
+    def _cluster_staged(self) -> list[Cluster[_SessionInfo]]:
+        """Catch the staging clusters up with the staging directories, and return the
+        clusters holding files, ordered by start (blocking, reads the manifests)."""
+        self._scan_staging()
+        with self._scan_lock:
+            delta, self._staged_delta = self._staged_delta, {}
+        self.staging.remove(delta)
+        self.staging.add(
+            (key, *staged) for key, staged in delta.items() if staged is not None
+        )
+        return self.staging.clusters()
+
+    def _finish_staging_dirs(self):
+        """Move the directories of closed sessions whose captures are all done out of
+        staging, with a single rename each (blocking)."""
+        self._scan_staging()
+        with self._scan_lock:
+            for dirname, d in list(self._staging_dirs.items()):
+                path = self.source_dir / dirname
+                if d.pending or not (
+                    d.start_ms < self._started_ms or (path / CLOSED_FILENAME).exists()
+                ):
+                    continue
+                # nothing is appended once closed; catch up with the last captures
+                self._read_staging_dir(dirname, d)
+                if d.pending:
+                    continue
+                del self._staging_dirs[dirname]
+                if self.delete_after_upload:
+                    self.log.debug(f"Deleting staging directory: {dirname!r}")
+                    shutil.rmtree(path)
+                else:
+                    path.rename(self.trash_dir / dirname)
+
+    def backlog_bytes(self) -> int:
+        """Size of the screenshots waiting to be uploaded (blocking, reads the
+        manifests)."""
+        self._scan_staging()
+        with self._scan_lock:
+            return sum(entry.size for entry in self._staged.values())
+
+    def _cleanup_file(self, f: Path):
+        """Record a staged capture as done: uploaded, a duplicate or discarded. Its
+        directory is moved out of staging as a whole, see _finish_staging_dirs()."""
+        with self._done_lock:
+            with (f.parent / DONE_FILENAME).open("a", encoding="utf-8") as done:
+                done.write(f"{f.name}\n")
+        if self.delete_after_upload:
+            self.log.debug(f"Deleting file: {str(f)!r}")
+            f.unlink(missing_ok=True)
+
+    def _record_end(self, page_id: str, end: datetime):
+        """Record the end timestamp of an uploaded file (called from upload threads,
+        including detached ones)."""
+        with self._pending_ends_lock:
+            if self._journal_ends:
+                self._write_journal({page_id: end})
+            elif page_id not in self._pending_ends or self._pending_ends[page_id] < end:
+                self._pending_ends[page_id] = end
+
+    async def _flush_pending_ends(self):
+        while True:
+            with self._pending_ends_lock:
+                if not self._pending_ends:
+                    break
+                page_id, end = next(iter(self._pending_ends.items()))
+            await self._update_notion_timestamp(page_id, end)
+            self._advance_session_end(page_id, end)
+            # may have advanced while awaiting Notion
+            with self._pending_ends_lock:
+                if self._pending_ends.get(page_id) == end:
+                    del self._pending_ends[page_id]
+        self._save_session_ends()
+
+    def _advance_session_end(self, page_id: str, end: datetime):
+        """Apply an end timestamp written to Notion to the locally known sessions."""
+        for p in self._provisions:
+            if p.session.notion_page_id == page_id:
+                p.session.last_end = max(p.session.last_end, end)
+        for session in self.staging.open_sessions.values():
+            if session.notion_page_id == page_id:
+                session.last_end = max(session.last_end, end)
+
+    def _save_session_ends(self):
+        if self._provisions:
+            self._save_provisions()
+        if self.staging.open_sessions:
+            self.staging.save()
+
+    def _save_journal(self):
+        with self._pending_ends_lock:
+            self._journal_ends = True
+            if not self._pending_ends:
+                return
+            self._write_journal(self._pending_ends)
+            self.log.info(
+                f"Journaled {len(self._pending_ends)} pending Notion updates"
             )
-        await self._upload_task
+            self._pending_ends.clear()
+
+    def _write_journal(self, ends: dict[str, datetime]):
+        # under _pending_ends_lock
+        journal = self._read_journal()
+        for page_id, end in ends.items():
+            if page_id not in journal or journal[page_id] < end:
+                journal[page_id] = end
+        self.journal_path.write_text(
+            json.dumps({k: v.isoformat() for k, v in journal.items()})
+        )
+
+    def _read_journal(self) -> dict[str, datetime]:
+        try:
+            raw: dict[str, str] = json.loads(self.journal_path.read_text())
+        except FileNotFoundError:
+            return {}
+        return {k: datetime.fromisoformat(v) for k, v in raw.items()}
+
+    async def _apply_journal(self):
+        journal = self._read_journal()
+        if not journal:
+            return
+        self.log.info(f"Applying {len(journal)} journaled Notion updates")
+        for page_id, end in journal.items():
+            await self._update_notion_timestamp(page_id, end)
+            self._advance_session_end(page_id, end)
+        self._save_session_ends()
+        self.journal_path.unlink()
+
+    def _log_upload_result(self, t: asyncio.Task):
+        if not t.cancelled() and t.exception():
+            self.log.exception("Uploader._upload() failed: ", exc_info=t.exception())
+
+    # upload process cannot run in parallel because of race conditions during trashing
+    async def upload(self, trickle: bool = False):
+        """Upload the staging backlog, joining the upload already in progress.
+
+        With `trickle=True` a single file is uploaded at a time. A full upload
+        requested during a trickle one replaces it. Either way, upload streams are shaped by
+        `self.bandwidth`.
+        """
+        if self._upload_task and not self._upload_task.done():
+            if self._upload_is_trickle and not trickle:
+                await self.stop(cancel=True)
+        if not self._upload_task or self._upload_task.done():
+            self._upload_is_trickle = trickle
+            self._upload_task = asyncio.create_task(self._upload(trickle))
+            self._upload_task.add_done_callback(self._log_upload_result)
+        try:
+            await self._upload_task
+        except asyncio.CancelledError:
+            # swallow cancellation of the upload itself by stop(cancel=True)
+            current = asyncio.current_task()
+            if current is not None and current.cancelling():
+                raise
 
-    async def stop(self):
+    async def stop(self, cancel: bool = False):
+        """Stop uploading.
+
+        By default the in-flight chunk of uploads is awaited. With `cancel=True` the
+        upload task is cancelled right away: in-flight file uploads are detached (they
+        still trash their file and journal their end timestamp when done) and pending
+        Notion end timestamps are journaled to disk and applied on the next run.
+        """
         self._stop_event.set()
-        if self._upload_task:
+        if not self._upload_task or self._upload_task.done():
+            return
+        if cancel:
+            self._upload_task.cancel()
+        try:
             await self._upload_task
+        except asyncio.CancelledError:
+            if not cancel:
+                raise
 
     async def _last_session(self, title: str) -> _SessionInfo | None:
         try:
+            filter_properties = await self._notion_property_ids(
+                self.notion_props.start,
+                self.notion_props.end,
+                self.notion_props.drive_link,
+            )
+            self._count_request("notion.databases.query")
             q: dict[str, Any] = await asyncio.wait_for(
                 self._notion.databases.query(
                     database_id=self.notion_db_id,
@@ -219,36 +1048,24 @@ class Uploader:
                         {"property": self.notion_props.end, "direction": "descending"}
                     ],
                     page_size=1,
+                    filter_properties=filter_properties,
                 ),
                 IO_TIMEOUT_SEC,
             )
             if q.get("results"):
-                notion_page = q["results"][0]
-                props = notion_page["properties"]
-
-                def get_utc_datetime(prop: str):
-                    date_prop = props[prop]["date"]
-                    iso_date_str = date_prop.get("end") or date_prop.get("start")
-                    utc_date = datetime.fromisoformat(
-                        iso_date_str.replace("Z", "+00:00")
-                    ).astimezone(timezone.utc)
-                    return utc_date
-
-                last_end = get_utc_datetime(self.notion_props.end)
-                last_start = get_utc_datetime(self.notion_props.start)
+                page = _NotionSessionPage.parse(q["results"][0], self.notion_props)
                 self.log.info(
-                    f"Last Notion session: end: {last_end.isoformat(timespec='seconds')}"
+                    f"Last Notion session: end: {page.end.isoformat(timespec='seconds')}"
                 )
 
-                session_name = build_session_name(title, last_start, self.user_tz)
-                session_folder = await self._new_drive_dir(
-                    session_name, self.drive_root_id
-                )
-                return _SessionInfo(
-                    last_end,
-                    session_folder["id"],
-                    notion_page["id"],
-                )
+                folder_id = self._drive_folder_id_from_link(page.drive_link)
+                if folder_id is None:  # link missing or edited by the user
+                    session_name = build_session_name(title, page.start, self.user_tz)
+                    session_folder = await self._new_drive_dir(
+                        session_name, self.drive_root_id
+                    )
+                    folder_id = session_folder["id"]
+                return _SessionInfo(page.end, folder_id, page.id, page.start)
 
             else:
                 self.log.info(f"No sessions in Notion matching: {title}")
@@ -262,72 +1079,184 @@ class Uploader:
         return None
 
     async def _new_session(self, title: str, start: datetime) -> _SessionInfo:
+        # The folder id is allocated up front, so the folder and the Notion page
+        # linking to it are created concurrently: 2-3 requests instead of 6 in a row.
         session_name = build_session_name(title, start, self.user_tz)
-        session_folder = await self._new_drive_dir(session_name, self.drive_root_id)
-
-        notion_page = await self._new_notion_page(
-            session_name,
-            title,
-            start,
-            start,
-            self._get_drive_folder_link(session_folder),
-            self._get_drive_embed_link(session_folder),
+        folder_id = await self._allocate_drive_id()
+        _, notion_page = await asyncio.gather(
+            self._new_drive_dir_with_id(folder_id, session_name, self.drive_root_id),
+            self._new_notion_page(
+                session_name,
+                title,
+                start,
+                start,
+                self._get_drive_folder_link(folder_id),
+                self._get_drive_embed_link(folder_id),
+            ),
         )
-        return _SessionInfo(start, session_folder["id"], notion_page["id"])
+        # upsert branch of _new_notion_page: keep the folder the page links to
+        existing_folder_id = self._drive_folder_id_from_link(
+            notion_page["properties"][self.notion_props.drive_link]["url"]
+        )
+        if existing_folder_id is not None and existing_folder_id != folder_id:
+            await self._trash_drive_file(folder_id)
+            folder_id = existing_folder_id
+        return _SessionInfo(start, folder_id, notion_page["id"], start)
 
     # --- Drive helpers ---
+    def _drive_service(self) -> Any:
+        """The authorized Drive API client."""
+        auth = self._drive.auth
+        if auth.service is None:
+            auth.Authorize()
+        return auth.service
+
     @staticmethod
-    def _get_drive_embed_link(file: GoogleDriveFile) -> str:
+    def _get_drive_embed_link(folder_id: str) -> str:
         # See: https://stackoverflow.com/questions/20681974/how-to-embed-a-google-drive-folder-in-a-web-page
-        return f"https://drive.google.com/embeddedfolderview?id={file['id']}#grid"
+        return f"https://drive.google.com/embeddedfolderview?id={folder_id}#grid"
 
     @staticmethod
-    def _get_drive_folder_link(file: GoogleDriveFile) -> str:
-        return f"https://drive.google.com/drive/folders/{file['id']}"
+    def _get_drive_folder_link(folder_id: str) -> str:
+        return f"https://drive.google.com/drive/folders/{folder_id}"
+
+    @staticmethod
+    def _drive_folder_id_from_link(link: str | None) -> str | None:
+        prefix = "https://drive.google.com/drive/folders/"
+        if not link or not link.startswith(prefix):
+            return None
+        return link.removeprefix(prefix).split("?")[0] or None
+
+    async def _allocate_drive_id(self) -> str:
+        async with self._drive_ids_lock:
+            if not self._drive_ids:
+
+                def f() -> list[str]:
+                    service = self._drive_service()
+                    r = service.files().generateIds(
+                        maxResults=DRIVE_ID_BATCH, space="drive", fields="ids"
+                    )
+                    return r.execute(http=self._drive.auth.Get_Http_Object())["ids"]
+
+                self._count_request("drive.files.generateIds")
+                self._drive_ids = await asyncio.wait_for(
+                    asyncio.to_thread(f), IO_TIMEOUT_SEC
+                )
+            return self._drive_ids.pop()
+
+    async def _share_drive_folder(self, folder_id: str):
+        """Share a session folder by link. Only the folder: link access is inherited,
+        so sharing the root would expose every session. Permissions of folders
+        created around the same time share a Drive batch."""
+        await self._drive_batch.execute(
+            self._drive_service().permissions().insert(
+                fileId=folder_id,
+                body={"type": "anyone", "role": "reader", "allowFileDiscovery": False},
+                supportsAllDrives=True,
+                fields="id",
+            ),
+            "drive.permissions.insert",
+        )
+
+    async def _new_drive_dir_with_id(self, folder_id: str, name: str, parent_id: str):
+        body = {
+            "id": folder_id,
+            "title": name,
+            "mimeType": DRIVE_FOLDER_MIME_TYPE,
+            "parents": [{"id": parent_id}],
+        }
+        await self._drive_batch.execute(
+            self._drive_service().files().insert(
+                body=body, supportsAllDrives=True, fields="id"
+            ),
+            "drive.files.insert",
+        )
+        # batched calls run in no particular order, so sharing waits for the folder
+        await self._share_drive_folder(folder_id)
+        self.log.info(
+            f"Created Drive folder {name} ({folder_id}) with parent {parent_id}"
+        )
 
     @staticmethod
     def _drive_query_escape(s: str) -> str:
         # https://developers.google.com/workspace/drive/api/guides/search-files#examples
         return s.replace("\\", "\\\\").replace("'", r"\'")
 
-    async def _new_drive_dir(self, name: str, parent_id: str | None) -> GoogleDriveFile:
-        # TODO: Use aiogoogle for true async work
-        def f() -> tuple[GoogleDriveFile, bool]:
-            q = (
-                "mimeType='application/vnd.google-apps.folder' and trashed=false "
-                f"and title='{self._drive_query_escape(name)}'"
-                + (f" and '{parent_id}' in parents" if parent_id else "")
-            )
-            found = self._drive.ListFile({"q": q}).GetList()
-            if found:
-                return found[0], False
-            meta: dict[str, Any] = {
-                "title": name,
-                "mimeType": "application/vnd.google-apps.folder",
-            }
-            if parent_id:
-                meta["parents"] = [{"id": parent_id}]
-            file = self._drive.CreateFile(meta)
-            file.Upload()
-            file.InsertPermission(
-                {"type": "anyone", "role": "reader", "allowFileDiscovery": False}
-            )
-            return file, True
-
-        file, created = await asyncio.wait_for(asyncio.to_thread(f), IO_TIMEOUT_SEC)
-        if created:
-            self.log.info(
-                f"Created Drive folder {name} ({file['id']}) with parent {parent_id}"
-            )
-        else:
+    async def _new_drive_dir(self, name: str, parent_id: str | None) -> dict[str, Any]:
+        service = self._drive_service()
+        q = (
+            f"mimeType='{DRIVE_FOLDER_MIME_TYPE}' and trashed=false "
+            f"and title='{self._drive_query_escape(name)}'"
+            + (f" and '{parent_id}' in parents" if parent_id else "")
+        )
+        found = await self._drive_batch.execute(
+            service.files().list(
+                q=q,
+                maxResults=1,
+                supportsAllDrives=True,
+                includeItemsFromAllDrives=True,
+                fields="items(id)",
+            ),
+            "drive.files.list",
+        )
+        if found["items"]:
+            file = found["items"][0]
             self.log.debug(
                 f"Reusing Drive folder {name} ({file['id']}) with parent {parent_id}"
             )
+            return file
+
+        meta: dict[str, Any] = {"title": name, "mimeType": DRIVE_FOLDER_MIME_TYPE}
+        if parent_id:
+            meta["parents"] = [{"id": parent_id}]
+        file = await self._drive_batch.execute(
+            service.files().insert(body=meta, supportsAllDrives=True, fields="id"),
+            "drive.files.insert",
+        )
+        await self._share_drive_folder(file["id"])
+        self.log.info(
+            f"Created Drive folder {name} ({file['id']}) with parent {parent_id}"
+        )
         return file
 
+    async def _trash_drive_file(self, file_id: str):
+        await self._drive_batch.execute(
+            self._drive_service().files().trash(
+                fileId=file_id, supportsAllDrives=True, fields="id"
+            ),
+            "drive.files.trash",
+        )
+        self.log.debug(f"Trashed Drive file {file_id}")
+
     async def _drive_upload_one(
-        self, drive_folder_id: str, path: str, drive_file_name: str
-    ) -> GoogleDriveFile:
+        self,
+        drive_folder_id: str,
+        path: str,
+        drive_file_name: str,
+        cleanup: bool = False,
+        similar_title: str | None = None,
+        digest: bytes | None = None,
+        size: int | None = None,
+        on_done: Callable[[], None] | None = None,
+        streams: int = 1,
+    ) -> GoogleDriveFile | None:
+        """Upload a file unless its content was uploaded before.
+
+        The file is read once: the same bytes are hashed for the content index and
+        the MD5 check against Drive, and sent as the upload body. Returns the Drive
+        file, or None when the content is a duplicate (cleaned up as if uploaded) or
+        is being uploaded by another worker (left for the next run).
+
+        With `similar_title` and a `phash_threshold`, an image perceptually similar
+        to any uploaded one of that title is a duplicate too. A known `digest` (and
+        `size`) of the file, from its manifest, skips reading a duplicate at all.
+
+        `streams` is the number of uploads sharing `self.bandwidth`, which the upload
+        deadline accounts for. `on_done` is called from the upload thread once the
+        file is handled, even if the awaiting coroutine was cancelled or timed out
+        meanwhile.
+        """
+
         # TODO: Use aiogoogle for true async work
         @backoff.on_exception(
             backoff.expo,
@@ -338,27 +1267,202 @@ class Uploader:
                 ConnectionResetError,
                 socket.timeout,
                 TimeoutError,
+                UploadChecksumError,
             ),
             max_tries=4,
             max_time=30,
             jitter=backoff.full_jitter,
             logger=self.log,
         )
-        def f():
+        def f(data: bytes, md5: str):
             file = self._drive.CreateFile(
-                {"title": drive_file_name, "parents": [{"id": drive_folder_id}]}
+                {
+                    "title": drive_file_name,
+                    "parents": [{"id": drive_folder_id}],
+                    "mimeType": mimetypes.guess_type(path)[0],
+                }
             )
-            file.SetContentFile(path)
-            file.Upload()
-            file.content.close()
+            file.content = ThrottledReader(io.BytesIO(data), self.bandwidth)
+            # pydrive2 uploads in a single 100 MB chunk; use small resumable chunks
+            # so bandwidth shaping applies while the file is on the wire, also when
+            # the rate is capped mid-upload (e.g. a detached upload once play starts)
+            file._BuildMediaBody = lambda: MediaIoBaseUpload(
+                file.content,
+                file.get("mimeType") or "application/octet-stream",
+                chunksize=UPLOAD_CHUNK_BYTES,
+                resumable=True,
+            )
+            self._count_request("drive.files.insert")
+            file.Upload(param={"fields": "id,md5Checksum"})
+            if file.get("md5Checksum") != md5:
+                self.log.warning(
+                    f"Checksum mismatch uploading {path}: "
+                    f"sent {md5}, Drive has {file.get('md5Checksum')}"
+                )
+                self._count_request("drive.files.trash")
+                file.Trash()
+                raise UploadChecksumError(path)
             return file
 
-        file = await asyncio.wait_for(asyncio.to_thread(f), IO_TIMEOUT_SEC)
-        self.log.debug(
-            f"Uploaded to drive: {path} -> {drive_folder_id!r}/{drive_file_name!r}"
-        )
+        # cleanup happens in the worker thread, so it isn't lost if the awaiting
+        # coroutine is cancelled and the thread is left to finish on its own
+        def g():
+            # the manifest digest spares reading a duplicate
+            duplicate_of = digest and self._uploaded_copy(digest, path)
+            if duplicate_of:
+                self.log.info(
+                    f"Skipping {path}: same content as Drive file {duplicate_of}"
+                )
+                if cleanup:
+                    self._cleanup_file(Path(path))
+                return None
+            try:
+                data = Path(path).read_bytes()
+            except FileNotFoundError:
+                self.log.warning(f"Skipping {path}: the file is missing")
+                if cleanup:
+                    self._cleanup_file(Path(path))
+                return None
+            data_digest = content_digest(data)
+            duplicate_of = self._uploaded_copy(data_digest, path)
+            if duplicate_of is not None:
+                self.log.info(
+                    f"Skipping {path}: same content as Drive file {duplicate_of}"
+                )
+                if cleanup:
+                    self._cleanup_file(Path(path))
+                return None
+
+            threshold = self.phash_threshold
+            phash_index, phash = None, None
+            if similar_title is not None and threshold is not None:
+                phash = self._phash(path, data)
+            if phash is not None:
+                assert similar_title is not None and threshold is not None
+                phash_index = self._phash_index(similar_title)
+                similar = phash_index.nearest(phash, threshold)
+                if similar is not None:
+                    self.log.info(
+                        f"Skipping {path}: similar to an uploaded {similar_title} "
+                        f"capture (distance {similar[1]})"
+                    )
+                    if cleanup:
+                        self._cleanup_file(Path(path))
+                    return None
+
+            in_flight = (similar_title, phash)
+            with self._in_flight_lock:
+                if data_digest in self._digests_in_flight:
+                    self.log.info(f"Skipping {path}: same content is being uploaded")
+                    return None
+                if phash is not None and any(
+                    t == similar_title and (h ^ phash).bit_count() <= threshold
+                    for t, h in self._phashes_in_flight
+                ):
+                    self.log.info(f"Skipping {path}: similar image is being uploaded")
+                    return None
+                self._digests_in_flight.add(data_digest)
+                if phash is not None:
+                    self._phashes_in_flight.append(in_flight)
+            try:
+                file = f(data, hashlib.md5(data).hexdigest())
+                self.content_index.add(data_digest, file["id"], drive_folder_id)
+                self._live_drive_ids.add(file["id"])
+                if phash_index is not None:
+                    phash_index.add(phash)
+            finally:
+                with self._in_flight_lock:
+                    self._digests_in_flight.discard(data_digest)
+                    if phash is not None:
+                        self._phashes_in_flight.remove(in_flight)
+            if cleanup:
+                self._cleanup_file(Path(path))
+            return file
+
+        def h():
+            file = g()
+            if on_done is not None:
+                on_done()
+            return file
+
+        if size is None:
+            size = Path(path).stat().st_size
+        # the rate is shared, so each stream gets about a `streams`-th of it
+        timeout = IO_TIMEOUT_SEC + self.bandwidth.expected_sec(size * streams)
+        file = await asyncio.wait_for(asyncio.to_thread(h), timeout)
+        if file is not None:
+            self.log.debug(
+                f"Uploaded to drive: {path} -> {drive_folder_id!r}/{drive_file_name!r}"
+            )
         return file
 
+    def _uploaded_copy(self, digest: bytes, path: str) -> str | None:
+        """Id of the Drive file uploaded with this content, unless it was trashed or
+        deleted since, in which case the content is forgotten (blocking, called from
+        upload threads)."""
+        file_id = self.content_index.get(digest)
+        if file_id is None or file_id in self._live_drive_ids:
+            return file_id
+        assert self._loop is not None
+        exists = asyncio.run_coroutine_threadsafe(
+            self._drive_file_exists(file_id), self._loop
+        ).result(2 * IO_TIMEOUT_SEC)
+        if exists:
+            self._live_drive_ids.add(file_id)
+            return file_id
+        self.log.info(f"Drive file {file_id} is gone, uploading {path} again")
+        self.content_index.discard(digest)
+        return None
+
+    async def _drive_file_exists(self, file_id: str) -> bool:
+        """Whether a Drive file exists outside the trash. Checks of concurrent upload
+        workers share a Drive batch. When in doubt, the file is assumed to exist."""
+        try:
+            file = await self._drive_batch.execute(
+                self._drive_service().files().get(
+                    fileId=file_id, supportsAllDrives=True, fields="labels(trashed)"
+                ),
+                "drive.files.get",
+            )
+        except Exception as e:
+            if isinstance(e, HttpError) and e.resp.status == 404:
+                return False
+            self.log.warning(f"Failed to check Drive file {file_id}", exc_info=True)
+            return True
+        return not file.get("labels", {}).get("trashed", False)
+
+    async def _notion_property_ids(self, *names: str) -> list[str]:
+        """Ids of database properties, for projecting query results with
+        `filter_properties` (which doesn't take names)."""
+        async with self._notion_prop_ids_lock:
+            if self._notion_prop_ids is None:
+                self._count_request("notion.databases.retrieve")
+                db: dict[str, Any] = await asyncio.wait_for(
+                    self._notion.databases.retrieve(self.notion_db_id), IO_TIMEOUT_SEC
+                )
+                self._notion_prop_ids = {
+                    name: prop["id"] for name, prop in db["properties"].items()
+                }
+        return [self._notion_prop_ids[name] for name in names]
+
+    def _phash(self, path: str, data: bytes) -> int | None:
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                return int(str(imagehash.phash(image)), 16)
+        except (OSError, ValueError):  # not an image, or a truncated one
+            self.log.warning(f"Failed to compute the phash of {path}", exc_info=True)
+            return None
+
+    def _phash_index(self, title: str) -> PHashIndex:
+        # blocking: loading an index reads and files every hash of the title
+        with self._phash_indexes_lock:
+            index = self._phash_indexes.get(title)
+            if index is None:
+                self.phash_dir.mkdir(exist_ok=True)
+                index = PHashIndex(self.phash_dir / f"{title}.phash")
+                self._phash_indexes[title] = index
+        return index
+
     def _notion_local_iso(self, dt: datetime) -> str:
         return dt.astimezone(self.user_tz).isoformat(timespec="seconds")
 
@@ -371,6 +1475,7 @@ class Uploader:
                 }
             },
         }
+        self._count_request("notion.pages.update")
         await self._notion.pages.update(page_id, properties=props)
 
     async def _new_notion_page(
@@ -402,6 +1507,10 @@ class Uploader:
             self.notion_props.drive_link: {"url": drive_link},
         }
         # query for an existing page matching the immutable title/start combo
+        filter_properties = await self._notion_property_ids(
+            self.notion_props.drive_link
+        )
+        self._count_request("notion.databases.query")
         q: dict[str, Any] = await asyncio.wait_for(
             self._notion.databases.query(
                 database_id=self.notion_db_id,
@@ -418,41 +1527,39 @@ class Uploader:
                     ]
                 },
                 page_size=1,
+                filter_properties=filter_properties,
             ),
             IO_TIMEOUT_SEC,
         )
         # upsert branch (shouldn't happen tho...)
         if q["results"]:
-            page_id = q["results"][0]["id"]
+            existing = q["results"][0]
+            page_id = existing["id"]
             # avoid updating page name to allow the user to modify the page title during a session
             props.pop(self.notion_props.name, None)
+            # keep the folder the page (and its embed block) already points to
+            if existing["properties"].get(self.notion_props.drive_link, {}).get("url"):
+                props.pop(self.notion_props.drive_link)
             self.log.info(f"Updating Notion page {page_id} for session {name}")
+            self._count_request("notion.pages.update")
             page = await self._notion.pages.update(page_id, properties=props)
         # insert branch
         else:
             self.log.info(
                 f"Creating Notion page for session {name} in database {self.notion_db_id}"
             )
+            # the embed block is created with the page rather than appended after it
+            self._count_request("notion.pages.create")
             page = await self._notion.pages.create(
                 parent={"database_id": self.notion_db_id},
                 properties=props,
-            )
-
-            await asyncio.wait_for(
-                self._notion.blocks.children.append(
-                    block_id=page["id"],
-                    children=[
-                        {
-                            "object": "block",
-                            "type": "embed",
-                            "embed": {"url": embed_link},
-                        }
-                    ],
-                ),
-                IO_TIMEOUT_SEC,
-            )
-            self.log.debug(
-                f"Added embed block to Notion page {page['id']} pointing to {embed_link}"
+                children=[
+                    {
+                        "object": "block",
+                        "type": "embed",
+                        "embed": {"url": embed_link},
+                    }
+                ],
             )
         return page
 
@@ -473,6 +1580,7 @@ async def _main():
         config.session.minimum_session_gap_min,
         config.session.minimum_session_length_min,
         config.session.delete_after_upload,
+        phash_threshold=config.session.phash_threshold,
     )
 
     try:
@@ -0,0 +1,335 @@
+import logging
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, TypeAlias
+
+# https://learn.microsoft.com/en-us/windows/win32/winmsg/window-styles
+WS_OVERLAPPEDWINDOW = 0x00CF0000
+WS_EX_TOOLWINDOW = 0x00000080
+
+Rect: TypeAlias = tuple[int, int, int, int]  # left, top, right, bottom
+
+log = logging.getLogger(__name__)
+
+
+class WindowSystem(ABC):
+    """Minimal window-system queries needed to classify top-level windows."""
+
+    @abstractmethod
+    def is_window(self, hwnd: int) -> bool: ...
+
+    @abstractmethod
+    def is_visible(self, hwnd: int) -> bool: ...
+
+    @abstractmethod
+    def is_iconic(self, hwnd: int) -> bool: ...
+
+    @abstractmethod
+    def get_parent(self, hwnd: int) -> int: ...
+
+    @abstractmethod
+    def get_owner(self, hwnd: int) -> int: ...
+
+    @abstractmethod
+    def get_style(self, hwnd: int) -> int: ...
+
+    @abstractmethod
+    def get_exstyle(self, hwnd: int) -> int: ...
+
+    @abstractmethod
+    def is_cloaked(self, hwnd: int) -> bool: ...
+
+    @abstractmethod
+    def get_text(self, hwnd: int) -> str: ...
+
+    @abstractmethod
+    def get_rect(self, hwnd: int) -> Rect | None:
+        """Window rect, or None if it cannot be queried."""
+
+    @abstractmethod
+    def get_monitor_rect(self, hwnd: int, nearest: bool) -> Rect | None:
+        """Rect of the monitor displaying `hwnd`.
+
+        When `nearest` is False, None is returned if the window is off-screen.
+        """
+
+    @abstractmethod
+    def get_pid(self, hwnd: int) -> int: ...
+
+    @abstractmethod
+    def get_process_exe(self, pid: int) -> str | None: ...
+
+
+# --- Cached window state ---
+# Values which change with position, size, minimize/restore, fullscreen toggles,
+# cloaking and retitling are invalidated by EVENT_OBJECT_LOCATIONCHANGE and
+# EVENT_SYSTEM_FOREGROUND (the title is empty while many games start). The window
+# hierarchy and owning process are kept, unless the handle was reused by another
+# process: system-wide NAMECHANGE/DESTROY hooks would cost far more than the checks.
+_VOLATILE_KEYS = frozenset(
+    (
+        "is_window",
+        "text",
+        "visible",
+        "iconic",
+        "style",
+        "exstyle",
+        "cloaked",
+        "rect",
+        "monitor_nearest",
+        "monitor_null",
+    )
+)
+
+
+@dataclass(slots=True)
+class _WindowState:
+    values: dict[str, Any]
+
+
+class WindowStateCache:
+    """Per-hwnd memoization of `WindowSystem` queries, invalidated by hooked events.
+
+    Holds up to `max_windows` windows, evicting the least recently queried one.
+    """
+
+    def __init__(self, window_system: WindowSystem, max_windows: int = 512) -> None:
+        self.window_system = window_system
+        self.max_windows = max_windows
+        self._states: OrderedDict[int, _WindowState] = OrderedDict()
+
+    def _get(self, hwnd: int, key: str, fetch: Callable[[int], Any]) -> Any:
+        state = self._states.get(hwnd)
+        if state is None:
+            state = _WindowState({})
+            self._states[hwnd] = state
+            if len(self._states) > self.max_windows:
+                self._states.popitem(last=False)
+        else:
+            self._states.move_to_end(hwnd)
+        try:
+            return state.values[key]
+        except KeyError:
+            value = state.values[key] = fetch(hwnd)
+            return value
+
+    def on_location_change(self, hwnd: int) -> None:
+        state = self._states.get(hwnd)
+        if state is None:
+            return
+        pid = state.values.get("pid")
+        if pid is not None and pid != self.window_system.get_pid(hwnd):
+            del self._states[hwnd]  # destroyed, and the handle reused
+            return
+        for key in _VOLATILE_KEYS.intersection(state.values):
+            del state.values[key]
+
+    on_foreground = on_location_change
+
+    def forget(self, hwnd: int) -> None:
+        self._states.pop(hwnd, None)
+
+    def clear(self) -> None:
+        self._states.clear()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def exe(self, hwnd: int) -> str | None:
+        ws = self.window_system
+        # through pid(), which invalidation compares to detect a reused handle
+        return self._get(hwnd, "exe", lambda h: ws.get_process_exe(self.pid(h)))
+
+    def pid(self, hwnd: int) -> int:
+        return self._get(hwnd, "pid", self.window_system.get_pid)
+
+    def is_fullscreen(self, hwnd: int) -> bool:
+        ws = self.window_system
+        if not self._get(hwnd, "visible", ws.is_visible) or self._get(
+            hwnd, "iconic", ws.is_iconic
+        ):
+            return False
+        rect = self._get(hwnd, "rect", ws.get_rect)
+        monitor = self._get(
+            hwnd, "monitor_nearest", lambda h: ws.get_monitor_rect(h, True)
+        )
+        return rect is not None and rect == monitor
+
+    def is_hidden(self, hwnd: int) -> bool:
+        ws = self.window_system
+        # Must be a valid, visible, top-level window
+        if not self._get(hwnd, "is_window", ws.is_window):
+            log.debug(f"{hwnd}: IsWindow")
+            self.forget(hwnd)  # destroyed; the handle may be reused
+            return True
+        if not self._get(hwnd, "visible", ws.is_visible):
+            log.debug(f"{hwnd}: IsWindowVisible")
+            return True
+        if self._get(hwnd, "iconic", ws.is_iconic):
+            log.debug(f"{hwnd}: IsIconic")
+            return True
+        if self._get(hwnd, "parent", ws.get_parent):  # has parent → not top-level
+            log.debug(f"{hwnd}: GetParent")
+            return True
+
+        # Must not be owned (tooltips, dialogs, etc.)
+        if self._get(hwnd, "owner", ws.get_owner):
+            log.debug(f"{hwnd}: GetWindow")
+            return True
+
+        # Tool or popup windows are not user-facing
+        if self._get(hwnd, "exstyle", ws.get_exstyle) & WS_EX_TOOLWINDOW:
+            log.debug(f"{hwnd}: WS_EX_TOOLWINDOW")
+            return True
+        if not (self._get(hwnd, "style", ws.get_style) & WS_OVERLAPPEDWINDOW):
+            log.debug(f"{hwnd}: WS_OVERLAPPEDWINDOW")
+            return True
+
+        # Skip cloaked (UWP, virtual desktop hidden)
+        if self._get(hwnd, "cloaked", ws.is_cloaked):
+            log.debug(f"{hwnd}: cloaked")
+            return True
+
+        # Skip windows without a visible title
+        if not self._get(hwnd, "text", ws.get_text).strip():
+            log.debug(f"{hwnd}: GetWindowText")
+            return True
+
+        # Skip off-screen or zero-area windows
+        rect = self._get(hwnd, "rect", ws.get_rect)
+        if rect is None:
+            log.debug(f"{hwnd}: GetWindowRect Error")
+            return True
+        left, top, right, bottom = rect
+        if right - left < 50 or bottom - top < 50:
+            log.debug(f"{hwnd}: GetWindowRect")
+            return True
+        monitor = self._get(
+            hwnd, "monitor_null", lambda h: ws.get_monitor_rect(h, False)
+        )
+        if monitor is None:
+            log.debug(f"{hwnd}: MonitorFromWindow")
+            return True
+
+        return False
+
+
+# --- In-memory backend ---
+@dataclass(slots=True)
+class FakeWindow:
+    pid: int
+    text: str = "Window"
+    rect: Rect | None = (0, 0, 1920, 1080)
+    visible: bool = True
+    iconic: bool = False
+    parent: int = 0
+    owner: int = 0
+    style: int = WS_OVERLAPPEDWINDOW
+    exstyle: int = 0
+    cloaked: bool = False
+
+
+class FakeWindowSystem(WindowSystem):
+    """In-memory window system with a single monitor, counting every query in `calls`."""
+
+    def __init__(self, monitor: Rect = (0, 0, 1920, 1080)) -> None:
+        self.monitor = monitor
+        self.windows: dict[int, FakeWindow] = {}
+        self.exes: dict[int, str] = {}
+        self.calls: Counter[str] = Counter()
+
+    def _window(self, hwnd: int, call: str) -> FakeWindow:
+        self.calls[call] += 1
+        # destroyed windows behave like win32: invisible, without a rect
+        return self.windows.get(hwnd) or FakeWindow(0, "", None, visible=False)
+
+    def is_window(self, hwnd: int) -> bool:
+        self.calls["is_window"] += 1
+        return hwnd in self.windows
+
+    def is_visible(self, hwnd: int) -> bool:
+        return self._window(hwnd, "is_visible").visible
+
+    def is_iconic(self, hwnd: int) -> bool:
+        return self._window(hwnd, "is_iconic").iconic
+
+    def get_parent(self, hwnd: int) -> int:
+        return self._window(hwnd, "get_parent").parent
+
+    def get_owner(self, hwnd: int) -> int:
+        return self._window(hwnd, "get_owner").owner
+
+    def get_style(self, hwnd: int) -> int:
+        return self._window(hwnd, "get_style").style
+
+    def get_exstyle(self, hwnd: int) -> int:
+        return self._window(hwnd, "get_exstyle").exstyle
+
+    def is_cloaked(self, hwnd: int) -> bool:
+        return self._window(hwnd, "is_cloaked").cloaked
+
+    def get_text(self, hwnd: int) -> str:
+        return self._window(hwnd, "get_text").text
+
+    def get_rect(self, hwnd: int) -> Rect | None:
+        return self._window(hwnd, "get_rect").rect
+
+    def get_monitor_rect(self, hwnd: int, nearest: bool) -> Rect | None:
+        rect = self._window(hwnd, "get_monitor_rect").rect
+        if nearest:
+            return self.monitor
+        if rect is None:
+            return None
+        l, t, r, b = rect
+        ml, mt, mr, mb = self.monitor
+        overlaps = l < mr and r > ml and t < mb and b > mt
+        return self.monitor if overlaps else None
+
+    def get_pid(self, hwnd: int) -> int:
+        return self._window(hwnd, "get_pid").pid
+
+    def get_process_exe(self, pid: int) -> str | None:
+        self.calls["get_process_exe"] += 1
+        return self.exes.get(pid)
+
+
+# poetry run python -m game_session_sync.window_system
+def _bench():
+    import time
+
+    NUM_EVENTS = 100_000
+    GAME_HWND, BROWSER_HWND = 1, 2
+
+    ws = FakeWindowSystem()
+    ws.windows[GAME_HWND] = FakeWindow(10, "Game")
+    ws.windows[BROWSER_HWND] = FakeWindow(20, "Browser", (100, 100, 900, 700))
+    ws.exes.update({10: r"C:\Games\Game\game.exe", 20: r"C:\Browser\browser.exe"})
+
+    def run(invalidate: Callable[[WindowStateCache, int], None]):
+        ws.calls.clear()
+        cache = WindowStateCache(ws)
+        start = time.perf_counter()
+        for i in range(NUM_EVENTS):
+            hwnd = GAME_HWND if i % 4 else BROWSER_HWND
+            invalidate(cache, hwnd)
+            if not cache.is_hidden(hwnd):
+                cache.exe(hwnd)
+                cache.is_fullscreen(hwnd)
+        elapsed = time.perf_counter() - start
+        return elapsed, ws.calls.total() / NUM_EVENTS
+
+    for name, invalidate in (
+        ("uncached", lambda cache, hwnd: cache.forget(hwnd)),
+        ("location change", WindowStateCache.on_location_change),
+        ("no invalidation", lambda cache, hwnd: None),
+    ):
+        elapsed, calls_per_event = run(invalidate)
+        print(
+            f"{name:>16}: {calls_per_event:5.2f} window system calls/event, "
+            f"{NUM_EVENTS / elapsed:,.0f} events/sec"
+        )
+
+
+if __name__ == "__main__":
+    _bench()
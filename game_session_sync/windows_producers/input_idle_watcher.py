@@ -149,12 +149,12 @@ class InputIdleWatcher:
 
     async def _emit_idle(self):
         await asyncio.sleep(self.max_idle_seconds)
-        self.queue.put_nowait(InputIdleEvent())
+        self.queue.publish(InputIdleEvent())
 
     async def _handle_raw_input(self):
         # _idle_task is done, meaning InputIdleEvent was emitted and InputActiveEvent is needed
         if self._idle_task.done():
-            self.queue.put_nowait(InputActiveEvent())
+            self.queue.publish(InputActiveEvent())
 
         self._idle_task.cancel()
         self._idle_task = asyncio.create_task(self._emit_idle())
@@ -0,0 +1,80 @@
+import ctypes
+import psutil
+import win32gui
+import win32process
+from ctypes import wintypes
+
+import win32api
+import win32con
+
+from ..window_system import Rect, WindowSystem
+
+# DWM Enum https://learn.microsoft.com/en-us/windows/win32/api/dwmapi/ne-dwmapi-dwmwindowattribute
+DWMWA_CLOAKED = 14
+DWM_CLOAKED_APP = 0x1
+DWM_CLOAKED_SHELL = 0x2
+DwmGetWindowAttribute = ctypes.windll.dwmapi.DwmGetWindowAttribute
+
+
+class Win32WindowSystem(WindowSystem):
+    def is_window(self, hwnd: int) -> bool:
+        return bool(win32gui.IsWindow(hwnd))
+
+    def is_visible(self, hwnd: int) -> bool:
+        return bool(win32gui.IsWindowVisible(hwnd))
+
+    def is_iconic(self, hwnd: int) -> bool:
+        return bool(win32gui.IsIconic(hwnd))
+
+    def get_parent(self, hwnd: int) -> int:
+        return win32gui.GetParent(hwnd)
+
+    def get_owner(self, hwnd: int) -> int:
+        return win32gui.GetWindow(hwnd, win32con.GW_OWNER)
+
+    def get_style(self, hwnd: int) -> int:
+        return win32api.GetWindowLong(hwnd, win32con.GWL_STYLE)
+
+    def get_exstyle(self, hwnd: int) -> int:
+        return win32api.GetWindowLong(hwnd, win32con.GWL_EXSTYLE)
+
+    def is_cloaked(self, hwnd: int) -> bool:
+        cloaked = wintypes.DWORD()
+        DwmGetWindowAttribute(
+            wintypes.HWND(hwnd),
+            wintypes.DWORD(DWMWA_CLOAKED),
+            ctypes.byref(cloaked),
+            ctypes.sizeof(cloaked),
+        )
+        return cloaked.value != 0
+
+    def get_text(self, hwnd: int) -> str:
+        return win32gui.GetWindowText(hwnd)
+
+    def get_rect(self, hwnd: int) -> Rect | None:
+        try:
+            return win32gui.GetWindowRect(hwnd)
+        except win32gui.error:
+            return None
+
+    def get_monitor_rect(self, hwnd: int, nearest: bool) -> Rect | None:
+        flags = (
+            win32con.MONITOR_DEFAULTTONEAREST
+            if nearest
+            else win32con.MONITOR_DEFAULTTONULL
+        )
+        monitor = win32api.MonitorFromWindow(hwnd, flags)
+        if not monitor:
+            return None
+        ml, mt, mr, mb = win32api.GetMonitorInfo(monitor)["Monitor"]
+        return ml, mt, mr, mb
+
+    def get_pid(self, hwnd: int) -> int:
+        _, pid = win32process.GetWindowThreadProcessId(hwnd)
+        return pid
+
+    def get_process_exe(self, pid: int) -> str | None:
+        try:
+            return psutil.Process(pid).exe()
+        except psutil.NoSuchProcess:
+            return None
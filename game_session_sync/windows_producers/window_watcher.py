@@ -4,28 +4,30 @@
 import asyncio
 import logging
 import re
-import threading
 from datetime import datetime, timedelta
 from typing import Callable
 
 import ctypes
 import psutil
 import pythoncom
-import win32gui
-import win32process
 from ctypes import wintypes
 
 import win32api
 import win32con
 import win32event
 
+from game_session_sync.debounce_utils import KeyedDebouncer
+from game_session_sync.message_loop import MessageLoop, Win32MessageLoop
+from game_session_sync.window_system import WindowStateCache, WindowSystem
+from game_session_sync.windows_producers.win32_window_system import (
+    Win32WindowSystem,
+)
 from game_session_sync.windows_producers.types import (
     EventBus,
     GameCloseEvent,
     GameFullscreenEvent,
     GameMinimizedEvent,
 )
-from game_session_sync.windows_producers.utils import async_debounce
 
 log = logging.getLogger(__name__)
 
@@ -47,13 +49,6 @@ def _pid_to_exe(pid: int) -> str | None:
         return None
 
 
-def _hwnd_to_exe(hwnd: int) -> str | None:
-    # NOTE: We may use the window title: https://stackoverflow.com/a/48857220
-    # window_name = win32gui.GetWindowText(hwnd).replace("\u200b", "")
-    _, pid = win32process.GetWindowThreadProcessId(hwnd)
-    return _pid_to_exe(pid)
-
-
 class _ProcessExitWatcher:
     def __init__(self, queue: EventBus, exe_patterns: list[re.Pattern]) -> None:
         self.queue = queue
@@ -89,15 +84,11 @@ class _ProcessExitWatcher:
 
         def done_callback(_):
             self._tasks.pop(pid)
-            self.queue.put_nowait(GameCloseEvent(title))
+            self.queue.publish(GameCloseEvent(title))
 
         self._tasks[pid] = (task, done_callback)
         task.add_done_callback(done_callback)
 
-    def add_hwnd(self, hwnd: int):
-        _, pid = win32process.GetWindowThreadProcessId(hwnd)
-        self.add_pid(pid)
-
     def clear_all(self):
         for task, callback in self._tasks.values():
             task.remove_done_callback(callback)
@@ -109,92 +100,6 @@ GetTickCount64 = ctypes.windll.kernel32.GetTickCount64
 GetTickCount64.restype = ctypes.c_ulonglong
 GetSystemTimeAsFileTime = ctypes.windll.kernel32.GetSystemTimeAsFileTime
 
-# DWM Enum https://learn.microsoft.com/en-us/windows/win32/api/dwmapi/ne-dwmapi-dwmwindowattribute
-DWMWA_CLOAKED = 14
-DWM_CLOAKED_APP = 0x1
-DWM_CLOAKED_SHELL = 0x2
-DwmGetWindowAttribute = ctypes.windll.dwmapi.DwmGetWindowAttribute
-
-
-def _is_fullscreen(hwnd: int) -> bool:
-    if not win32gui.IsWindowVisible(hwnd) or win32gui.IsIconic(hwnd):
-        return False
-    l, t, r, b = win32gui.GetWindowRect(hwnd)
-    mi = win32api.GetMonitorInfo(
-        win32api.MonitorFromWindow(hwnd, win32con.MONITOR_DEFAULTTONEAREST)
-    )
-    ml, mt, mr, mb = mi["Monitor"]
-    return (l, t, r, b) == (ml, mt, mr, mb)
-
-
-def _is_hidden(hwnd: int) -> bool:
-    # Must be a valid, visible, top-level window
-    if not win32gui.IsWindow(hwnd):
-        log.debug(f"{hwnd}: win32gui.IsWindow")
-        return True
-    if not win32gui.IsWindowVisible(hwnd):
-        log.debug(f"{hwnd}: win32gui.IsWindowVisible")
-        return True
-    if win32gui.IsIconic(hwnd):
-        log.debug(f"{hwnd}: win32gui.IsIconic")
-        return True
-    if win32gui.GetParent(hwnd):  # has parent → not top-level
-        log.debug(f"{hwnd}: win32gui.GetParent")
-        return True
-
-    # Must not be owned (tooltips, dialogs, etc.)
-    if win32gui.GetWindow(hwnd, win32con.GW_OWNER):
-        log.debug(f"{hwnd}: win32gui.GetWindow")
-        return True
-
-    exstyle = win32api.GetWindowLong(hwnd, win32con.GWL_EXSTYLE)
-    style = win32api.GetWindowLong(hwnd, win32con.GWL_STYLE)
-
-    # Tool or popup windows are not user-facing
-    if exstyle & win32con.WS_EX_TOOLWINDOW:
-        log.debug(f"{hwnd}: win32con.WS_EX_TOOLWINDOW")
-        return True
-    if not (style & win32con.WS_OVERLAPPEDWINDOW):
-        log.debug(f"{hwnd}: win32con.WS_OVERLAPPEDWINDOW")
-        return True
-
-    # Skip cloaked (UWP, virtual desktop hidden)
-    cloaked = wintypes.DWORD()
-    DwmGetWindowAttribute(
-        wintypes.HWND(hwnd),
-        wintypes.DWORD(DWMWA_CLOAKED),
-        ctypes.byref(cloaked),
-        ctypes.sizeof(cloaked),
-    )
-    if cloaked.value != 0:
-        log.debug(f"{hwnd}: cloaked")
-        return True
-
-    # Skip windows without a visible title
-    title = win32gui.GetWindowText(hwnd)
-    if not title.strip():
-        log.debug(f"{hwnd}: win32gui.GetWindowText")
-        return True
-
-    # Skip off-screen or zero-area windows
-    try:
-        left, top, right, bottom = win32gui.GetWindowRect(hwnd)
-    except win32gui.error:
-        log.debug(f"{hwnd}: win32gui.GetWindowRect Error")
-        return True
-    if right - left < 50 or bottom - top < 50:
-        log.debug(f"{hwnd}: win32gui.GetWindowRect")
-        return True
-    if win32api.MonitorFromWindow(hwnd, win32con.MONITOR_DEFAULTTONULL) == 0:
-        log.debug(f"{hwnd}: win32api.MonitorFromWindow")
-        return True
-
-    # Pass only if it would appear in Alt+Tab
-    # if exstyle & win32con.WS_EX_APPWINDOW or not (exstyle & win32con.WS_EX_TOOLWINDOW):
-    #     return False
-
-    return False
-
 
 def _event_time_to_datetime(dwmsEventTime: int) -> datetime:
     now = datetime.now()
@@ -209,21 +114,29 @@ class WindowEventWatcher:
         win32con.EVENT_SYSTEM_FOREGROUND,
         win32con.EVENT_OBJECT_LOCATIONCHANGE,
     ]
-    # TODO: Use stop signal event to stop instead of polling
-    STOP_EVENT_POLLING_MS = 250
+    LOC_CHANGE_DEBOUNCE_SEC = 2
 
     def __init__(
         self,
         queue: EventBus,
         exe_patterns: list[str],
+        message_loop_factory: Callable[[], MessageLoop] = Win32MessageLoop,
+        window_system: WindowSystem | None = None,
     ) -> None:
         self.queue = queue
         self.exe_patterns = [re.compile(p) for p in exe_patterns]
+        self._windows = WindowStateCache(window_system or Win32WindowSystem())
 
         self._process_exit_watcher = _ProcessExitWatcher(queue, self.exe_patterns)
         self._last_foreground_title = None
+        # EVENT_OBJECT_LOCATIONCHANGE events are sent in rapid bursts,
+        # so debounce is used to ease off events sent to controller, independently per hwnd
+        self._loc_change_debouncer: KeyedDebouncer[int] = KeyedDebouncer(
+            self._handle_loc_change, WindowEventWatcher.LOC_CHANGE_DEBOUNCE_SEC
+        )
         self._thread_task: asyncio.Task | None = None
-        self._thread_stop_event = threading.Event()
+        self._message_loop_factory = message_loop_factory
+        self._message_loop: MessageLoop | None = None
         self.log = logging.getLogger(self.__class__.__name__)
 
     WIN_EVENT_PROC_TYPE = ctypes.WINFUNCTYPE(
@@ -251,12 +164,9 @@ class WindowEventWatcher:
             # call_soon_threadsafe for **synchronous** functions modifying awaitable objects (like queues etc.)
             self.loop.call_soon_threadsafe(self._handle_foreground, hwnd, dwmsEventTime)
         elif event == win32con.EVENT_OBJECT_LOCATIONCHANGE:
-            # run_coroutine_threadsafe for awaitable objects
-            asyncio.run_coroutine_threadsafe(
-                self._handle_loc_change(hwnd, dwmsEventTime), self.loop
-            )
+            self.loop.call_soon_threadsafe(self._on_loc_change, hwnd, dwmsEventTime)
 
-    def _thread_run(self) -> None:
+    def _thread_run(self, message_loop: MessageLoop) -> None:
         # https://learn.microsoft.com/en-us/windows/win32/api/winuser/nc-winuser-wineventproc
         CWinEventProc = self.WIN_EVENT_PROC_TYPE(self._WinEventProc)
         hooks = []
@@ -277,12 +187,8 @@ class WindowEventWatcher:
                         | win32con.WINEVENT_SKIPOWNPROCESS,
                     )
                 )
-            # Message loop
-            while not self._thread_stop_event.is_set():
-                win32gui.PumpWaitingMessages()
-                self._thread_stop_event.wait(
-                    WindowEventWatcher.STOP_EVENT_POLLING_MS / 1000
-                )
+            # Blocks until either hook messages arrive or stop() is called
+            message_loop.run()
         finally:
             for hook in hooks:
                 if hook:
@@ -290,45 +196,59 @@ class WindowEventWatcher:
             pythoncom.CoUninitialize()
 
     def _handle_foreground(self, hwnd, dwmsEventTime):
-        if _is_hidden(hwnd):
+        self._windows.on_foreground(hwnd)
+        if self._windows.is_hidden(hwnd):
             return
 
         timestamp = _event_time_to_datetime(dwmsEventTime)
-        title = _extract_title(_hwnd_to_exe(hwnd), self.exe_patterns)
+        title = _extract_title(self._windows.exe(hwnd), self.exe_patterns)
 
         # new foreground window is not a game while the last window was a game
         if title is None and self._last_foreground_title is not None:
-            self.queue.put_nowait(
+            self.queue.publish(
                 GameMinimizedEvent(self._last_foreground_title, timestamp)
             )
             self._last_foreground_title = None
         # new foreground window is a fullscreen game while the last window was not
         # the same game (avoid sending fullscreen after refocus from hidden windows)
-        elif title and _is_fullscreen(hwnd) and self._last_foreground_title != title:
-            self.queue.put_nowait(GameFullscreenEvent(title, timestamp))
-            self._process_exit_watcher.add_hwnd(hwnd)
+        elif (
+            title
+            and self._windows.is_fullscreen(hwnd)
+            and self._last_foreground_title != title
+        ):
+            self.queue.publish(GameFullscreenEvent(title, timestamp))
+            self._process_exit_watcher.add_pid(self._windows.pid(hwnd))
             self._last_foreground_title = title
 
-    # EVENT_OBJECT_LOCATIONCHANGE events are sent in rapid bursts,
-    # so debounce is used ease off events sent to controller
-    @async_debounce(2)
-    async def _handle_loc_change(self, hwnd, dwmsEventTime):
-        if _is_hidden(hwnd):
+    def _on_loc_change(self, hwnd, dwmsEventTime):
+        # every event invalidates the cached geometry, but only the last one of a burst
+        # is handled, keyed by hwnd so bursts of one window don't swallow another's
+        self._windows.on_location_change(hwnd)
+        self._loc_change_debouncer(hwnd, hwnd, dwmsEventTime)
+
+    def _handle_loc_change(self, hwnd, dwmsEventTime):
+        if self._windows.is_hidden(hwnd):
             return
 
         timestamp = _event_time_to_datetime(dwmsEventTime)
-        title = _extract_title(_hwnd_to_exe(hwnd), self.exe_patterns)
+        title = _extract_title(self._windows.exe(hwnd), self.exe_patterns)
 
-        if title is not None and _is_fullscreen(hwnd):
-            self.queue.put_nowait(GameFullscreenEvent(title, timestamp))
-            self._process_exit_watcher.add_hwnd(hwnd)
+        if title is not None and self._windows.is_fullscreen(hwnd):
+            self.queue.publish(GameFullscreenEvent(title, timestamp))
+            self._process_exit_watcher.add_pid(self._windows.pid(hwnd))
 
     async def run(self):
         self.loop = asyncio.get_running_loop()
-        self._thread_task = asyncio.create_task(asyncio.to_thread(self._thread_run))
+        # created before the thread starts, so an early stop() is never lost
+        self._message_loop = self._message_loop_factory()
+        self._thread_task = asyncio.create_task(
+            asyncio.to_thread(self._thread_run, self._message_loop)
+        )
 
     async def stop(self):
-        self._thread_stop_event.set()
+        if self._message_loop:
+            self._message_loop.stop()
+        self._loc_change_debouncer.cancel()
         self._process_exit_watcher.clear_all()
         if self._thread_task:
             await self._thread_task
@@ -0,0 +1,139 @@
+import asyncio
+from dataclasses import dataclass
+
+import pytest
+
+from game_session_sync.types import OverflowPolicy, PubSubBus
+
+
+@dataclass
+class Ping:
+    key: str
+    n: int
+
+
+@dataclass
+class Pong:
+    n: int
+
+
+@dataclass
+class LoudPing(Ping):
+    pass
+
+
+def _drain(sub) -> list:
+    items = []
+    while not sub.empty():
+        items.append(sub.get_nowait())
+    return items
+
+
+def test_every_subscriber_gets_every_matching_event():
+    bus: PubSubBus = PubSubBus()
+    everything = bus.subscribe("everything")
+    pings = bus.subscribe("pings", Ping)
+    bus.publish(Ping("a", 1))
+    bus.publish(Pong(2))
+    bus.publish(LoudPing("b", 3))  # subclasses match too
+
+    assert _drain(everything) == [Ping("a", 1), Pong(2), LoudPing("b", 3)]
+    assert _drain(pings) == [Ping("a", 1), LoudPing("b", 3)]
+
+
+def test_drop_oldest_at_capacity():
+    bus: PubSubBus = PubSubBus()
+    sub = bus.subscribe("sub", maxsize=3, policy=OverflowPolicy.DROP_OLDEST)
+    for n in range(5):
+        bus.publish(Pong(n))
+
+    assert sub.dropped == 2
+    assert _drain(sub) == [Pong(2), Pong(3), Pong(4)]
+
+
+def test_drop_newest_at_capacity():
+    bus: PubSubBus = PubSubBus()
+    sub = bus.subscribe("sub", maxsize=3, policy=OverflowPolicy.DROP_NEWEST)
+    for n in range(5):
+        bus.publish(Pong(n))
+
+    assert sub.dropped == 2
+    assert _drain(sub) == [Pong(0), Pong(1), Pong(2)]
+
+
+def test_merge_replaces_the_newest_item_with_the_same_key():
+    bus: PubSubBus = PubSubBus()
+    sub = bus.subscribe(
+        "sub", maxsize=3, policy=OverflowPolicy.MERGE, merge_key=lambda e: e.key
+    )
+    bus.publish(Ping("a", 0))
+    bus.publish(Ping("a", 1))  # merged
+    bus.publish(Ping("b", 2))
+    bus.publish(Ping("a", 3))  # not the newest key: appended
+
+    assert sub.merged == 1
+    assert _drain(sub) == [Ping("a", 1), Ping("b", 2), Ping("a", 3)]
+
+
+def test_merge_at_capacity():
+    bus: PubSubBus = PubSubBus()
+    sub = bus.subscribe(
+        "sub", maxsize=2, policy=OverflowPolicy.MERGE, merge_key=lambda e: e.key
+    )
+    bus.publish(Ping("a", 0))
+    bus.publish(Ping("b", 1))
+    bus.publish(Ping("b", 2))  # merged, even though the queue is full
+    assert sub.dropped == 0
+    bus.publish(Ping("c", 3))  # no merge: the oldest is dropped
+
+    assert (sub.merged, sub.dropped) == (1, 1)
+    assert _drain(sub) == [Ping("b", 2), Ping("c", 3)]
+
+
+def test_merge_requires_a_key():
+    bus: PubSubBus = PubSubBus()
+    with pytest.raises(ValueError):
+        bus.subscribe("sub", policy=OverflowPolicy.MERGE)
+
+
+def test_a_full_subscriber_doesnt_affect_others():
+    bus: PubSubBus = PubSubBus()
+    slow = bus.subscribe("slow", maxsize=1)
+    fast = bus.subscribe("fast")
+    for n in range(3):
+        bus.publish(Pong(n))
+
+    assert _drain(slow) == [Pong(2)]
+    assert _drain(fast) == [Pong(0), Pong(1), Pong(2)]
+
+
+def test_unsubscribe_stops_delivery():
+    bus: PubSubBus = PubSubBus()
+    kept = bus.subscribe("kept")
+    gone = bus.subscribe("gone")
+    bus.publish(Pong(0))  # resolves and caches the dispatch of Pong
+    bus.unsubscribe(gone)
+    bus.publish(Pong(1))
+
+    assert _drain(gone) == [Pong(0)]
+    assert _drain(kept) == [Pong(0), Pong(1)]
+
+
+def test_get_waits_for_a_publish():
+    async def main():
+        bus: PubSubBus = PubSubBus()
+        sub = bus.subscribe("sub")
+        getter = asyncio.create_task(sub.get())
+        await asyncio.sleep(0)
+        assert not getter.done()
+        bus.publish(Pong(0))
+        return await asyncio.wait_for(getter, 1)
+
+    assert asyncio.run(main()) == Pong(0)
+
+
+def test_get_nowait_on_empty_raises():
+    bus: PubSubBus = PubSubBus()
+    sub = bus.subscribe("sub")
+    with pytest.raises(asyncio.QueueEmpty):
+        sub.get_nowait()
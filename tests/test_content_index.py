@@ -0,0 +1,75 @@
+from pathlib import Path
+
+from game_session_sync.content_index import ContentIndex, content_digest
+
+A = content_digest(b"a")
+B = content_digest(b"b")
+C = content_digest(b"c")
+
+
+def test_add_and_get(tmp_path: Path):
+    index = ContentIndex(tmp_path / "index")
+    index.add(A, "file-a", "folder-1")
+    index.add(A, "file-a2", "folder-2")  # the first upload is kept
+    assert index.get(A) == "file-a"
+    assert index.get(B) is None
+    assert len(index) == 1
+
+
+def test_persists_across_reload(tmp_path: Path):
+    path = tmp_path / "index"
+    index = ContentIndex(path)
+    index.add(A, "file-a", "folder-1")
+    index.add(B, "file-b", "folder-2")
+
+    reloaded = ContentIndex(path)
+    assert (reloaded.get(A), reloaded.get(B)) == ("file-a", "file-b")
+    assert reloaded.has_folder("folder-2")
+
+
+def test_skips_malformed_and_reads_legacy_lines(tmp_path: Path):
+    path = tmp_path / "index"
+    path.write_text(
+        f"{A.hex()} file-a folder-1\n"
+        f"{B.hex()} file-b\n"  # written before folders were recorded
+        f"{C.hex()[:10]}"  # torn by a crash mid-write
+    )
+    index = ContentIndex(path)
+    assert len(index) == 2
+    assert index.get(B) == "file-b"
+    assert not index.has_folder("file-b")
+
+
+def test_discard(tmp_path: Path):
+    path = tmp_path / "index"
+    index = ContentIndex(path)
+    index.add(A, "file-a", "folder-1")
+    index.add(B, "file-b", "folder-1")
+    index.discard(A)
+    index.discard(C)  # unknown digests are ignored
+    assert index.get(A) is None
+    assert index.get(B) == "file-b"
+
+    reloaded = ContentIndex(path)
+    assert reloaded.get(A) is None
+    assert reloaded.get(B) == "file-b"
+    # a discarded digest can be recorded again
+    reloaded.add(A, "file-a2", "folder-2")
+    assert ContentIndex(path).get(A) == "file-a2"
+
+
+def test_discard_folder(tmp_path: Path):
+    path = tmp_path / "index"
+    path.write_text(f"{C.hex()} file-c\n")
+    index = ContentIndex(path)
+    index.add(A, "file-a", "folder-1")
+    index.add(B, "file-b", "folder-2")
+
+    assert index.discard_folder("folder-1") == 1
+    assert index.discard_folder("folder-1") == 0
+    assert not index.has_folder("folder-1")
+
+    reloaded = ContentIndex(path)
+    assert reloaded.get(A) is None
+    assert (reloaded.get(B), reloaded.get(C)) == ("file-b", "file-c")
+    assert reloaded.has_folder("folder-2")
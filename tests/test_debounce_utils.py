@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+from game_session_sync.clock import run_virtual
+from game_session_sync.debounce_utils import KeyedDebouncer
+
+
+def _run(main):
+    """Run `main(calls)` on a virtual clock; returns the recorded (time, args)."""
+    calls: list[tuple[float, tuple]] = []
+
+    async def wrapper():
+        await main(calls)
+        await asyncio.sleep(60)  # let every pending timer fire
+
+    run_virtual(wrapper())
+    return calls
+
+
+def _recorder(calls: list[tuple[float, tuple]]):
+    def callback(*args):
+        calls.append((asyncio.get_running_loop().time(), args))
+
+    return callback
+
+
+def _call_at(debouncer: KeyedDebouncer, when: float, *args):
+    asyncio.get_running_loop().call_at(when, debouncer, *args)
+
+
+def test_keys_are_debounced_independently():
+    async def main(calls):
+        debouncer = KeyedDebouncer(_recorder(calls), 1.0)
+        _call_at(debouncer, 0.0, "a", "a1")
+        _call_at(debouncer, 0.5, "b", "b1")
+        _call_at(debouncer, 0.8, "a", "a2")
+
+    assert _run(main) == [
+        (pytest.approx(1.5), ("b1",)),
+        (pytest.approx(1.8), ("a2",)),
+    ]
+
+
+def test_trailing_only_fires_once_with_latest_args():
+    async def main(calls):
+        debouncer = KeyedDebouncer(_recorder(calls), 1.0)
+        for i in range(5):
+            _call_at(debouncer, i * 0.5, "a", i)
+
+    assert _run(main) == [(pytest.approx(3.0), (4,))]
+
+
+def test_leading_and_trailing():
+    async def main(calls):
+        debouncer = KeyedDebouncer(_recorder(calls), 1.0, leading=True)
+        _call_at(debouncer, 0.0, "a", "first")
+        _call_at(debouncer, 0.5, "a", "second")
+        # a lone call fires on the leading edge only
+        _call_at(debouncer, 10.0, "b", "lone")
+
+    assert _run(main) == [
+        (pytest.approx(0.0), ("first",)),
+        (pytest.approx(1.5), ("second",)),
+        (pytest.approx(10.0), ("lone",)),
+    ]
+
+
+def test_leading_only():
+    async def main(calls):
+        debouncer = KeyedDebouncer(_recorder(calls), 1.0, leading=True, trailing=False)
+        for i in range(3):
+            _call_at(debouncer, i * 0.5, "a", i)
+        _call_at(debouncer, 5.0, "a", "next window")
+
+    assert _run(main) == [
+        (pytest.approx(0.0), (0,)),
+        (pytest.approx(5.0), ("next window",)),
+    ]
+
+
+def test_max_wait_caps_postponing():
+    async def main(calls):
+        debouncer = KeyedDebouncer(_recorder(calls), 1.0, max_wait_sec=2.5)
+        # a call every 0.4 sec never leaves wait_sec of quiet
+        for i in range(11):
+            _call_at(debouncer, i * 0.4, "a", i)
+
+    assert _run(main) == [
+        (pytest.approx(2.5), (6,)),
+        # the next window opens with the call at 2.8
+        (pytest.approx(5.0), (10,)),
+    ]
+
+
+def test_throttle():
+    async def main(calls):
+        debouncer = KeyedDebouncer.throttle(_recorder(calls), 1.0)
+        for i in range(6):
+            _call_at(debouncer, i * 0.3, "a", i)
+
+    assert _run(main) == [
+        (pytest.approx(0.0), (0,)),
+        (pytest.approx(1.0), (3,)),
+        (pytest.approx(2.0), (5,)),
+    ]
+
+
+def test_max_keys_flushes_oldest_key():
+    async def main(calls):
+        debouncer = KeyedDebouncer(_recorder(calls), 1.0, max_keys=2)
+        debouncer("a", "a")
+        debouncer("b", "b")
+        debouncer("c", "c")
+        # the oldest key is flushed right away, with its pending invocation
+        assert calls == [(0.0, ("a",))]
+        assert len(debouncer) == 2
+        assert not debouncer.is_pending("a")
+
+    calls = _run(main)
+    assert calls[0] == (0.0, ("a",))
+    # timers due at the same time fire in no particular order
+    assert sorted(calls[1:], key=lambda c: c[1]) == [
+        (pytest.approx(1.0), ("b",)),
+        (pytest.approx(1.0), ("c",)),
+    ]
+
+
+def test_cancel_drops_pending_invocations():
+    async def main(calls):
+        debouncer = KeyedDebouncer(_recorder(calls), 1.0)
+        debouncer("a", "a")
+        debouncer("b", "b")
+        debouncer.cancel("a")
+        assert len(debouncer) == 1
+
+    assert _run(main) == [(pytest.approx(1.0), ("b",))]
+
+
+def test_requires_an_edge():
+    with pytest.raises(ValueError):
+        KeyedDebouncer(lambda: None, 1.0, leading=False, trailing=False)
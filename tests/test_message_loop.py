@@ -0,0 +1,117 @@
+import asyncio
+import threading
+
+import pytest
+
+from game_session_sync.events import EventBus, GameMinimizedEvent
+from game_session_sync.message_loop import FakeMessageLoop
+from game_session_sync.window_system import FakeWindow, FakeWindowSystem
+
+JOIN_TIMEOUT_SEC = 5
+
+
+def test_dispatches_posted_messages_on_the_loop_thread():
+    async def main():
+        loop = asyncio.get_running_loop()
+        message_loop = FakeMessageLoop()
+        # run on a worker thread, as WindowEventWatcher does
+        thread_task = asyncio.create_task(asyncio.to_thread(message_loop.run))
+
+        received: list[tuple[int, str]] = []
+
+        def message(i: int):
+            # hook callbacks hand their work back to the event loop
+            name = threading.current_thread().name
+            loop.call_soon_threadsafe(received.append, (i, name))
+
+        posters = [
+            threading.Thread(target=message_loop.post, args=(lambda i=i: message(i),))
+            for i in range(10)
+        ]
+        for t in posters:
+            t.start()
+        for t in posters:
+            t.join()
+        message_loop.stop()
+        await asyncio.wait_for(thread_task, JOIN_TIMEOUT_SEC)
+        await asyncio.sleep(0)  # let the last call_soon_threadsafe run
+        return message_loop, received
+
+    message_loop, received = asyncio.run(main())
+    assert message_loop.dispatched == 10
+    assert sorted(i for i, _ in received) == list(range(10))
+    # every message ran on the single message loop thread
+    assert len({name for _, name in received}) == 1
+    assert received[0][1] != threading.current_thread().name
+
+
+def test_stop_before_run_ends_the_loop():
+    message_loop = FakeMessageLoop()
+    message_loop.stop()
+    message_loop.run()  # returns right away instead of blocking
+    assert message_loop.dispatched == 0
+
+
+def test_stop_wakes_an_idle_loop():
+    async def main():
+        message_loop = FakeMessageLoop()
+        thread_task = asyncio.create_task(asyncio.to_thread(message_loop.run))
+        await asyncio.sleep(0.05)
+        assert not thread_task.done()  # blocked, waiting for messages
+        message_loop.stop()
+        await asyncio.wait_for(thread_task, JOIN_TIMEOUT_SEC)
+
+    asyncio.run(main())
+
+
+def test_messages_posted_after_stop_are_not_dispatched():
+    message_loop = FakeMessageLoop()
+    calls: list[int] = []
+    message_loop.post(lambda: calls.append(1))
+    message_loop.stop()
+    message_loop.post(lambda: calls.append(2))
+    message_loop.run()
+    assert calls == [1]
+
+
+def test_window_watcher_dispatch():
+    win32con = pytest.importorskip("win32con")
+    from game_session_sync.windows_producers.window_watcher import (
+        GetTickCount64,
+        WindowEventWatcher,
+    )
+
+    BROWSER_HWND = 2
+
+    async def main():
+        bus: EventBus = EventBus()
+        events = bus.subscribe("test")
+        ws = FakeWindowSystem()
+        ws.windows[BROWSER_HWND] = FakeWindow(20, "Browser", (100, 100, 900, 700))
+        ws.exes[20] = r"C:\Browser\browser.exe"
+
+        message_loop = FakeMessageLoop()
+        watcher = WindowEventWatcher(
+            bus, [r"(Game)\.exe"], lambda: message_loop, window_system=ws
+        )
+        watcher._last_foreground_title = "Game"
+        await watcher.run()
+        message_loop.post(
+            lambda: watcher._WinEventProc(
+                None,
+                win32con.EVENT_SYSTEM_FOREGROUND,
+                BROWSER_HWND,
+                win32con.OBJID_WINDOW,
+                win32con.CHILDID_SELF,
+                0,
+                GetTickCount64(),
+            )
+        )
+        event = await asyncio.wait_for(events.get(), JOIN_TIMEOUT_SEC)
+        # joins the hook thread
+        await asyncio.wait_for(watcher.stop(), JOIN_TIMEOUT_SEC)
+        return event, message_loop
+
+    event, message_loop = asyncio.run(main())
+    assert isinstance(event, GameMinimizedEvent) and event.title == "Game"
+    assert message_loop.dispatched == 1
@@ -0,0 +1,83 @@
+import random
+from pathlib import Path
+
+import pytest
+
+from game_session_sync.phash_index import PHashIndex
+
+STORED = 0x0123_4567_89AB_CDEF
+
+
+def _flip(h: int, *bits: int) -> int:
+    for b in bits:
+        h ^= 1 << b
+    return h
+
+
+def _spread(distance: int) -> list[int]:
+    """`distance` bits spread as evenly as possible over the four 16-bit chunks, the
+    worst case for the multi-index lookup."""
+    return [(i % 4) * 16 + i // 4 for i in range(distance)]
+
+
+@pytest.mark.parametrize("radius", [4, 5, 8, 11])
+def test_found_at_the_radius_with_bits_spread_over_chunks(tmp_path: Path, radius):
+    index = PHashIndex(tmp_path / "index")
+    index.add(STORED)
+    query = _flip(STORED, *_spread(radius))
+    assert index.nearest(query, radius) == (STORED, radius)
+
+
+@pytest.mark.parametrize("radius", [4, 5, 8, 11])
+def test_not_found_past_the_radius(tmp_path: Path, radius):
+    index = PHashIndex(tmp_path / "index")
+    index.add(STORED)
+    assert index.nearest(_flip(STORED, *_spread(radius + 1)), radius) is None
+    # all in one chunk, which the other three chunks match exactly
+    assert index.nearest(_flip(STORED, *range(radius + 1)), radius) is None
+
+
+def test_nearest_of_several(tmp_path: Path):
+    index = PHashIndex(tmp_path / "index")
+    far = _flip(STORED, *_spread(6))
+    near = _flip(STORED, *_spread(2))
+    index.add(far)
+    index.add(near)
+    assert index.nearest(STORED, 8) == (near, 2)
+    index.add(STORED)
+    assert index.nearest(STORED, 8) == (STORED, 0)
+
+
+def test_matches_a_linear_scan(tmp_path: Path):
+    rng = random.Random(0)
+    radius = 8
+    scenes = [rng.getrandbits(64) for _ in range(20)]
+    hashes = [
+        _flip(rng.choice(scenes), *rng.sample(range(64), rng.randint(0, 12)))
+        for _ in range(500)
+    ]
+    index = PHashIndex(tmp_path / "index")
+    for h in hashes:
+        index.add(h)
+
+    for _ in range(200):
+        query = _flip(rng.choice(hashes), *rng.sample(range(64), rng.randint(0, 12)))
+        best = min((h ^ query).bit_count() for h in hashes)
+        found = index.nearest(query, radius)
+        if best > radius:
+            assert found is None
+        else:
+            assert found is not None and found[1] == best
+
+
+def test_persists_and_skips_a_torn_hash(tmp_path: Path):
+    path = tmp_path / "index"
+    index = PHashIndex(path)
+    index.add(STORED)
+    index.add(~STORED & (2**64 - 1))
+    with path.open("ab") as f:
+        f.write(b"\x01\x02\x03")  # torn by a crash mid-write
+
+    reloaded = PHashIndex(path)
+    assert len(reloaded) == 2
+    assert reloaded.nearest(STORED, 0) == (STORED, 0)
@@ -0,0 +1,107 @@
+import random
+
+import pytest
+
+from game_session_sync.events import (
+    GameCloseEvent,
+    GameFullscreenEvent,
+    GameMinimizedEvent,
+    InputActiveEvent,
+    InputIdleEvent,
+    SessionEvent,
+)
+from game_session_sync.session_machine import (
+    Effect,
+    EffectKind,
+    SessionMachine,
+    coalesce,
+)
+
+START_A = Effect(EffectKind.START, "A")
+PAUSE = Effect(EffectKind.PAUSE)
+RESUME = Effect(EffectKind.RESUME)
+UPLOAD_A = Effect(EffectKind.UPLOAD, "A")
+
+
+def _feed(machine: SessionMachine, *events: SessionEvent) -> list[Effect]:
+    return [effect for event in events for effect in machine.feed(event)]
+
+
+def test_start_pause_resume_close():
+    machine = SessionMachine()
+    assert _feed(machine, GameFullscreenEvent("A")) == [START_A]
+    assert _feed(machine, GameFullscreenEvent("A")) == []
+    assert _feed(machine, InputIdleEvent()) == [PAUSE]
+    assert _feed(machine, InputActiveEvent()) == [RESUME]
+    assert _feed(machine, GameMinimizedEvent("A")) == [PAUSE]
+    # only an idle pause is resumed by input
+    assert _feed(machine, InputActiveEvent()) == []
+    assert _feed(machine, GameFullscreenEvent("A")) == [RESUME]
+    assert _feed(machine, GameCloseEvent("A")) == [PAUSE, UPLOAD_A]
+    # relaunching the closed game resumes its session
+    assert _feed(machine, GameFullscreenEvent("A")) == [RESUME]
+
+
+def test_switching_games_starts_a_new_session():
+    machine = SessionMachine()
+    _feed(machine, GameFullscreenEvent("A"))
+    assert _feed(machine, GameFullscreenEvent("B")) == [
+        PAUSE,
+        Effect(EffectKind.START, "B"),
+    ]
+    # the other game closing doesn't upload while B is played
+    assert _feed(machine, GameCloseEvent("A")) == []
+
+
+def test_coalesce():
+    assert coalesce([PAUSE, RESUME]) == []
+    assert coalesce([UPLOAD_A, UPLOAD_A]) == [UPLOAD_A]
+    # an upload is dropped by a resume after it, and the pause with it
+    assert coalesce([PAUSE, UPLOAD_A, RESUME]) == []
+    assert coalesce([PAUSE, UPLOAD_A, START_A]) == [PAUSE, START_A]
+
+
+TITLES = ["A", "B", "C"]
+
+
+def _random_event(rng: random.Random) -> SessionEvent:
+    r = rng.random()
+    if r < 0.4:
+        return GameFullscreenEvent(rng.choice(TITLES))
+    if r < 0.55:
+        return GameMinimizedEvent(rng.choice(TITLES))
+    if r < 0.65:
+        return GameCloseEvent(rng.choice(TITLES))
+    if r < 0.8:
+        return InputIdleEvent()
+    return InputActiveEvent()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_coalesced_effects_reproduce_the_machine_state(seed: int):
+    """Applying the coalesced effects of random batches of events is legal at every
+    step and ends in the state of the machine."""
+    rng = random.Random(seed)
+    events = [_random_event(rng) for _ in range(20_000)]
+
+    machine = SessionMachine()
+    title, active = None, False
+    i = 0
+    while i < len(events):
+        batch = events[i : i + rng.randint(1, 8)]
+        i += len(batch)
+        effects = _feed(machine, *batch)
+        for effect in coalesce(effects):
+            if effect.kind is EffectKind.START:
+                assert effect.title is not None
+                title, active = effect.title, True
+            elif effect.kind is EffectKind.RESUME:
+                assert title is not None and not active, effect
+                active = True
+            elif effect.kind is EffectKind.PAUSE:
+                assert active, effect
+                active = False
+            elif effect.kind is EffectKind.UPLOAD:
+                assert not active, effect
+        assert (title, active) == (machine.title, machine.active)
+        assert not (machine.active and machine.idle_paused)
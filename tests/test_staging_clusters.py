@@ -0,0 +1,101 @@
+from pathlib import Path
+
+from game_session_sync.staging_clusters import StagingClusters
+
+GAP_MS = 15 * 60_000
+T0 = 1_704_067_200_000
+
+
+def _staging(tmp_path: Path) -> StagingClusters[str]:
+    return StagingClusters(tmp_path / "clusters.json", GAP_MS, str, str)
+
+
+def _capture(title: str, ms: int) -> tuple[str, str, int]:
+    return f"{title}/{ms}.png", title, ms
+
+
+def _keys(staging: StagingClusters) -> list[list[str]]:
+    return [list(c.files) for c in staging.clusters()]
+
+
+def test_splits_at_exactly_the_gap(tmp_path: Path):
+    staging = _staging(tmp_path)
+    staging.add(
+        [
+            _capture("A", T0),
+            _capture("A", T0 + GAP_MS - 1),  # just under the gap: merged
+            _capture("A", T0 + 2 * GAP_MS - 1),  # exactly the gap: split
+        ]
+    )
+    assert _keys(staging) == [
+        [f"A/{T0}.png", f"A/{T0 + GAP_MS - 1}.png"],
+        [f"A/{T0 + 2 * GAP_MS - 1}.png"],
+    ]
+
+
+def test_titles_are_clustered_apart(tmp_path: Path):
+    staging = _staging(tmp_path)
+    staging.add([_capture("B", T0 + 1), _capture("A", T0), _capture("A", T0 + 2)])
+    assert [(c.title, len(c.files)) for c in staging.clusters()] == [
+        ("A", 2),
+        ("B", 1),
+    ]
+
+
+def test_open_cluster_continues_across_runs(tmp_path: Path):
+    staging = _staging(tmp_path)
+    staging.add([_capture("A", T0)])
+    [cluster] = staging.clusters()
+    staging.resolved(cluster, "session")
+
+    # the capture is uploaded; the next one is still within the gap of it
+    staging.remove([f"A/{T0}.png"])
+    assert staging.clusters() == []
+    staging.add([_capture("A", T0 + GAP_MS - 1)])
+    assert staging.clusters() == [cluster]
+    assert cluster.session == "session"
+
+    # the next one past the gap starts a new, unresolved cluster
+    staging.add([_capture("A", T0 + 2 * GAP_MS - 1)])
+    assert [c.session for c in staging.clusters()] == ["session", None]
+
+
+def test_older_capture_merges_clusters_across_the_gap(tmp_path: Path):
+    staging = _staging(tmp_path)
+    staging.add([_capture("A", T0), _capture("A", T0 + GAP_MS)])
+    first, second = staging.clusters()
+    staging.resolved(first, "first")
+    staging.resolved(second, "second")
+
+    # e.g. moved back from trash, bridging the gap
+    staging.add([_capture("A", T0 + GAP_MS // 2)])
+    [merged] = staging.clusters()
+    assert len(merged.files) == 3
+    assert merged.session == "first"
+
+
+def test_older_capture_past_the_gap_keeps_clusters_apart(tmp_path: Path):
+    staging = _staging(tmp_path)
+    staging.add([_capture("A", T0 + GAP_MS), _capture("A", T0 + 3 * GAP_MS)])
+    staging.add([_capture("A", T0)])
+    assert _keys(staging) == [
+        [f"A/{T0}.png"],
+        [f"A/{T0 + GAP_MS}.png"],
+        [f"A/{T0 + 3 * GAP_MS}.png"],
+    ]
+
+
+def test_open_session_is_persisted_and_forgotten(tmp_path: Path):
+    staging = _staging(tmp_path)
+    staging.add([_capture("A", T0), _capture("A", T0 + GAP_MS)])
+    closed, open_ = staging.clusters()
+    staging.resolved(closed, "closed")
+    staging.resolved(open_, "open")
+    staging.save()
+    assert _staging(tmp_path).open_sessions == {"A": "open"}
+
+    assert not staging.forget(lambda s: s == "closed")
+    assert closed.session is None
+    assert staging.forget(lambda s: s == "open")
+    assert open_.session is None
+    assert staging.open_sessions == {}
@@ -0,0 +1,105 @@
+from game_session_sync.window_system import (
+    FakeWindow,
+    FakeWindowSystem,
+    WindowStateCache,
+)
+
+GAME_HWND = 1
+
+
+def _game_system() -> FakeWindowSystem:
+    ws = FakeWindowSystem()
+    ws.windows[GAME_HWND] = FakeWindow(10, "Game")
+    ws.exes[10] = r"C:\Games\Game\game.exe"
+    return ws
+
+
+def test_queries_are_cached_until_invalidated():
+    ws = _game_system()
+    cache = WindowStateCache(ws)
+    assert not cache.is_hidden(GAME_HWND)
+    assert cache.is_fullscreen(GAME_HWND)
+    calls = ws.calls.total()
+
+    assert not cache.is_hidden(GAME_HWND)
+    assert cache.is_fullscreen(GAME_HWND)
+    assert ws.calls.total() == calls
+
+
+def test_location_change_invalidates_geometry():
+    ws = _game_system()
+    cache = WindowStateCache(ws)
+    assert cache.is_fullscreen(GAME_HWND)
+
+    ws.windows[GAME_HWND].rect = (0, 0, 800, 600)
+    assert cache.is_fullscreen(GAME_HWND)  # stale until the event
+    cache.on_location_change(GAME_HWND)
+    assert not cache.is_fullscreen(GAME_HWND)
+
+
+def test_title_set_after_startup_is_seen_on_foreground():
+    ws = _game_system()
+    ws.windows[GAME_HWND].text = ""
+    cache = WindowStateCache(ws)
+    assert cache.is_hidden(GAME_HWND)
+
+    ws.windows[GAME_HWND].text = "Game"
+    cache.on_foreground(GAME_HWND)
+    assert not cache.is_hidden(GAME_HWND)
+
+
+def test_hierarchy_and_process_are_kept_across_invalidation():
+    ws = _game_system()
+    cache = WindowStateCache(ws)
+    assert cache.exe(GAME_HWND) == r"C:\Games\Game\game.exe"
+    assert not cache.is_hidden(GAME_HWND)
+
+    cache.on_location_change(GAME_HWND)
+    ws.calls.clear()
+    cache.exe(GAME_HWND)
+    cache.is_hidden(GAME_HWND)
+    assert ws.calls["get_process_exe"] == 0
+    assert ws.calls["get_parent"] == ws.calls["get_owner"] == 0
+
+
+def test_handle_reused_by_another_process_is_forgotten():
+    ws = _game_system()
+    cache = WindowStateCache(ws)
+    assert cache.exe(GAME_HWND) == r"C:\Games\Game\game.exe"
+
+    # the game exits and its handle is reused by a tool window of another process
+    ws.windows[GAME_HWND] = FakeWindow(20, "Tool", owner=5)
+    ws.exes[20] = r"C:\Tool\tool.exe"
+    cache.on_foreground(GAME_HWND)
+    assert cache.exe(GAME_HWND) == r"C:\Tool\tool.exe"
+    assert cache.is_hidden(GAME_HWND)
+
+
+def test_destroyed_window_is_forgotten():
+    ws = _game_system()
+    cache = WindowStateCache(ws)
+    assert not cache.is_hidden(GAME_HWND)
+
+    del ws.windows[GAME_HWND]
+    cache.on_foreground(GAME_HWND)
+    assert cache.is_hidden(GAME_HWND)
+    assert len(cache) == 0
+
+
+def test_evicts_least_recently_queried_window():
+    ws = FakeWindowSystem()
+    for hwnd in (1, 2, 3):
+        ws.windows[hwnd] = FakeWindow(hwnd)
+    cache = WindowStateCache(ws, max_windows=2)
+    cache.pid(1)
+    cache.pid(2)
+    cache.pid(1)  # 2 is now the least recently queried
+    cache.pid(3)
+    assert len(cache) == 2
+
+    ws.calls.clear()
+    cache.pid(1)
+    cache.pid(3)
+    assert ws.calls["get_pid"] == 0
+    cache.pid(2)
+    assert ws.calls["get_pid"] == 1